@@ -1,62 +1,53 @@
 
 # -*- coding: utf-8 -*-
 import argparse
+import heapq
 import math
+import sys
 from pathlib import Path
 import pandas as pd
 import numpy as np
 import json
 import re
-import unidecode
-from rapidfuzz import process, fuzz
-
-CITIES_REF = [
-    "Hà Nội", "Hồ Chí Minh", "Hải Phòng", "Đà Nẵng", "Cần Thơ", "An Giang",
-    "Bà Rịa - Vũng Tàu", "Bắc Giang", "Bắc Kạn", "Bạc Liêu", "Bắc Ninh",
-    "Bến Tre", "Bình Định", "Bình Dương", "Bình Phước", "Bình Thuận",
-    "Cà Mau", "Cao Bằng", "Đắk Lắk", "Đắk Nông", "Điện Biên", "Đồng Nai",
-    "Đồng Tháp", "Gia Lai", "Hà Giang", "Hà Nam", "Hà Tĩnh", "Hải Dương",
-    "Hậu Giang", "Hòa Bình", "Hưng Yên", "Khánh Hòa", "Kiên Giang", "Kon Tum",
-    "Lai Châu", "Lâm Đồng", "Lạng Sơn", "Lào Cai", "Long An", "Nam Định",
-    "Nghệ An", "Ninh Bình", "Ninh Thuận", "Phú Thọ", "Phú Yên", "Quảng Bình",
-    "Quảng Nam", "Quảng Ngãi", "Quảng Ninh", "Quảng Trị", "Sóc Trăng",
-    "Sơn La", "Tây Ninh", "Thái Bình", "Thái Nguyên", "Thanh Hóa",
-    "Thừa Thiên Huế", "Tiền Giang", "Trà Vinh", "Tuyên Quang", "Vĩnh Long",
-    "Vĩnh Phúc", "Yên Bái"
-]
-
-# Chuẩn hóa reference (không dấu, lowercase)
-CITIES_REF_ASCII = [unidecode.unidecode(c).lower() for c in CITIES_REF]
-INVALID_VALUES = {"unknown", "n/a", "na", "none", ""}
+from datetime import date
+from typing import NamedTuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
+from clean_data import FX_TO_VND, parse_fx, salary_range_vnd_month
+from gazetteer import get_gazetteer
+from profiling import Profiler, add_profile_arg
+from quantile_sketch import KLLSketch, merge_json
+from report_cubes import CubeStore, SKETCH_SUFFIX
+from skill_canon import get_skill_canon, save_skill_canon
+from unique_map import BoundedMemo, file_fingerprint, map_unique
+
+BAD_INDUSTRIES = {"#Other", "<--OTHER-->", "<career>","Others","Unknown"}
+FILL_COLS = ["industry","role_family","seniority","employment_type","company","name"]
+NUMERIC_COLS = ["min","max","years_min","years_max","confidence"]
+YEAR_COLS = ["years_min","years_max"]
+LOW_CONF_COLS = ["name","company","industry","role_family","seniority","confidence","summary"]
+LIST_TYPES = (list, tuple, np.ndarray)
+# Chiều chung của mọi cube; mỗi cube con thêm đúng một chiều city/skill/language
+CUBE_DIMS = ["industry","seniority","employment_type"]
+CUBE_NAMES = ["jobs","city","skill","language","company","salary","salary_city"]
+EXCEL_MAX_ROWS = 1_048_576
+SHEET_NAMES = {
+    "overview": "00_Overview", "by_industry": "01_ByIndustry", "piv_sen": "02_SeniorityPivot",
+    "piv_city": "03_CityPivot", "top_skills": "04_TopSkillsByIndustry", "lang_stats": "05_LanguagesByIndustry",
+    "low_conf": "06_LowConfidence", "employment_df": "08_EmploymentType", "trend": "09_DailyTrend",
+    "salary_industry": "10_SalaryByIndustry", "salary_city": "11_SalaryByCity",
+    "salary_seniority": "12_SalaryBySeniority",
+}
+MEASURE_COLS = {"posts","count","years_min_sum","years_min_n","years_max_sum","years_max_n"}
+SALARY_QUANTILES = [0.1, 0.5, 0.9]
+SALARY_COL = "salary_vnd"
 
 def normalize_city_auto(city: str, threshold: int = 80):
-    if not isinstance(city, str) or city.strip() == "":
-        return []
-
-    # Tách nhiều city theo ; hoặc ,
-    parts = re.split(r"[;,]", city)
-    results = []
-
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
-
-        city_ascii = unidecode.unidecode(part).lower().strip()
-        if city_ascii in INVALID_VALUES:
-            continue
+    return get_gazetteer().normalize_city_lists([city], threshold)[0]
 
-        # Fuzzy match với danh sách tham chiếu
-        best_match = process.extractOne(city_ascii, CITIES_REF_ASCII, scorer=fuzz.ratio)
-
-        if best_match:
-            _, score, idx = best_match
-            if score >= threshold:
-                results.append(CITIES_REF[idx])
-            else:
-                results.append(part.title())
-
-    return results
+def normalize_city_series(values: pd.Series, threshold: int = 80) -> pd.Series:
+    # Bản batch: fuzzy match mọi giá trị trong một lần rapidfuzz cdist
+    return pd.Series(get_gazetteer().normalize_city_lists(values.tolist(), threshold), index=values.index)
 
 def clean_employment_type(x: str) -> str:
     if not isinstance(x, str):
@@ -101,6 +92,9 @@ def to_list(val):
     return []
 
 def clean_languages(val):
+    if isinstance(val, LIST_TYPES):
+        # cột list trong Parquet: ghép lại như bản CSV "['English B2', ...]"
+        val = ", ".join(map(str, val))
     if pd.isna(val):
         return None
     s = str(val).strip()
@@ -130,144 +124,415 @@ def clean_languages(val):
 
     return s
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+class ReportTables(NamedTuple):
+    """Bảng chuẩn hóa: jobs một dòng/job, các bảng con một dòng/(job, giá trị), nối qua job_key."""
+    jobs: pd.DataFrame
+    job_skills: pd.DataFrame
+    job_cities: pd.DataFrame
+    job_languages: pd.DataFrame
+
+def parse_skills(val):
+    if isinstance(val, LIST_TYPES):
+        return list(val)
+    if pd.isna(val): 
+        return []
+    s = str(val).strip()
+    # Nếu là dạng list string
+    if s.startswith("[") and s.endswith("]"):
+        try:
+            arr = json.loads(s.replace("'", '"'))
+            return arr if isinstance(arr, list) else [s]
+        except Exception:
+            return re.findall(r"'([^']+)'", s)  # fallback parse
+    # Nếu là dạng 'Skill'
+    return [s.strip("'")]
+
+def skill_list(val):
+    return [x for sk in parse_skills(val) if isinstance(sk, str) for x in to_list(sk.strip())]
+
+def skill_id_lists(values: pd.Series) -> pd.Series:
+    """core_skills -> list id skill chuẩn hóa (skill_canon); đếm trên id int thay vì chuỗi."""
+    canon = get_skill_canon()
+    lists = canon.canonicalize_lists(values.map(skill_list))
+    names = list({n: None for x in lists for n in x})
+    ids = dict(zip(names, canon.skill_ids(names).tolist()))
+    return pd.Series([[ids[n] for n in x] for x in lists], index=values.index, dtype=object)
+
+def skill_names(ids) -> np.ndarray:
+    return np.asarray(get_skill_canon().names, dtype=object)[np.asarray(ids, dtype=np.int64)]
+
+def language_list(val):
+    lang = clean_languages(val)
+    return to_list(lang) if lang is not None else []
+
+def link_table(keys: pd.Series, lists: pd.Series, col: str) -> pd.DataFrame:
+    # Bảng (key, col): mỗi giá trị chỉ đếm một lần cho mỗi key
+    t = pd.DataFrame({keys.name: keys.to_numpy(), col: lists.to_numpy()}).explode(col)
+    t = t.dropna(subset=[col]).infer_objects()
+    if t[col].dtype == object:
+        t[col] = t[col].astype(str).str.strip()
+        t = t[t[col] != ""]
+    t = t.drop_duplicates()
+    return t.reset_index(drop=True)
+
+def clean_data(df: pd.DataFrame, memo: BoundedMemo = None) -> ReportTables:
     # 1. Loại bỏ industry rác
-    bad_industries = {"#Other", "<--OTHER-->", "<career>","Others","Unknown"}
-    df = df[~df["industry"].isin(bad_industries)].copy()
-
-    # 2 Loại bỏ languages_required
-    if "languages_required" in df.columns:
-        df["languages_required"] = df["languages_required"].apply(clean_languages)
-        df = df.dropna(subset=["languages_required"])
-
-    # 3. Chuẩn hóa core_skills thành list
-    def parse_skills(val):
-        if pd.isna(val): 
-            return []
-        s = str(val).strip()
-        # Nếu là dạng list string
-        if s.startswith("[") and s.endswith("]"):
-            try:
-                arr = json.loads(s.replace("'", '"'))
-                return arr if isinstance(arr, list) else [s]
-            except Exception:
-                return re.findall(r"'([^']+)'", s)  # fallback parse
-        # Nếu là dạng 'Skill'
-        return [s.strip("'")]
-
-    df["core_skills"] = df["core_skills"].apply(parse_skills)
-
-    # 4. Làm phẳng (explode)
-    df = df.explode("core_skills")
-    df["core_skills"] = df["core_skills"].str.strip()
-
-    # 5. Chuẩn hóa city_guess :
-    df["city_guess"] = df["city_guess"].apply(normalize_city_auto)
-    df = df.explode("city_guess")
-    df = df.dropna(subset=["city_guess"])
-    df["city_guess"] = df["city_guess"].astype(str).str.strip()   
+    keep = ~df["industry"].isin(BAD_INDUSTRIES)
+    if "duplicate_of" in df.columns:
+        # tin đăng lại gần trùng (near_dup.py) chỉ đếm một lần, qua tin đại diện
+        keep &= df["duplicate_of"].fillna("").astype(str) == ""
+    jobs = df[keep].reset_index(drop=True)
+    jobs.insert(0, "job_key", np.arange(len(jobs), dtype=np.int64))
+    empty = pd.Series([[]] * len(jobs), dtype=object)
+
+    # 2. languages_required -> job_languages
+    if "languages_required" in jobs.columns:
+        langs = map_unique(jobs["languages_required"], lambda u: u.map(language_list))
+    else:
+        langs = empty
 
-    return df
-def safe_mean(series):
-    s = pd.to_numeric(series, errors="coerce")
-    return float(s.mean()) if s.notna().any() else np.nan
+    # 3. core_skills -> job_skills (id skill chuẩn hóa)
+    if "core_skills" in jobs.columns:
+        skills = map_unique(jobs["core_skills"], skill_id_lists)
+    else:
+        skills = empty
 
-def make_report(df: pd.DataFrame, out_xlsx: Path, out_txt: Path):
-    for c in ["industry","role_family","seniority","employment_type","company","name"]:
+    # 4. Chuẩn hóa city_guess -> job_cities
+    if "city_guess" in jobs.columns:
+        cities = map_unique(jobs["city_guess"], normalize_city_series, memo, "city")
+    else:
+        cities = empty
+
+    return ReportTables(
+        jobs=jobs.drop(columns=["core_skills", "city_guess", "languages_required"], errors="ignore"),
+        job_skills=link_table(jobs["job_key"], skills, "skill_id"),
+        job_cities=link_table(jobs["job_key"], cities, "city"),
+        job_languages=link_table(jobs["job_key"], langs, "language"),
+    )
+
+def cube_count(jobs: pd.DataFrame, link: pd.DataFrame, col: str) -> pd.DataFrame:
+    # Số job theo (chiều cube, giá trị) tính trên bảng con, join ngược về jobs để lấy các chiều
+    t = link.merge(jobs[["job_key"] + CUBE_DIMS], on="job_key")
+    return t.groupby(CUBE_DIMS + [col]).size().reset_index(name="count")
+
+def salary_vnd_month(df: pd.DataFrame, fx: dict = None) -> pd.Series:
+    """Lương VND/tháng của mỗi tin: trung điểm min-max (hoặc đầu có giá trị)."""
+    rng = salary_range_vnd_month(df, fx)
+    return ((rng["lo"] + rng["hi"]) / 2).fillna(rng["lo"]).fillna(rng["hi"])
+
+def pandas_counts(tables: ReportTables, fx: dict = None) -> dict:
+    """Bảng đếm theo độ mịn của cube (CUBE_DIMS [+ city/skill/language]); engine pandas."""
+    df = tables.jobs
+    for c in FILL_COLS:
         if c in df.columns:
-            df[c] = df[c].fillna("Unknown")
-    
-    for c in ["min","max","years_min","years_max","confidence"]:
+            # merge ghi "" cho trường thiếu; CSV đọc lại thành NaN, Parquet giữ "" -> coi như nhau
+            df[c] = df[c].replace("", np.nan).fillna("Unknown")
+    for c in NUMERIC_COLS:
         if c in df.columns:
             df[c] = pd.to_numeric(df[c], errors="coerce")
+    for c in CUBE_DIMS:
+        if c not in df.columns:
+            df[c] = "Unknown"
+    df["employment_type"] = map_unique(df["employment_type"], lambda u: u.map(clean_employment_type))
 
-    n_jobs = len(df)
-    n_industries = df["industry"].nunique() if "industry" in df.columns else 0
-    n_companies = df["company"].nunique() if "company" in df.columns else 0
-    n_city = df["city_guess"].nunique() if "city_guess" in df.columns else 0
-    avg_years_min = safe_mean(df["years_min"]) if "years_min" in df.columns else np.nan
-    avg_years_max = safe_mean(df["years_max"]) if "years_max" in df.columns else np.nan
-    # avg_salary_min = safe_mean(df["min"]) if "min" in df.columns else np.nan
-    # avg_salary_max = safe_mean(df["max"]) if "max" in df.columns else np.nan
-    # avg_conf = safe_mean(df["confidence"]) if "confidence" in df.columns else np.nan
-
-    agg = {}
-    if "name" in df.columns: agg["posts"] = ("name","count")
-    if "years_min" in df.columns: agg["avg_exp_min"] = ("years_min","mean")
-    if "years_max" in df.columns: agg["avg_exp_max"] = ("years_max","mean")
-    # if "min" in df.columns: agg["avg_salary_min"] = ("min","mean")
-    # if "max" in df.columns: agg["avg_salary_max"] = ("max","mean")
-    # if "confidence" in df.columns: agg["avg_confidence"] = ("confidence","mean")
-
-    by_industry = (df.groupby("industry", dropna=False)
-                     .agg(**agg)
-                     .sort_values("posts", ascending=False) if agg else pd.DataFrame())
-
-    if {"industry","seniority"}.issubset(df.columns):
-        piv_sen = pd.pivot_table(df, index="industry", columns="seniority", values="name", aggfunc="count", fill_value=0)
-        piv_sen = piv_sen.reindex(piv_sen.sum(axis=1).sort_values(ascending=False).index)
-    else:
-        piv_sen = pd.DataFrame()
-
-    if {"industry","city_guess"}.issubset(df.columns):
-        piv_city = pd.pivot_table(df, index="industry", columns="city_guess", values="name", aggfunc="count", fill_value=0)
-        piv_city = piv_city.reindex(piv_city.sum(axis=1).sort_values(ascending=False).index)
-    else:
-        piv_city = pd.DataFrame()
-
-    if "core_skills" in df.columns:
-        tmp = df.copy()
-        tmp["core_skills"] = tmp["core_skills"].apply(to_list)
-        skills = tmp.explode("core_skills")
-        skills = skills.dropna(subset=["core_skills"])
-        top_skills = (skills.groupby(["industry","core_skills"]).size()
-                      .reset_index(name="count")
-                      .sort_values(["industry","count"], ascending=[True, False]))
-    else:
-        top_skills = pd.DataFrame()
-
-    if "languages_required" in df.columns:
-        tmp2 = df.copy()
-        tmp2["languages_required"] = tmp2["languages_required"].apply(to_list)
-        langs = tmp2.explode("languages_required").dropna(subset=["languages_required"])
-        lang_stats = (langs.groupby(["industry","languages_required"]).size()
-                      .reset_index(name="count")
-                      .sort_values(["industry","count"], ascending=[True, False]))
-    else:
-        lang_stats = pd.DataFrame()
-
-    low_conf = pd.DataFrame()
-    if "confidence" in df.columns:
-        low_conf = df[df["confidence"] < 0.5].copy()
-
+    agg = {"posts": ("industry", "size")}
+    for c in YEAR_COLS:
+        if c in df.columns:
+            agg[f"{c}_sum"] = (c, "sum")
+            agg[f"{c}_n"] = (c, "count")
+    counts = {"jobs": df.groupby(CUBE_DIMS).agg(**agg).reset_index()}
+    counts["city"] = cube_count(df, tables.job_cities, "city").rename(columns={"city": "city_guess"})
+    skills = cube_count(df, tables.job_skills, "skill_id")
+    counts["skill"] = skills.assign(skill_id=skill_names(skills["skill_id"])).rename(columns={"skill_id": "core_skills"})
+    counts["language"] = (cube_count(df, tables.job_languages, "language")
+                          .rename(columns={"language": "languages_required"}))
     if "company" in df.columns:
-        company_stats = (
-            df.groupby("company")
-            .agg(posts=("name", "count"))
-            .sort_values("posts", ascending=False)
-            .head(10)
-        )
-    else:
-        company_stats = pd.DataFrame()
+        counts["company"] = df.groupby("company").size().reset_index(name="posts")
+    if "min" in df.columns or "max" in df.columns:
+        df[SALARY_COL] = salary_vnd_month(df, fx)
+        paid = df.dropna(subset=[SALARY_COL])
+        counts["salary"] = _sketch_frame(paid.groupby(CUBE_DIMS, sort=False), CUBE_DIMS)
+        by_city = tables.job_cities.rename(columns={"city": "city_guess"}).merge(
+            paid[["job_key", SALARY_COL] + CUBE_DIMS], on="job_key")
+        counts["salary_city"] = _sketch_frame(by_city.groupby(CUBE_DIMS + ["city_guess"], sort=False),
+                                              CUBE_DIMS + ["city_guess"])
+    if "confidence" in df.columns:
+        low = df[df["confidence"] < 0.5]
+        counts["low_conf"] = low[[c for c in LOW_CONF_COLS if c in low.columns]].reset_index(drop=True)
+    return counts
+
+def _sketch_frame(groups, keys: list, sketches: dict = None) -> pd.DataFrame:
+    # Cập nhật một KLL sketch cho mỗi nhóm; gọi nhiều lần với cùng dict sketches để chạy theo lô
+    sketches = {} if sketches is None else sketches
+    for key, g in groups:
+        sketches.setdefault(key, KLLSketch()).update_many(g[SALARY_COL].to_numpy())
+    rows = [(*k, sk.to_json()) for k, sk in sorted(sketches.items())]
+    return pd.DataFrame(rows, columns=keys + [SALARY_COL + SKETCH_SUFFIX])
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _lit(value: str) -> str:
+    # literal chuỗi SQL; CREATE VIEW của DuckDB không nhận tham số bind
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _duckdb_source(path) -> str:
+    path = Path(path)
+    if path.is_dir():
+        return f"read_parquet({_lit((path / '**' / '*.parquet').as_posix())}, hive_partitioning=true)"
+    if path.suffix.lower() == ".csv":
+        return f"read_csv_auto({_lit(path.as_posix())})"
+    return f"read_parquet({_lit(path.as_posix())})"
+
+def _duckdb_link_counts(con, col: str, fn, out_col: str, memo=None, decode=None) -> pd.DataFrame:
+    # Chỉ các giá trị distinct được kéo sang Python để chuẩn hóa; phép đếm chạy trong DuckDB
+    raw = con.execute(f"SELECT DISTINCT to_json({_q(col)}) AS k, {_q(col)} AS v FROM jobs "
+                      f"WHERE {_q(col)} IS NOT NULL").df()
+    lists = map_unique(raw["v"], fn, memo, "city") if out_col == "city_guess" else fn(raw["v"])
+    mapping = link_table(raw["k"], lists, out_col)
+    # giữ map đăng ký tới khi đóng kết nối để các truy vấn sau (lương theo city) dùng lại
+    con.register(f"{out_col}_map", mapping)
+    dims = ", ".join(f"j.{c}" for c in CUBE_DIMS)
+    res = con.execute(f"SELECT {dims}, m.{_q(out_col)}, count(*) AS count FROM jobs j "
+                      f"JOIN {out_col}_map m ON to_json(j.{_q(col)}) = m.k GROUP BY ALL").df()
+    if decode is not None:
+        # group-by chạy trên id số; chỉ kết quả được đổi lại thành tên
+        res[out_col] = decode(res[out_col])
+    return res
+
+def _duckdb_salary_sketches(con, sql: str, keys: list, batch: int = 100_000) -> pd.DataFrame:
+    # Đọc (keys, salary_vnd) theo từng record batch: một lượt, bộ nhớ không phụ thuộc số tin
+    sketches = {}
+    for rb in con.execute(sql).to_arrow_reader(batch):
+        _sketch_frame(rb.to_pandas().groupby(keys, sort=False), keys, sketches)
+    return _sketch_frame([], keys, sketches)
+
+def duckdb_counts(source, memo: BoundedMemo = None, fx: dict = None) -> dict:
+    """Cùng các bảng đếm như pandas_counts nhưng chạy SQL bằng DuckDB trên Parquet/CSV đã merge.
+
+    Dữ liệu không được nạp toàn bộ vào pandas: chỉ kết quả group-by và các giá trị distinct
+    của cột cần chuẩn hóa bằng Python (city, skills, languages, employment_type).
+    """
+    import duckdb
+
+    con = duckdb.connect()
+    con.execute(f"CREATE VIEW raw AS SELECT * FROM {_duckdb_source(source)}")
+    cols = [r[0] for r in con.execute("DESCRIBE raw").fetchall()]
+    replace = ([f"coalesce(nullif(CAST({_q(c)} AS VARCHAR), ''), 'Unknown') AS {_q(c)}" for c in FILL_COLS if c in cols] +
+               [f"TRY_CAST({_q(c)} AS DOUBLE) AS {_q(c)}" for c in NUMERIC_COLS if c in cols])
+    missing = "".join(f", 'Unknown' AS {c}" for c in CUBE_DIMS if c not in cols)
+    bad = ", ".join("'" + b.replace("'", "''") + "'" for b in sorted(BAD_INDUSTRIES))
+    where = f"(industry IS NULL OR CAST(industry AS VARCHAR) NOT IN ({bad}))"
+    if "duplicate_of" in cols:
+        where += " AND coalesce(CAST(duplicate_of AS VARCHAR), '') = ''"
+    con.execute(f"CREATE VIEW base AS SELECT * REPLACE ({', '.join(replace)}){missing} FROM raw WHERE {where}")
+    emp = con.execute("SELECT DISTINCT employment_type AS k FROM base").df()
+    emp["v"] = emp["k"].map(clean_employment_type)
+    con.register("employment_map", emp)
+    con.execute("CREATE VIEW jobs AS SELECT b.* REPLACE (m.v AS employment_type) FROM base b "
+                "JOIN employment_map m ON b.employment_type = m.k")
+
+    select = CUBE_DIMS + ["count(*) AS posts"]
+    for c in YEAR_COLS:
+        if c in cols:
+            select += [f"sum({c}) AS {c}_sum", f"count({c}) AS {c}_n"]
+    counts = {"jobs": con.execute(f"SELECT {', '.join(select)} FROM jobs GROUP BY ALL").df()}
+    links = [("city", "city_guess", normalize_city_series, None),
+             ("skill", "core_skills", skill_id_lists, skill_names),
+             ("language", "languages_required", lambda u: u.map(language_list), None)]
+    for name, col, fn, decode in links:
+        if col in cols:
+            counts[name] = _duckdb_link_counts(con, col, fn, col, memo, decode)
+        else:
+            counts[name] = pd.DataFrame(columns=CUBE_DIMS + [col, "count"])
+    if "company" in cols:
+        counts["company"] = con.execute("SELECT company, count(*) AS posts FROM jobs GROUP BY ALL").df()
+    if "min" in cols or "max" in cols:
+        lo = "min" if "min" in cols else "NULL::DOUBLE"
+        hi = "max" if "max" in cols else "NULL::DOUBLE"
+        rate = " ".join(f"WHEN {_lit(k)} THEN {float(v)}" for k, v in (fx or FX_TO_VND).items())
+        cur = "upper(coalesce(CAST(currency AS VARCHAR), 'VND'))" if "currency" in cols else "'VND'"
+        per = "CASE WHEN CAST(period AS VARCHAR) = 'year' THEN 12 ELSE 1 END" if "period" in cols else "1"
+        con.execute(f"CREATE VIEW paid AS SELECT * FROM (SELECT j.*, coalesce(({lo} + {hi}) / 2, {lo}, {hi}) "
+                    f"* (CASE {cur} {rate} END) / {per} AS {SALARY_COL} FROM jobs j) WHERE {SALARY_COL} > 0")
+        dims = ", ".join(f"p.{c}" for c in CUBE_DIMS)
+        counts["salary"] = _duckdb_salary_sketches(con, f"SELECT {dims}, p.{SALARY_COL} FROM paid p", CUBE_DIMS)
+        if "city_guess" in cols:
+            counts["salary_city"] = _duckdb_salary_sketches(
+                con, f"SELECT {dims}, m.city_guess, p.{SALARY_COL} FROM paid p "
+                     f"JOIN city_guess_map m ON to_json(p.city_guess) = m.k", CUBE_DIMS + ["city_guess"])
+    if "confidence" in cols:
+        keep = ", ".join(_q(c) for c in LOW_CONF_COLS if c in cols)
+        counts["low_conf"] = con.execute(f"SELECT {keep} FROM jobs WHERE confidence < 0.5").df()
+    con.close()
+    return counts
+
+def _rollup(frame: pd.DataFrame, keys: list) -> pd.DataFrame:
+    # Cộng dồn measure của cube về các chiều cần cho một sheet (bỏ crawl_date và chiều khác);
+    # sketch không cộng được mà được merge
+    agg = {c: "sum" for c in frame.columns if c in MEASURE_COLS}
+    agg.update({c: merge_json for c in frame.columns if c.endswith(SKETCH_SUFFIX)})
+    return frame.groupby(keys).agg(agg).reset_index()
+
+def _salary_quantiles(frame: pd.DataFrame, col: str) -> pd.DataFrame:
+    rows = _rollup(frame, [col])
+    sketches = rows[SALARY_COL + SKETCH_SUFFIX].map(KLLSketch.from_json)
+    out = pd.DataFrame({col: rows[col], "n": sketches.map(lambda sk: sk.n)})
+    qs = np.array([sk.quantiles(SALARY_QUANTILES) for sk in sketches]).reshape(len(out), -1)
+    for i, q in enumerate(SALARY_QUANTILES):
+        out[f"p{round(q * 100)}"] = qs[:, i].round()
+    return out.sort_values(["n", col], ascending=[False, True]).set_index(col)
+
+def _pivot(counts: pd.DataFrame, col: str) -> pd.DataFrame:
+    piv = counts.pivot_table(index="industry", columns=col, values="count", aggfunc="sum", fill_value=0)
+    return piv.reindex(piv.sum(axis=1).sort_values(ascending=False, kind="stable").index)
+
+def _ranked(counts: pd.DataFrame, col: str) -> pd.DataFrame:
+    return (counts.sort_values(["industry", "count", col], ascending=[True, False, True])
+            .reset_index(drop=True)[["industry", col, "count"]])
+
+def build_sheets(counts: dict) -> dict:
+    """Dựng các DataFrame cho từng sheet từ bảng đếm/cube (không phụ thuộc engine)."""
+    empty = pd.DataFrame()
+    jobs = counts["jobs"]
+    ind = _rollup(jobs, ["industry"]).set_index("industry")
+    by_industry = ind[["posts"]].copy()
+    totals = {}
+    for c, name in (("years_min", "avg_exp_min"), ("years_max", "avg_exp_max")):
+        if f"{c}_sum" in ind.columns:
+            n = ind[f"{c}_n"].sum()
+            totals[c] = float(ind[f"{c}_sum"].sum() / n) if n else np.nan
+            by_industry[name] = ind[f"{c}_sum"] / ind[f"{c}_n"].where(ind[f"{c}_n"] > 0)
+        else:
+            totals[c] = np.nan
+    by_industry = by_industry.sort_values("posts", ascending=False, kind="stable")
+
+    def link(name, col):
+        frame = counts.get(name, empty)
+        return _rollup(frame, ["industry", col]) if not frame.empty else empty
+
+    city, skills, langs = link("city", "city_guess"), link("skill", "core_skills"), link("language", "languages_required")
+    company = counts.get("company", empty)
+    overview = pd.DataFrame({
+        "metric": ["jobs","industries","companies","city","avg_years_min","avg_years_max"],
+        "value": [int(ind["posts"].sum()), len(ind), company["company"].nunique() if not company.empty else 0,
+                  city["city_guess"].nunique() if not city.empty else 0,
+                  totals["years_min"], totals["years_max"]]
+    })
+
+    seniority = _rollup(jobs, ["industry", "seniority"]).rename(columns={"posts": "count"})
+    emp = (_rollup(jobs, ["employment_type"])
+           .sort_values(["posts", "employment_type"], ascending=[False, True]))
+    employment_df = pd.DataFrame({"employment_type": emp["employment_type"].to_numpy(),
+                                  "percent": (emp["posts"] / emp["posts"].sum() * 100).round(2).to_numpy()})
+    salary, salary_city = counts.get("salary", empty), counts.get("salary_city", empty)
+    trend = empty
+    if "crawl_date" in jobs.columns:
+        trend = jobs.pivot_table(index="crawl_date", columns="industry", values="posts",
+                                 aggfunc="sum", fill_value=0).sort_index()
+    return {
+        "overview": overview,
+        "by_industry": by_industry,
+        "piv_sen": _pivot(seniority, "seniority") if not seniority.empty else empty,
+        "piv_city": _pivot(city, "city_guess") if not city.empty else empty,
+        "top_skills": _ranked(skills, "core_skills") if not skills.empty else empty,
+        "lang_stats": _ranked(langs, "languages_required") if not langs.empty else empty,
+        "low_conf": counts.get("low_conf", empty),
+        "employment_df": employment_df if not emp.empty else empty,
+        "trend": trend,
+        "salary_industry": _salary_quantiles(salary, "industry") if not salary.empty else empty,
+        "salary_city": _salary_quantiles(salary_city, "city_guess") if not salary_city.empty else empty,
+        "salary_seniority": _salary_quantiles(salary, "seniority") if not salary.empty else empty,
+    }
+
+def limit_sheets(sheets: dict, row_caps: dict = None, top_n: int = None) -> dict:
+    """Cắt sheet cho vừa Excel: top-N giá trị mỗi industry và giới hạn số dòng từng sheet.
+
+    row_caps: {tên sheet hoặc key trong sheets hoặc "*": số dòng tối đa}.
+    """
+    row_caps = row_caps or {}
+    out = dict(sheets)
+    if top_n:
+        for key in ("top_skills", "lang_stats"):
+            if not out[key].empty:
+                out[key] = out[key].groupby("industry", sort=False).head(top_n).reset_index(drop=True)
+    for key, frame in out.items():
+        name = SHEET_NAMES.get(key, key)
+        cap = row_caps.get(name, row_caps.get(key, row_caps.get("*", EXCEL_MAX_ROWS - 2)))
+        if len(frame) > cap:
+            print(f"{name}: cắt {len(frame)} -> {cap} dòng")
+            out[key] = frame.head(cap)
+    return out
+
+def parse_row_caps(spec: str) -> dict:
+    caps = {}
+    for part in (spec or "").split(","):
+        if part.strip():
+            name, _, n = part.partition("=")
+            caps[name.strip()] = int(n)
+    return caps
+
+def write_details(sheets: dict, root: Path, fmt: str = "parquet"):
+    """Ghi bản đầy đủ (chưa cắt) của từng sheet ra <root>_detail/<sheet>.<fmt>."""
+    out_dir = root.with_name(root.name + "_detail")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for key, frame in sheets.items():
+        if frame.empty:
+            continue
+        if frame.index.name is not None:
+            frame = frame.reset_index()
+        frame = frame.set_axis([str(c) for c in frame.columns], axis=1)
+        path = out_dir / f"{SHEET_NAMES.get(key, key)}.{fmt}"
+        if fmt == "csv":
+            frame.to_csv(path, index=False, encoding="utf-8-sig")
+        else:
+            frame.to_parquet(path, index=False)
+    return out_dir
+
+def _frame_cells(df: pd.DataFrame, startrow: int, startcol: int, index: bool):
+    # Ô (row, col, value) theo đúng thứ tự dòng, cùng bố cục như to_excel
+    header = ([df.index.name] if index else []) + list(df.columns)
+    for c, v in enumerate(header):
+        yield startrow, startcol + c, v
+    for r, row in enumerate(df.itertuples(index=index, name=None), start=startrow + 1):
+        for c, v in enumerate(row):
+            yield r, startcol + c, v
+
+def put_frames(xw, sheet_name: str, blocks: list, streaming: bool = False):
+    """Ghi các khối (df, startrow, startcol, index) vào một sheet.
+
+    Ở chế độ constant_memory không quay lại được dòng đã flush, nên các khối được
+    trộn theo (row, col) rồi ghi tuần tự thay vì gọi to_excel từng khối.
+    """
+    if not streaming:
+        for df, startrow, startcol, index in blocks:
+            df.to_excel(xw, sheet_name=sheet_name, startrow=startrow, startcol=startcol, index=index)
+        return
+    ws = xw.book.add_worksheet(sheet_name)
+    for r, c, v in heapq.merge(*(_frame_cells(*b) for b in blocks), key=lambda cell: cell[:2]):
+        if hasattr(v, "item"):
+            v = v.item()
+        if v is None or (pd.api.types.is_scalar(v) and pd.isna(v)):
+            continue
+        ws.write(r, c, v)
 
+def make_report(tables: ReportTables, out_xlsx: Path, out_txt: Path):
+    write_report(build_sheets(pandas_counts(tables)), out_xlsx, out_txt)
 
-   
-    if "employment_type" in df.columns:
-        df["employment_type"] = df["employment_type"].map(clean_employment_type)
-        employment_counts = df["employment_type"].value_counts(normalize=True).mul(100).round(2)
-        employment_df = employment_counts.rename_axis("employment_type").reset_index(name="percent")
-    else:
-        employment_df = pd.DataFrame()
+def write_report(sheets: dict, out_xlsx: Path, out_txt: Path, streaming: bool = False):
+    overview, by_industry = sheets["overview"], sheets["by_industry"]
+    piv_sen, piv_city = sheets["piv_sen"], sheets["piv_city"]
+    top_skills, lang_stats = sheets["top_skills"], sheets["lang_stats"]
+    low_conf, employment_df = sheets["low_conf"], sheets["employment_df"]
+    metrics = dict(zip(overview["metric"], overview["value"]))
 
-    with pd.ExcelWriter(out_xlsx, engine="xlsxwriter") as xw:
-        overview = pd.DataFrame({
-            "metric": ["jobs","industries","companies","city","avg_years_min","avg_years_max"],
-            "value": [n_jobs, n_industries, n_companies, n_city, avg_years_min, avg_years_max]
-        })
-        overview.to_excel(xw, index=False, sheet_name="00_Overview")
+    # streaming: xlsxwriter constant_memory, mỗi dòng được flush ra đĩa ngay khi ghi xong
+    engine_kwargs = {"options": {"constant_memory": True}} if streaming else None
+    with pd.ExcelWriter(out_xlsx, engine="xlsxwriter", engine_kwargs=engine_kwargs) as xw:
+        put_frames(xw, "00_Overview", [(overview, 0, 0, False)], streaming)
 
         if not by_industry.empty:
-            by_industry.to_excel(xw, sheet_name="01_ByIndustry")
+            put_frames(xw, "01_ByIndustry", [(by_industry, 0, 0, True)], streaming)
             ws = xw.sheets["01_ByIndustry"]
             wb = xw.book
             chart = wb.add_chart({"type":"column"})
@@ -283,7 +548,7 @@ def make_report(df: pd.DataFrame, out_xlsx: Path, out_txt: Path):
             ws.insert_chart("H2", chart)
 
         if not piv_sen.empty:
-            piv_sen.to_excel(xw, sheet_name="02_SeniorityPivot")
+            put_frames(xw, "02_SeniorityPivot", [(piv_sen, 0, 0, True)], streaming)
             ws2 = xw.sheets["02_SeniorityPivot"]
             wb = xw.book
             chart2 = wb.add_chart({"type":"column", "subtype": "stacked"})
@@ -300,14 +565,13 @@ def make_report(df: pd.DataFrame, out_xlsx: Path, out_txt: Path):
             ws2.insert_chart("H2", chart2)
 
         if not piv_city.empty:
-
-            piv_city.to_excel(xw, sheet_name="03_CityPivot")
-            ws3 = xw.sheets["03_CityPivot"]
             n_rows, n_cols = piv_city.shape
             city_totals = piv_city.sum(axis=0).sort_values(ascending=False).head(10)
 
-            # Xuất ra sheet 
-            city_totals.to_frame("TotalJobs").to_excel(xw, sheet_name="03_CityPivot", startrow=1, startcol=n_cols+2)
+            # Xuất ra sheet: pivot và bảng top 10 city bên phải
+            put_frames(xw, "03_CityPivot", [(piv_city, 0, 0, True),
+                                            (city_totals.to_frame("TotalJobs"), 1, n_cols+2, True)], streaming)
+            ws3 = xw.sheets["03_CityPivot"]
 
             # Vẽ chart dựa vào city_totals
             chart3 = wb.add_chart({"type": "column"})
@@ -331,12 +595,11 @@ def make_report(df: pd.DataFrame, out_xlsx: Path, out_txt: Path):
                 ws3.conditional_format(f"{start_cell}:{end_cell}", {"type":"3_color_scale"})
                 
         if not top_skills.empty:
-            top_skills.to_excel(xw, index=False, sheet_name="04_TopSkillsByIndustry")
+            put_frames(xw, "04_TopSkillsByIndustry", [(top_skills, 0, 0, False)], streaming)
         if not lang_stats.empty:
-            lang_stats.to_excel(xw, index=False, sheet_name="05_LanguagesByIndustry")
+            put_frames(xw, "05_LanguagesByIndustry", [(lang_stats, 0, 0, False)], streaming)
         if not low_conf.empty:
-            low_conf_cols = [c for c in ["name","company","industry","role_family","seniority","confidence","summary"] if c in low_conf.columns]
-            low_conf[low_conf_cols].to_excel(xw, index=False, sheet_name="06_LowConfidence")
+            put_frames(xw, "06_LowConfidence", [(low_conf, 0, 0, False)], streaming)
         # if not company_stats.empty:
         #     company_stats.to_excel(xw, sheet_name="07_TopCompanies")
 
@@ -356,7 +619,7 @@ def make_report(df: pd.DataFrame, out_xlsx: Path, out_txt: Path):
 
        
         if not employment_df.empty:
-            employment_df.to_excel(xw, sheet_name="08_EmploymentType", index=False)
+            put_frames(xw, "08_EmploymentType", [(employment_df, 0, 0, False)], streaming)
 
             ws8 = xw.sheets["08_EmploymentType"]
             wb = xw.book
@@ -369,33 +632,123 @@ def make_report(df: pd.DataFrame, out_xlsx: Path, out_txt: Path):
             chart_emp.set_title({"name": "Employment Type Percentage"})
             ws8.insert_chart("D2", chart_emp)
 
+        trend = sheets.get("trend", pd.DataFrame())
+        if not trend.empty:
+            put_frames(xw, "09_DailyTrend", [(trend, 0, 0, True)], streaming)
+            ws9 = xw.sheets["09_DailyTrend"]
+            wb = xw.book
+            chart_trend = wb.add_chart({"type": "line"})
+            n_rows = len(trend)
+            for idx, col in enumerate(trend.columns, start=1):
+                chart_trend.add_series({
+                    "name": col,
+                    "categories": ["09_DailyTrend", 1, 0, n_rows, 0],
+                    "values":     ["09_DailyTrend", 1, idx, n_rows, idx],
+                })
+            chart_trend.set_title({"name": "Posts per Crawl Date"})
+            chart_trend.set_x_axis({"name": "Crawl date"})
+            chart_trend.set_y_axis({"name": "Posts"})
+            ws9.insert_chart(1, len(trend.columns) + 2, chart_trend)
+
+        # 10-12. Lương VND/tháng (p10/p50/p90 từ KLL sketch)
+        for key in ("salary_industry", "salary_city", "salary_seniority"):
+            frame = sheets.get(key, pd.DataFrame())
+            if not frame.empty:
+                put_frames(xw, SHEET_NAMES[key], [(frame, 0, 0, True)], streaming)
+
     with open(out_txt, "w", encoding="utf-8") as w:
         w.write("=== INDUSTRY HIRING REPORT SUMMARY ===\n")
-        w.write(f"Total jobs: {n_jobs}\n")
-        w.write(f"Industries: {n_industries}\n")
-        w.write(f"Companies: {n_companies}\n")
-        if not math.isnan(avg_years_min): w.write(f"Avg years min: {avg_years_min:.2f}\n")
-        if not math.isnan(avg_years_max): w.write(f"Avg years max: {avg_years_max:.2f}\n")
+        w.write(f"Total jobs: {int(metrics['jobs'])}\n")
+        w.write(f"Industries: {int(metrics['industries'])}\n")
+        w.write(f"Companies: {int(metrics['companies'])}\n")
+        if not math.isnan(metrics["avg_years_min"]): w.write(f"Avg years min: {metrics['avg_years_min']:.2f}\n")
+        if not math.isnan(metrics["avg_years_max"]): w.write(f"Avg years max: {metrics['avg_years_max']:.2f}\n")
         # if not math.isnan(avg_salary_min): w.write(f"Avg salary min: {avg_salary_min:,.0f}\n")
         # if not math.isnan(avg_salary_max): w.write(f"Avg salary max: {avg_salary_max:,.0f}\n")
         # if not math.isnan(avg_conf): w.write(f"Avg confidence: {avg_conf:.2f}\n")
-        if "industry" in df.columns:
-            top = df["industry"].value_counts().head(5)
+        if not by_industry.empty:
+            top = by_industry["posts"].head(5)
             w.write("\nTop industries by posts:\n")
             for k,v in top.items():
                 w.write(f" - {k}: {v}\n")
 
+def read_merged(path) -> pd.DataFrame:
+    path = Path(path)
+    if path.is_dir() or path.suffix.lower() == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+def batch_key(path) -> str:
+    path = Path(path)
+    files = sorted(path.rglob("*.parquet")) if path.is_dir() else [path]
+    return file_fingerprint(*files)
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--merged", required=True, help="Merged CSV (jobs_with_llm.csv)")
+    ap.add_argument("--merged", default=None,
+                    help="Merged CSV/Parquet (jobs_with_llm.csv|.parquet); bỏ trống để dựng report từ --cubes")
     ap.add_argument("--out", default="jobs_industry_report", help="Output file root")
+    ap.add_argument("--memo", default=None, help="File memo chuẩn hóa city, giữ giữa các lần chạy")
+    ap.add_argument("--engine", choices=["pandas", "duckdb"], default="pandas",
+                    help="duckdb: chạy aggregate bằng SQL trên Parquet (file, thư mục dataset) hoặc CSV")
+    ap.add_argument("--cubes", default=None, help="Thư mục aggregate cube; batch --merged được cộng dồn vào đây")
+    ap.add_argument("--crawl-date", default=date.today().isoformat(), help="Ngày crawl của batch (YYYY-MM-DD)")
+    ap.add_argument("--streaming", action="store_true",
+                    help="Ghi xlsx ở chế độ constant_memory (từng dòng), cho report rất lớn")
+    ap.add_argument("--row-caps", default="",
+                    help="Giới hạn số dòng mỗi sheet, vd. 06_LowConfidence=10000,*=200000")
+    ap.add_argument("--top-n", type=int, default=None, help="Chỉ giữ top-N skill/language mỗi industry trong xlsx")
+    ap.add_argument("--detail", choices=["parquet", "csv"], default=None,
+                    help="Ghi thêm bản đầy đủ của từng sheet ra <out>_detail/")
+    ap.add_argument("--since", default=None, help="Khi dựng từ cube: chỉ lấy crawl_date >= ngày này")
+    ap.add_argument("--until", default=None, help="Khi dựng từ cube: chỉ lấy crawl_date <= ngày này")
+    ap.add_argument("--fx", default="", help="Tỷ giá quy đổi sang VND, vd. USD=25400,EUR=27500")
+    add_profile_arg(ap)
     args = ap.parse_args()
-
-    df = pd.read_csv(args.merged)
-    df = clean_data(df)
+    if not args.merged and not args.cubes:
+        ap.error("cần --merged hoặc --cubes")
+
+    code = [__file__, Path(__file__).resolve().parent / "src" / "gazetteer.py"]
+    memo = BoundedMemo(args.memo, fingerprint=file_fingerprint(*code)) if args.memo else None
+    fx = parse_fx(args.fx)
+    prof = Profiler("industry_report", args.profile)
+    if not args.merged:
+        with prof.section("load_cubes"):
+            counts = CubeStore(args.cubes).load(args.since, args.until)
+        if "jobs" not in counts:
+            ap.error(f"{args.cubes} chưa có cube nào")
+    elif args.engine == "duckdb":
+        with prof.section("counts"):
+            counts = duckdb_counts(args.merged, memo, fx)
+    else:
+        with prof.section("load"):
+            tables = clean_data(read_merged(args.merged), memo)
+        with prof.section("counts"):
+            counts = pandas_counts(tables, fx)
+        del tables
+    if memo is not None:
+        memo.save()
+    save_skill_canon()
+    if args.merged and args.cubes:
+        with prof.section("add_cubes"):
+            store = CubeStore(args.cubes)
+            added = store.add({k: counts[k] for k in CUBE_NAMES if k in counts}, args.crawl_date,
+                              batch_key(args.merged))
+        if added:
+            print(f"Cube: đã cộng batch {args.merged} ({args.crawl_date}) vào {args.cubes}")
+        else:
+            print(f"Cube: batch {args.merged} đã có trong {args.cubes}, bỏ qua")
     out_root = Path(args.out)
-    make_report(df, out_root.with_suffix(".xlsx"), out_root.with_suffix(".txt"))
+    with prof.section("sheets"):
+        sheets = build_sheets(counts)
+    if args.detail:
+        with prof.section("details"):
+            print(f"Detail -> {write_details(sheets, out_root, args.detail)}")
+    sheets = limit_sheets(sheets, parse_row_caps(args.row_caps), args.top_n)
+    with prof.section("write"):
+        write_report(sheets, out_root.with_suffix(".xlsx"), out_root.with_suffix(".txt"), args.streaming)
     print(f"Saved: {out_root.with_suffix('.xlsx')} and {out_root.with_suffix('.txt')}")
+    prof.finish(out_root)
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,17 @@
 import argparse
 import json
 import re
+import sys
+from collections import defaultdict
 from pathlib import Path
 import pandas as pd
+from rapidfuzz import fuzz, process
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
+from clean_data import parse_salary_frame
+from gazetteer import get_gazetteer
+from job_keys import job_id_from_link
+from profiling import Profiler, add_profile_arg
 
 def normalize_whitespace(s: str) -> str:
     if not isinstance(s, str):
@@ -90,54 +99,108 @@ def normalize_summary_row(d: dict) -> dict:
     out["skills"] = to_list(out.get("skills",""))
     return out
 
-CITY_MAP = {
-    "Hồ Chí Minh": ["Hồ Chí Minh", "TP.HCM", "TP HCM", "Thủ Đức", "Quận 1", "Quận 3", "Bình Thạnh", "Tân Bình", "Gò Vấp", "Phú Nhuận"],
-    "Hà Nội": ["Hà Nội", "Ha Noi", "Cầu Giấy", "Đống Đa", "Ba Đình", "Thanh Xuân", "Hoàng Mai", "Hà Đông", "Long Biên", "Nam Từ Liêm", "Bắc Từ Liêm","Ngô Quyền"],
-    "Đà Nẵng": ["Đà Nẵng", "Da Nang", "Hải Châu", "Sơn Trà", "Liên Chiểu", "Ngũ Hành Sơn", "Thanh Khê"]
-}
-
 def guess_city(s: str) -> str:
+    city = get_gazetteer().guess_city(s)
+    if city:
+        return city
     low = s.lower()
-    for canon, variants in CITY_MAP.items():
-        for v in variants:
-            if v.lower() in low:
-                return canon
     if "việt nam" in low or "vietnam" in low:
         parts = [p.strip() for p in s.split(",") if p.strip()]
         if len(parts) >= 2:
             return parts[-2]
     return ""
 
+def _job_id(d: dict) -> str:
+    jid = d.get("job_id")
+    if isinstance(jid, str) and jid.strip():
+        return jid.strip()
+    if jid is not None and not (isinstance(jid, float) and pd.isna(jid)):
+        return str(jid)
+    return job_id_from_link(d.get("link_job", ""))
+
+def fuzzy_fallback(df_sum: pd.DataFrame, df_cls: pd.DataFrame, threshold: int = 90) -> pd.Series:
+    """Ghép 1-1 bản ghi legacy (không có job_id) theo name_key, chặn theo 3 ký tự đầu.
+
+    Trả về Series index của df_sum -> index của df_cls (chỉ các dòng ghép được).
+    """
+    blocks = defaultdict(dict)
+    for idx, key in df_cls["name_key"].items():
+        blocks[key[:3]][idx] = key
+    pairs = {}
+    for idx, key in df_sum["name_key"].items():
+        candidates = blocks.get(key[:3])
+        if not candidates:
+            continue
+        best = process.extractOne(key, candidates, scorer=fuzz.ratio, score_cutoff=threshold)
+        if best:
+            _, _, cls_idx = best
+            pairs[idx] = cls_idx
+            del candidates[cls_idx]  # mỗi classification chỉ dùng một lần
+    return pd.Series(pairs, dtype=object)
+
+def merge_on_job_id(df_sum: pd.DataFrame, df_cls: pd.DataFrame, threshold: int = 90) -> pd.DataFrame:
+    # Hash join 1-1 theo job_id; classification trùng id thì giữ bản cuối. Bản legacy (job_id rỗng)
+    # giữ nguyên hết cho fuzzy_fallback
+    has_id = df_sum["job_id"] != ""
+    cls_has_id = df_cls["job_id"] != ""
+    id_cls = df_cls[cls_has_id].drop_duplicates(subset=["job_id"], keep="last")
+    merged_id = pd.merge(df_sum[has_id], id_cls.drop(columns=["name_key"]),
+                         on="job_id", how="left", suffixes=("","_llm"), validate="many_to_one")
+
+    legacy_sum = df_sum[~has_id]
+    legacy_cls = df_cls[~cls_has_id]
+    if legacy_sum.empty:
+        return merged_id
+    pairs = fuzzy_fallback(legacy_sum, legacy_cls, threshold)
+    right = legacy_cls.drop(columns=["job_id", "name_key"]).reindex(pairs.reindex(legacy_sum.index).values)
+    right.index = legacy_sum.index
+    merged_legacy = legacy_sum.join(right, rsuffix="_llm")
+    return pd.concat([merged_id, merged_legacy], ignore_index=True)
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--cls", required=True, help="Classifications JSON (array)")
     ap.add_argument("--sum", required=True, help="Summaries JSON (array)")
     ap.add_argument("--out", default="jobs_with_llm", help="Output file root (without extension)")
+    ap.add_argument("--fuzzy-threshold", type=int, default=90,
+                    help="Ngưỡng rapidfuzz khi ghép bản ghi legacy không có job_id")
+    add_profile_arg(ap)
     args = ap.parse_args()
-
-    with open(args.cls, "r", encoding="utf-8") as f:
-        cls = json.load(f)
-    with open(args.sum, "r", encoding="utf-8") as f:
-        sums = json.load(f)
-
-    cls_rows = [normalize_llm_row(r) for r in cls]
-    sum_rows = [normalize_summary_row(r) for r in sums]
-
-    df_cls = pd.DataFrame(cls_rows)
-    df_sum = pd.DataFrame(sum_rows)
-
-    df_cls["name_key"] = df_cls["name"].map(norm_name_key)
-    df_sum["name_key"] = df_sum["name"].map(norm_name_key)
-
-    merged = pd.merge(df_sum, df_cls, on="name_key", how="left", suffixes=("","_llm"))
+    prof = Profiler("merge_llm_and_summaries", args.profile)
+
+    with prof.section("load"):
+        with open(args.cls, "r", encoding="utf-8") as f:
+            cls = json.load(f)
+        with open(args.sum, "r", encoding="utf-8") as f:
+            sums = json.load(f)
+
+    with prof.section("normalize"):
+        cls_rows = [normalize_llm_row(r) for r in cls]
+        sum_rows = [normalize_summary_row(r) for r in sums]
+
+        df_cls = pd.DataFrame(cls_rows)
+        df_sum = pd.DataFrame(sum_rows)
+
+        df_cls["name_key"] = df_cls["name"].map(norm_name_key)
+        df_sum["name_key"] = df_sum["name"].map(norm_name_key)
+        df_cls["job_id"] = [_job_id(r) for r in cls_rows]
+        df_sum["job_id"] = [_job_id(r) for r in sum_rows]
+
+    with prof.section("merge"):
+        merged = merge_on_job_id(df_sum, df_cls, args.fuzzy_threshold)
+    if "salary" in merged.columns:
+        with prof.section("salary"):
+            sal = parse_salary_frame(merged["salary"].fillna("").astype(str))
+            merged[["currency", "min", "max", "period"]] = sal[["currency", "min", "max", "period"]]
    
    
     # Reorder
     preferred = [
-        "name","company","locations_joined","city_guess",
+        "job_id","name","company","locations_joined","city_guess",
         "industry","role_family","seniority","employment_type",
         "years_min","years_max","education_required","languages_required","core_skills",
-        "summary","confidence","name_key"
+        "summary","confidence","name_key","duplicate_of",
+        "salary","currency","min","max","period"
     ]
     merged = merged[[c for c in merged.columns if c in preferred]]
 
@@ -145,17 +208,19 @@ def main():
     # merged = merged[cols]
 
     out_root = Path(args.out)
-    merged.to_csv(out_root.with_suffix(".csv"), index=False, encoding="utf-8-sig")
-    try:
-        merged.to_parquet(out_root.with_suffix(".parquet"), index=False)
-    except Exception:
-        pass
+    with prof.section("write"):
+        merged.to_csv(out_root.with_suffix(".csv"), index=False, encoding="utf-8-sig")
+        try:
+            merged.to_parquet(out_root.with_suffix(".parquet"), index=False)
+        except Exception:
+            pass
 
     total = len(merged)
     matched = merged["industry"].notna().sum() if "industry" in merged.columns else 0
    
     print(f"Merged {total} jobs. LLM fields matched: {matched}.")
     print(f"Saved -> {out_root.with_suffix('.csv')}")
+    prof.finish(out_root)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,271 @@
+"""Chạy cả pipeline crawl -> clean / summarize -> classify -> merge -> report như một DAG.
+
+Mỗi stage là một script có sẵn, chạy bằng subprocess trong thư mục làm việc (--workdir) với
+tên file cố định. Khóa của stage là hash của:
+  - nội dung các file input (output của stage trước),
+  - code: script của stage + các module cục bộ nó import (đệ quy),
+  - tham số dòng lệnh (kể cả --args STAGE="...").
+Stage có khóa trùng lần chạy thành công trước và còn đủ output thì được bỏ qua. Các stage
+không phụ thuộc nhau (clean_data và nhánh LLM) chạy song song.
+
+Stage crawl không có input nên chỉ chạy lại khi code / tham số đổi, thiếu output, hoặc
+được yêu cầu bằng --force crawl.
+
+    python pipeline.py --workdir data                 # chạy mọi stage còn cũ
+    python pipeline.py --workdir data report --dry-run
+    python pipeline.py --workdir data --force crawl --args report="--engine duckdb"
+    python pipeline.py --workdir data --profile --force clean,report   # ghi <output>.profile.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import NamedTuple
+
+ROOT = Path(__file__).resolve().parent
+SRC = ROOT / "src"
+STATE_FILE = ".pipeline_state.json"
+_IMPORT_RE = re.compile(r"^\s*(?:from\s+(\w+)[\w.]*\s+import|import\s+(\w+))", re.M)
+
+
+class Stage(NamedTuple):
+    name: str
+    script: Path
+    args: list
+    inputs: list
+    outputs: list
+    deps: list
+    env: dict = {}
+
+
+STAGES = [
+    Stage("crawl", SRC / "crawl.py", [], [], ["vietnamworks.json"], []),
+    Stage("clean", SRC / "clean_data.py",
+          ["--in", "vietnamworks.json", "--out", "jobs_preprocessed", "--format", "parquet,csv"],
+          ["vietnamworks.json"], ["jobs_preprocessed.parquet", "jobs_preprocessed.csv"], ["crawl"]),
+    Stage("summarize", SRC / "job_summary.py", [], ["vietnamworks.json"], ["summarized_jobs1.json"], ["crawl"]),
+    Stage("classify", SRC / "Classification_job.py", [], ["summarized_jobs1.json"], ["classified_jobs.json"],
+          ["summarize"], {"VNW_SUMMARIES": "summarized_jobs1.json"}),
+    Stage("merge", ROOT / "merge_llm_and_summaries.py",
+          ["--cls", "classified_jobs.json", "--sum", "summarized_jobs1.json", "--out", "jobs_with_llm"],
+          ["classified_jobs.json", "summarized_jobs1.json"], ["jobs_with_llm.csv", "jobs_with_llm.parquet"],
+          ["classify"]),
+    Stage("report", ROOT / "industry_report.py", ["--merged", "jobs_with_llm.parquet", "--out", "jobs_industry_report"],
+          ["jobs_with_llm.parquet"], ["jobs_industry_report.xlsx", "jobs_industry_report.txt"], ["merge"]),
+]
+
+
+def code_files(script: Path) -> list:
+    """Script + mọi module cục bộ (trong crawl/ và crawl/src/) nó import, đệ quy."""
+    seen, todo = [], [script]
+    while todo:
+        path = todo.pop()
+        if path in seen:
+            continue
+        seen.append(path)
+        for a, b in _IMPORT_RE.findall(path.read_text(encoding="utf-8")):
+            for base in (path.parent, SRC, ROOT):
+                mod = base / f"{a or b}.py"
+                if mod.exists():
+                    todo.append(mod)
+                    break
+    return sorted(seen)
+
+
+class FileHashes:
+    """Hash nội dung file, nhớ theo (size, mtime) giữa các lần chạy để không đọc lại file lớn."""
+
+    def __init__(self, saved: dict):
+        self.saved = saved
+        self.lock = threading.Lock()
+
+    def __call__(self, path: Path) -> str:
+        if not path.exists():
+            return "missing"
+        st = path.stat()
+        key = str(path.resolve())
+        with self.lock:
+            cached = self.saved.get(key)
+        if cached and cached[:2] == [st.st_size, st.st_mtime_ns]:
+            return cached[2]
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        with self.lock:
+            self.saved[key] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+
+class Pipeline:
+    def __init__(self, workdir, extra_args: dict = None, jobs: int = 3):
+        self.workdir = Path(workdir)
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        (self.workdir / "logs").mkdir(exist_ok=True)
+        self.stages = {s.name: s._replace(args=s.args + (extra_args or {}).get(s.name, [])) for s in STAGES}
+        self.jobs = jobs
+        self.state_path = self.workdir / STATE_FILE
+        self.state = json.loads(self.state_path.read_text(encoding="utf-8")) if self.state_path.exists() else {}
+        self.state.setdefault("stages", {})
+        self.hash_file = FileHashes(self.state.setdefault("files", {}))
+        self.lock = threading.Lock()
+
+    def stage_key(self, stage: Stage) -> str:
+        h = hashlib.sha1()
+        for path in code_files(stage.script):
+            h.update(f"code:{path.relative_to(ROOT)}:{self.hash_file(path)}\n".encode())
+        h.update(f"args:{json.dumps(stage.args)}:{json.dumps(stage.env, sort_keys=True)}\n".encode())
+        for name in stage.inputs:
+            h.update(f"input:{name}:{self.hash_file(self.workdir / name)}\n".encode())
+        return h.hexdigest()
+
+    def up_to_date(self, stage: Stage) -> bool:
+        done = self.state["stages"].get(stage.name, {})
+        return (done.get("key") == self.stage_key(stage)
+                and all((self.workdir / o).exists() for o in stage.outputs))
+
+    def plan(self, targets=None) -> list:
+        """Các stage cần cho targets (kèm stage phụ thuộc), theo thứ tự topo."""
+        wanted, order = set(), []
+
+        def visit(name):
+            if name in wanted:
+                return
+            wanted.add(name)
+            for d in self.stages[name].deps:
+                visit(d)
+            order.append(name)
+
+        for name in targets or self.stages:
+            visit(name)
+        return order
+
+    def mark_done(self, names):
+        """Ghi nhận output hiện có của các stage là mới nhất (vd. file crawl chạy tay trước đó)."""
+        for name in names:
+            stage = self.stages[name]
+            missing = [o for o in stage.outputs if not (self.workdir / o).exists()]
+            if missing:
+                raise SystemExit(f"{name}: thiếu {', '.join(missing)}")
+            self.state["stages"][name] = {"key": self.stage_key(stage), "finished": "mark-done"}
+            print(f"[mark] {name}")
+        self._save_state()
+
+    def _record(self, stage: Stage, seconds: float):
+        with self.lock:
+            # khóa tính lại sau khi chạy để ghi nhận đúng input đã dùng
+            self.state["stages"][stage.name] = {"key": self.stage_key(stage),
+                                                "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                                "seconds": round(seconds, 1)}
+            self._save_state()
+
+    def _run_stage(self, stage: Stage) -> float:
+        log = self.workdir / "logs" / f"{stage.name}.log"
+        env = dict(os.environ, **stage.env, PYTHONIOENCODING="utf-8")
+        start = time.perf_counter()
+        with open(log, "w", encoding="utf-8") as out:
+            proc = subprocess.run([sys.executable, str(stage.script), *stage.args], cwd=self.workdir,
+                                  env=env, stdout=out, stderr=subprocess.STDOUT)
+        if proc.returncode:
+            raise RuntimeError(f"{stage.name} lỗi (exit {proc.returncode}), xem {log}")
+        missing = [o for o in stage.outputs if not (self.workdir / o).exists()]
+        if missing:
+            raise RuntimeError(f"{stage.name} không tạo ra {', '.join(missing)}, xem {log}")
+        return time.perf_counter() - start
+
+    def _save_state(self):
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.state, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.state_path)
+
+    def run(self, targets=None, force=(), dry_run: bool = False) -> bool:
+        order = self.plan(targets)
+        if dry_run:
+            # khóa của stage phía sau phụ thuộc output phía trước nên chỉ biết chắc sau khi chạy
+            for name in order:
+                stage = self.stages[name]
+                status = "force" if name in force else ("up-to-date" if self.up_to_date(stage) else "stale")
+                print(f"{name:10s} {status:10s} <- {', '.join(stage.deps) or '-'}")
+            return True
+
+        done, failed, running = set(), set(), {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while len(done) + len(failed) < len(order):
+                for name in order:
+                    stage = self.stages[name]
+                    if name in done or name in failed or name in running.values():
+                        continue
+                    if any(d in failed for d in stage.deps if d in order):
+                        print(f"[skip] {name}: stage phụ thuộc bị lỗi")
+                        failed.add(name)
+                        continue
+                    if not all(d in done for d in stage.deps if d in order):
+                        continue
+                    if name not in force and self.up_to_date(stage):
+                        print(f"[ok]   {name}: up-to-date")
+                        done.add(name)
+                        continue
+                    print(f"[run]  {name}")
+                    running[pool.submit(self._run_stage, stage)] = name
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    name = running.pop(fut)
+                    try:
+                        seconds = fut.result()
+                    except Exception as e:
+                        print(f"[fail] {name}: {e}")
+                        failed.add(name)
+                        continue
+                    self._record(self.stages[name], seconds)
+                    print(f"[done] {name} ({seconds:.1f}s)")
+                    done.add(name)
+        self._save_state()
+        return not failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Chạy pipeline crawl/clean/summarize/classify/merge/report")
+    ap.add_argument("targets", nargs="*", help=f"Stage cần chạy (kèm phụ thuộc): {', '.join(s.name for s in STAGES)}")
+    ap.add_argument("--workdir", default="data", help="Thư mục chứa mọi file trung gian và output")
+    ap.add_argument("--force", default="", help="Chạy lại các stage này dù đã up-to-date, vd. crawl,report")
+    ap.add_argument("--jobs", type=int, default=3, help="Số stage chạy song song tối đa")
+    ap.add_argument("--args", action="append", default=[], metavar='STAGE="..."',
+                    help='Tham số thêm cho một stage, vd. report="--engine duckdb --streaming"')
+    ap.add_argument("--dry-run", action="store_true", help="Chỉ in trạng thái các stage")
+    ap.add_argument("--mark-done", default="",
+                    help="Coi output hiện có của các stage này là mới nhất mà không chạy, vd. crawl")
+    ap.add_argument("--profile", nargs="?", const="cprofile,memory", default="", metavar="MODES",
+                    help="Truyền --profile=MODES cho mọi stage (xem src/profiling.py)")
+    args = ap.parse_args()
+
+    names = {s.name for s in STAGES}
+    extra = {s.name: [f"--profile={args.profile}"] for s in STAGES} if args.profile else {}
+    for spec in args.args:
+        name, _, rest = spec.partition("=")
+        if name not in names:
+            ap.error(f"stage không tồn tại: {name}")
+        extra[name] = extra.get(name, []) + shlex.split(rest)
+    force = {f.strip() for f in args.force.split(",") if f.strip()}
+    mark = [m.strip() for m in args.mark_done.split(",") if m.strip()]
+    unknown = (set(args.targets) | force | set(mark)) - names
+    if unknown:
+        ap.error(f"stage không tồn tại: {', '.join(sorted(unknown))}")
+
+    pipeline = Pipeline(args.workdir, extra, args.jobs)
+    if mark:
+        pipeline.mark_done(mark)
+    ok = pipeline.run(args.targets or None, force, args.dry_run)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
 
 import json
+import os
 import re
 from groq import Groq
 
+from job_record import intern_fields
+from profiling import Profiler, profile_requested
+
+# --profile hoặc VNW_PROFILE=1: ghi classified_jobs.profile.json
+prof = Profiler("Classification_job", profile_requested())
+
 # Khởi tạo client Groq với API key
 client = Groq(api_key="your_api_key")
 
@@ -21,9 +28,13 @@ models = [
 # Mark
 model_flags = [True] * len(models)
 
-# Đọc dữ liệu từ file JSON
-with open("../summarized_jobs_test.json", "r", encoding="utf-8") as file:
-    data = json.load(file)
+# Field lặp lại giữa các tin (input) và nhãn phân loại (output) được intern, xem job_record.py
+SUMMARY_INTERNED = ("company", "salary", "skills", "duplicate_of")
+CLASSIFIED_INTERNED = ("industry", "role_family", "seniority", "education_required", "employment_type")
+
+# Đọc dữ liệu từ file JSON (pipeline.py truyền đường dẫn qua VNW_SUMMARIES)
+with prof.section("load"), open(os.environ.get("VNW_SUMMARIES", "../summarized_jobs_test.json"), "r", encoding="utf-8") as file:
+    data = [intern_fields(r, SUMMARY_INTERNED) for r in json.load(file)]
 
 def guess_industry_from_summary(summary: str) -> str:
     """
@@ -175,9 +186,17 @@ def parse_output_loose(text):
 
 
 classified_jobs = []
+# job_id đại diện -> kết quả phân loại; tin gần trùng (duplicate_of, do job_summary.py gán)
+# dùng lại kết quả của tin đại diện thay vì gọi LLM lần nữa
+results_by_id = {}
 
 for index, job in enumerate(data, start=1):
     name = job.get("name", f"Job {index}")
+    dup_of = job.get("duplicate_of")
+    if dup_of and dup_of in results_by_id:
+        print(f"Job {index} gần trùng {dup_of}, dùng lại kết quả phân loại")
+        classified_jobs.append(dict(results_by_id[dup_of], job_id=job.get("job_id", ""), name=name))
+        continue
     summary_for_llm = job.get("summary", "")
     skills = job.get("skills", "")
 
@@ -247,24 +266,25 @@ Skills (optional): {skills}
     classification = None
     used_model = None
 
-    for i, model in enumerate(models):
-        if not model_flags[i]:
-            continue
+    with prof.section("llm"):
+        for i, model in enumerate(models):
+            if not model_flags[i]:
+                continue
 
-        try:
-            response = client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model=model,
-            )
+            try:
+                response = client.chat.completions.create(
+                    messages=[{"role": "user", "content": prompt}],
+                    model=model,
+                )
 
-            classification = response.choices[0].message.content.strip()
-            used_model = model
-            print(f"Job {index} classified using model {used_model}")
-            break
+                classification = response.choices[0].message.content.strip()
+                used_model = model
+                print(f"Job {index} classified using model {used_model}")
+                break
 
-        except Exception as e:
-            print(f"Model {model} lỗi: {e}")
-            model_flags[i] = False
+            except Exception as e:
+                print(f"Model {model} lỗi: {e}")
+                model_flags[i] = False
 
     if classification:
         try:
@@ -284,6 +304,7 @@ Skills (optional): {skills}
         parsed_result = {}
 
     classified_job = {
+        "job_id": job.get("job_id", ""),
         "name": name,
         "industry": parsed_result.get("industry", "Unknown"),
         "role_family": parsed_result.get("role_family", "Unknown"),
@@ -296,8 +317,11 @@ Skills (optional): {skills}
         "confidence": parsed_result.get("confidence", 0.0)
     }
 
-    classified_jobs.append(classified_job)
+    classified_jobs.append(intern_fields(classified_job, CLASSIFIED_INTERNED))
+    if classified_job["job_id"]:
+        results_by_id[classified_job["job_id"]] = classified_job
 
 # Ghi ra file kết quả
-with open("classified_jobs.json", "w", encoding="utf-8") as outfile:
+with prof.section("write"), open("classified_jobs.json", "w", encoding="utf-8") as outfile:
     json.dump(classified_jobs, outfile, ensure_ascii=False, indent=2)
+prof.finish("classified_jobs.json")
@@ -0,0 +1,92 @@
+import argparse
+import random
+import time
+
+import pandas as pd
+
+import clean_data as cd
+from unique_map import map_unique
+
+# Giá trị mẫu lấy từ dữ liệu crawl thật, dùng để sinh dữ liệu benchmark
+SAMPLE_SALARY = ["15tr-25tr ₫/tháng", "Thương lượng", "$500 - $1000", "Thỏa thuận", "8 - 12 triệu",
+                 "1,000 - 2,000 USD", "20tr ₫/tháng", "500k - 800k", "Negotiable", "30 - 40 /năm", ""]
+SAMPLE_DATE = ["17/09/2025", "03/10/25", "2025-09-01", "01-02-2025", "Information is missed", ""]
+SAMPLE_CAREER = ["Kinh Doanh>Bán Hàng Kỹ Thuật", "CNTT - Phần Mềm>Java", "Kế Toán", "", "Hành Chính > Thư Ký"]
+SAMPLE_EXP = ["1", "Không yêu cầu", "2-5", "Tối thiểu 3 năm", "3 5", "", "Information is missed", "10"]
+SAMPLE_LOC = [
+    ["Tòa nhà Thành Đạt 1, số 3 Lê Thánh Tông, phường Máy Tơ, Quận Ngô Quyền"],
+    ["Quận 1, TP.HCM", "Cầu Giấy, Hà Nội"],
+    "Địa Điểm Làm Việc: Hà Nội | Hưng Yên | Hà Nam",
+    ["Dong Van II IZ, Duy Tien, Ha Nam, Việt Nam"],
+    ["Information is missed"],
+    [],
+]
+
+def make_frame(n, seed=0):
+    rnd = random.Random(seed)
+    return pd.DataFrame({
+        "salary": [rnd.choice(SAMPLE_SALARY) for _ in range(n)],
+        "upload_date": [rnd.choice(SAMPLE_DATE) for _ in range(n)],
+        "career": [rnd.choice(SAMPLE_CAREER) for _ in range(n)],
+        "minimum_years_of_experience": [rnd.choice(SAMPLE_EXP) for _ in range(n)],
+        "locations": [rnd.choice(SAMPLE_LOC) for _ in range(n)],
+    })
+
+def run_per_row(df):
+    out = {"upload_date_iso": df["upload_date"].map(cd.parse_date_any)}
+    sal = df["salary"].map(cd.parse_salary).apply(pd.Series)
+    locs = df["locations"].map(cd.standardize_locations).apply(pd.Series)
+    locs.columns = ["locations_joined", "city_guess"]
+    career = df["career"].map(cd.split_career).apply(pd.Series)
+    career.columns = ["career_main", "career_sub"]
+    exp = df["minimum_years_of_experience"].map(cd.parse_experience).apply(pd.Series)
+    exp.columns = ["years_min", "years_max"]
+    return pd.concat([pd.DataFrame(out), sal, locs, career, exp], axis=1)
+
+def run_vectorized(df):
+    out = {"upload_date_iso": cd.parse_date_series(df["upload_date"])}
+    return pd.concat([
+        pd.DataFrame(out),
+        cd.parse_salary_frame(df["salary"]),
+        cd.standardize_locations_frame(df["locations"]),
+        cd.split_career_frame(df["career"]),
+        cd.parse_experience_frame(df["minimum_years_of_experience"]),
+    ], axis=1)
+
+def run_dict_encoded(df):
+    out = {"upload_date_iso": map_unique(df["upload_date"], cd.parse_date_series)}
+    return pd.concat([
+        pd.DataFrame(out),
+        map_unique(df["salary"], cd.parse_salary_frame),
+        map_unique(df["locations"], cd.standardize_locations_frame),
+        map_unique(df["career"], cd.split_career_frame),
+        map_unique(df["minimum_years_of_experience"], cd.parse_experience_frame),
+    ], axis=1)
+
+def timed(fn, df):
+    t0 = time.perf_counter()
+    res = fn(df)
+    return res, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description="So sánh transform per-row với bản vectorized")
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--skip-per-row-above", type=int, default=None,
+                    help="Bỏ qua bản per-row với số dòng lớn hơn (nó rất chậm)")
+    args = ap.parse_args()
+
+    print(f"{'rows':>10} {'per-row (s)':>12} {'vectorized (s)':>15} {'dict-encoded (s)':>17} {'speedup':>8}")
+    for n in [int(x) for x in args.sizes.split(",")]:
+        df = make_frame(n)
+        vec, t_vec = timed(run_vectorized, df)
+        enc, t_enc = timed(run_dict_encoded, df)
+        pd.testing.assert_frame_equal(enc, vec)
+        if args.skip_per_row_above is not None and n > args.skip_per_row_above:
+            print(f"{n:>10} {'-':>12} {t_vec:>15.2f} {t_enc:>17.2f} {'-':>8}")
+            continue
+        ref, t_ref = timed(run_per_row, df)
+        pd.testing.assert_frame_equal(vec, ref, check_dtype=False)
+        print(f"{n:>10} {t_ref:>12.2f} {t_vec:>15.2f} {t_enc:>17.2f} {t_ref / min(t_vec, t_enc):>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,30 @@
 import argparse
+import csv
+import hashlib
 import json
+import os
 import re
+import shutil
 import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as pds
+import pyarrow.parquet as pq
 
-VN_DATE_FORMATS = ["%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d"]
+from gazetteer import get_gazetteer
+from job_keys import job_id_from_link
+from profiling import Profiler, add_profile_arg
+from skill_canon import get_skill_canon, save_skill_canon
+from unique_map import BoundedMemo, file_fingerprint, map_unique
 
-CITY_MAP = {
-    "Hồ Chí Minh": ["Hồ Chí Minh", "TP HCM", "TP.HCM", "TP. HCM", "Ho Chi Minh", "Tp Hồ Chí Minh"],
-    "Hà Nội": ["Hà Nội", "Ha Noi", "Hanoi"],
-    "Đà Nẵng": ["Đà Nẵng", "Da Nang"],
-    "Bình Dương": ["Bình Dương"],
-    "Đồng Nai": ["Đồng Nai"],
-    "Hải Phòng": ["Hải Phòng", "Hai Phong"],
-    "Cần Thơ": ["Cần Thơ", "Can Tho"],
-}
+VN_DATE_FORMATS = ["%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d"]
 
 def normalize_text(s: str) -> str:
     if not isinstance(s, str):
@@ -91,6 +98,10 @@ def split_skills(s: str):
             seen.add(key); out.append(p)
     return out
 
+def canonical_skill_lists(s: pd.Series) -> pd.Series:
+    """split_skills rồi chuẩn hóa tên skill (skill_canon) cho cả cột trong một lượt."""
+    return pd.Series(get_skill_canon().canonicalize_lists(s.map(split_skills)), index=s.index, dtype=object)
+
 def parse_benefits(val):
     if isinstance(val, list):
         raw = " ".join([normalize_text(x) for x in val])
@@ -124,14 +135,8 @@ def standardize_locations(val):
     else:
         arr = []
     joined = "; ".join([x for x in arr if x])
-    city = ""
+    city = get_gazetteer().guess_city(joined)
     low = joined.lower()
-    for canonical, variants in CITY_MAP.items():
-        for v in variants:
-            if v.lower() in low:
-                city = canonical
-                break
-        if city: break
     if not city and "việt nam" in low:
         before = joined.split(",")
         if len(before) >= 2:
@@ -164,74 +169,635 @@ def split_career(s: str):
     sub = parts[1] if len(parts) > 1 else ""
     return main, sub
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--in", dest="input", default="vietnamworks_test.json")
-    ap.add_argument("--out", dest="output", default="jobs_preprocessed")
-    args = ap.parse_args()
+# ---------- Vectorized column transforms ----------
+# Cùng kết quả với các hàm per-row ở trên nhưng chạy trên cả cột một lần,
+# tránh .map(...).apply(pd.Series) dựng một Series cho mỗi dòng.
 
-    with open(args.input, "r", encoding="utf-8") as f:
-        data = json.load(f)
+_NEGOTIABLE_RE = r"thỏa thuận|tho[aâ]? thu[aâ]n|negotiable"
+_MILLION_RE = r"\b(?:triệu|tr|million)\b"
+_THOUSAND_RE = r"(?<![A-Za-z])[kK]\b|nghìn|ngan"
+_PERIOD_MONTH_RE = r"/\s*(?:mo|month)|theo tháng|/tháng"
+_PERIOD_YEAR_RE = r"/\s*(?:yr|year)|/năm|theo năm"
 
-    jobs = data.get("jobs", [])
-    df = pd.DataFrame(jobs)
+def _as_int_if_complete(s: pd.Series) -> pd.Series:
+    # giống apply(pd.Series): cột toàn int -> int64, có None -> float64
+    if len(s) and s.notna().all():
+        return s.astype("int64")
+    return s
+
+def normalize_text_series(s: pd.Series) -> pd.Series:
+    # object thay cho dtype str (Arrow) của pandas >= 3: regex của .str trên Arrow theo RE2, \s / \b
+    # chỉ hiểu ASCII nên lệch với normalize_text / parse_salary; các frame bên dưới dùng lại kết quả này
+    try:
+        out = (s.astype(object).str.replace("\xa0", " ", regex=False)
+                .str.replace(r"\s+", " ", regex=True)
+                .str.strip()
+                .str.normalize("NFC"))
+    except AttributeError:
+        # cột không có giá trị chuỗi nào (toàn list/None)
+        return pd.Series("", index=s.index, dtype=object)
+    return out.fillna("")
+
+def parse_date_series(s: pd.Series) -> pd.Series:
+    st = normalize_text_series(s)
+    out = pd.Series(pd.NaT, index=st.index, dtype="datetime64[ns]")
+    for fmt in VN_DATE_FORMATS + ["%d-%m-%Y"]:
+        out = out.fillna(pd.to_datetime(st, format=fmt, errors="coerce"))
+    return out.dt.date
+
+def parse_salary_frame(s: pd.Series) -> pd.DataFrame:
+    st = normalize_text_series(s).reset_index(drop=True)
+    low = st.str.lower()
+    skip = st.eq("") | st.str.contains(_NEGOTIABLE_RE, case=False, regex=True)
+
+    conds = [low.str.contains(k, regex=False) for k in _CURRENCY]
+    cur = pd.Series(np.select(conds, list(_CURRENCY.values()), default="VND"))
+    cur = cur.where(~skip)
+
+    nums = (st.str.extractall(r"(\d[\d,\.]*)")[0]
+              .str.replace(r"[,.]", "", regex=True)
+              .astype(float))
+    g = nums.groupby(level=0)
+    lo = g.min().reindex(st.index)
+    hi = g.max().reindex(st.index)
+    has_nums = lo.notna() & ~skip
+
+    vnd = cur.eq("VND")
+    million = st.str.contains(_MILLION_RE, case=False, regex=True)
+    thousand = st.str.contains(_THOUSAND_RE, case=False, regex=True)
+    loose = lo.between(1, 300) & low.str.contains(r"đ|vnd|₫|tr", regex=True)
+    factor = np.select([vnd & million, vnd & thousand, vnd & loose], [1_000_000, 1_000, 1_000_000], default=1)
+
+    is_month = st.str.contains(_PERIOD_MONTH_RE, case=False, regex=True)
+    is_year = st.str.contains(_PERIOD_YEAR_RE, case=False, regex=True)
+    period = np.where(has_nums & ~is_month & is_year, "year", "month")
+
+    out = pd.DataFrame({
+        "salary_text": st,
+        "currency": cur,
+        "min": _as_int_if_complete(np.trunc(lo * factor).where(has_nums)),
+        "max": _as_int_if_complete(np.trunc(hi * factor).where(has_nums)),
+        "period": period,
+    })
+    out.index = s.index
+    return out
+
+def standardize_locations_frame(s: pd.Series) -> pd.DataFrame:
+    pos = s.reset_index(drop=True)
+    flat = normalize_text_series(pos.explode())
+    flat = flat[flat != ""]
+    joined = flat.groupby(level=0, sort=False).agg("; ".join).reindex(pos.index).fillna("")
+
+    low = joined.str.lower()
+    city = joined.map(get_gazetteer().guess_city)
+
+    parts = joined.str.split(",")
+    fallback = city.eq("") & low.str.contains("việt nam", regex=False) & parts.str.len().ge(2)
+    city = city.mask(fallback, normalize_text_series(parts.str[-2]))
+
+    out = pd.DataFrame({"locations_joined": joined, "city_guess": city})
+    out.index = s.index
+    return out
+
+def split_career_frame(s: pd.Series) -> pd.DataFrame:
+    parts = normalize_text_series(s).str.split(">")
+    return pd.DataFrame({
+        "career_main": parts.str[0].str.strip().fillna("").astype(str),
+        "career_sub": parts.str[1].str.strip().fillna("").astype(str),
+    }, index=s.index)
+
+def parse_experience_frame(s: pd.Series) -> pd.DataFrame:
+    st = normalize_text_series(s)
+    nums = st.str.findall(r"\d+")
+    cnt = nums.str.len()
+    n0 = pd.to_numeric(nums.str[0])
+    n1 = pd.to_numeric(nums.str[1])
+
+    zero = st.ne("") & st.str.contains(r"không yêu cầu|no\s+experience", case=False, regex=True)
+    dash = st.str.contains("-|–", regex=True)
+    at_least = st.str.contains(r"tối thiểu|min", case=False, regex=True)
+
+    years_min = n0.mask(zero, 0)
+    years_max = pd.Series(np.select(
+        [zero, cnt.eq(0), dash, at_least, cnt.eq(1)],
+        [0, np.nan, n1, np.nan, n0],
+        default=n1,
+    ), index=st.index)
+    return pd.DataFrame({
+        "years_min": _as_int_if_complete(years_min.astype(float)),
+        "years_max": _as_int_if_complete(years_max),
+    })
+
+TEXT_COLS = ["name","salary","upload_date","expiration_date","company","job_position","field",
+             "language_cv","minimum_years_of_experience","career","description","requirements","link_job"]
+
+# Cột có ít giá trị distinct: chuẩn hóa trên giá trị duy nhất rồi broadcast lại
+LOW_CARD_COLS = {"salary","upload_date","expiration_date","company","job_position","field",
+                 "language_cv","minimum_years_of_experience","career"}
+
+PREFERRED_COLS = [
+    "job_id","name","company","field","career","career_main","career_sub",
+    "job_position","language_cv","minimum_years_of_experience","years_min","years_max",
+    "salary","currency","min","max","period",
+    "upload_date","upload_date_iso","expiration_date","expiration_date_iso",
+    "locations","locations_joined","city_guess",
+    "skills","benefits_list",
+    "description","requirements","link_job"
+]
+
+# Tỷ giá quy đổi lương sang VND; các script nhận --fx để ghi đè
+FX_TO_VND = {"VND": 1, "USD": 25_000, "EUR": 27_000}
+
+def parse_fx(spec: str) -> dict:
+    """"USD=25400,EUR=27500" -> FX_TO_VND đã ghi đè các tỷ giá đó."""
+    fx = dict(FX_TO_VND)
+    for part in filter(str.strip, (spec or "").split(",")):
+        cur, _, rate = part.partition("=")
+        fx[cur.strip().upper()] = float(rate)
+    return fx
+
+def salary_range_vnd_month(df: pd.DataFrame, fx: dict = None) -> pd.DataFrame:
+    """min/max/currency/period (output parse_salary_frame) -> khoảng lương lo/hi theo VND/tháng.
+
+    Thiếu currency coi như VND; lương theo năm chia 12; giá trị <= 0 hoặc tiền tệ lạ -> NaN.
+    """
+    fx = fx or FX_TO_VND
+    nan = pd.Series(np.nan, index=df.index)
+    cur = df["currency"] if "currency" in df.columns else pd.Series("VND", index=df.index)
+    rate = cur.fillna("VND").astype(str).str.upper().map(fx)
+    per_year = df["period"].astype(str).eq("year") if "period" in df.columns else nan.notna()
+    scale = rate / np.where(per_year, 12, 1)
+    out = {}
+    for key, col in (("lo", "min"), ("hi", "max")):
+        v = pd.to_numeric(df[col], errors="coerce") * scale if col in df.columns else nan
+        out[key] = v.where(v > 0)
+    return pd.DataFrame(out, index=df.index)
+
+# Kiểu Arrow cố định cho output (mọi row group / partition phải cùng schema)
+INT_COLS = {"min","max","years_min","years_max"}
+DATE_COLS = {"upload_date_iso","expiration_date_iso"}
+LIST_COLS = {"locations","benefits","skills","benefits_list"}
+CATEGORY_COLS = {"city_guess","currency","period","career","career_main","career_sub",
+                 "field","job_position","language_cv"}
 
-    text_cols = ["name","salary","upload_date","expiration_date","company","job_position","field",
-                 "language_cv","minimum_years_of_experience","career","description","requirements","link_job"]
-    for c in text_cols:
-        if c in df.columns:
-            df[c] = df[c].map(normalize_text)
+OUTPUT_FORMATS = ("parquet", "csv", "json", "dataset")
+PARTITION_COLS = ["upload_month", "city_guess"]
+
+def canonicalize_skills(df: pd.DataFrame, memo: BoundedMemo = None) -> pd.DataFrame:
+    # SkillCanon học tên chuẩn dần theo skill đã gặp, nên bước này chạy tuần tự theo thứ tự chunk
+    # (ở process cha khi --workers) để output không phụ thuộc cách chia chunk cho worker
+    if "skill" in df.columns:
+        df["skills"] = map_unique(df["skill"], canonical_skill_lists, memo, "skills")
+    return df
+
+def transform(df: pd.DataFrame, memo: BoundedMemo = None, skills: bool = True) -> pd.DataFrame:
+    for c in TEXT_COLS:
+        if c in LOW_CARD_COLS and c in df.columns:
+            df[c] = map_unique(df[c], normalize_text_series)
+        elif c in df.columns:
+            df[c] = normalize_text_series(df[c])
 
     if "upload_date" in df.columns:
-        df["upload_date_iso"] = df["upload_date"].map(parse_date_any)
+        df["upload_date_iso"] = map_unique(df["upload_date"], parse_date_series, memo, "date")
     if "expiration_date" in df.columns:
-        df["expiration_date_iso"] = df["expiration_date"].map(parse_date_any)
+        df["expiration_date_iso"] = map_unique(df["expiration_date"], parse_date_series, memo, "date")
 
     if "salary" in df.columns:
-        sal = df["salary"].map(parse_salary).apply(pd.Series)
-        df = pd.concat([df, sal], axis=1)
+        df = pd.concat([df, map_unique(df["salary"], parse_salary_frame, memo, "salary")], axis=1)
 
-    if "skill" in df.columns:
-        df["skills"] = df["skill"].map(split_skills)
+    if skills:
+        df = canonicalize_skills(df, memo)
 
     if "benefits" in df.columns:
         df["benefits_list"] = df["benefits"].map(parse_benefits)
 
     if "locations" in df.columns:
-        locs = df["locations"].map(standardize_locations).apply(pd.Series)
-        locs.columns = ["locations_joined","city_guess"]
-        df = pd.concat([df, locs], axis=1)
+        df = pd.concat([df, map_unique(df["locations"], standardize_locations_frame, memo, "locations")], axis=1)
 
     if "career" in df.columns:
-        career_split = df["career"].map(split_career).apply(pd.Series)
-        career_split.columns = ["career_main","career_sub"]
-        df = pd.concat([df, career_split], axis=1)
+        df = pd.concat([df, map_unique(df["career"], split_career_frame, memo, "career")], axis=1)
 
     if "minimum_years_of_experience" in df.columns:
-        exp = df["minimum_years_of_experience"].map(parse_experience).apply(pd.Series)
-        exp.columns = ["years_min","years_max"]
+        exp = map_unique(df["minimum_years_of_experience"], parse_experience_frame, memo, "experience")
         df = pd.concat([df, exp], axis=1)
 
+    if "link_job" in df.columns:
+        df["job_id"] = df["link_job"].map(job_id_from_link)
+    return df
+
+def order_columns(df: pd.DataFrame) -> pd.DataFrame:
+    cols = [c for c in PREFERRED_COLS if c in df.columns] + [c for c in df.columns if c not in PREFERRED_COLS]
+    return df[cols]
+
+# ---------- Streaming mode ----------
+
+def iter_jobs(path: str):
+    """Đọc từng job một: JSONL (mỗi dòng một job) hoặc {"jobs": [...]} qua ijson."""
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        return
+    try:
+        import ijson
+    except ImportError:
+        print("ijson chưa được cài, đọc toàn bộ file bằng json.load (không giới hạn bộ nhớ)")
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f).get("jobs", [])
+        return
+    with open(path, "rb") as f:
+        for job in ijson.items(f, "jobs.item", use_float=True):
+            yield job
+
+def iter_chunks(items, size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _link_hash(link: str) -> int:
+    return int.from_bytes(hashlib.blake2b(link.encode("utf-8"), digest_size=8).digest(), "little")
+
+class LinkHashSet:
+    """Tập hash 64-bit của link_job đã ghi: mảng uint64 đã sắp xếp, 8 byte mỗi link."""
+
+    def __init__(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        if not len(self.hashes):
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.searchsorted(self.hashes, hashes).clip(max=len(self.hashes) - 1)
+        return self.hashes[pos] == hashes
+
+    def add(self, hashes: np.ndarray):
+        self.hashes = np.union1d(self.hashes, hashes)
+
+def arrow_schema(columns, dictionary: bool = True) -> pa.Schema:
+    fields = []
+    for c in columns:
+        if c in INT_COLS:
+            fields.append(pa.field(c, pa.int64()))
+        elif c in DATE_COLS:
+            fields.append(pa.field(c, pa.date32()))
+        elif c in LIST_COLS:
+            fields.append(pa.field(c, pa.list_(pa.string())))
+        elif c in CATEGORY_COLS and dictionary:
+            fields.append(pa.field(c, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(c, pa.string()))
+    return pa.schema(fields)
+
+class OutputWriter:
+    """Ghi các DataFrame đã chuẩn hóa ra các format được chọn, từng block một."""
+
+    def __init__(self, root, formats=("parquet", "csv", "json"), append: bool = False, run_id: str = "0"):
+        self.root = Path(root)
+        self.formats = [f for f in OUTPUT_FORMATS if f in formats]
+        self.append = append  # chỉ áp dụng cho dataset: thêm file mới, không xóa dữ liệu cũ
+        self.run_id = run_id
+        self.schema = self.parquet = self.csv = self.json = None
+        self.rows = 0
+        self.parts = 0
+
+    @property
+    def dataset_dir(self) -> Path:
+        return Path(str(self.root) + "_dataset")
+
+    def _open(self, columns):
+        self.schema = arrow_schema(columns)
+        if "parquet" in self.formats:
+            self.parquet = pq.ParquetWriter(str(self.root) + ".parquet", self.schema)
+        if "csv" in self.formats:
+            self.csv = open(str(self.root) + ".csv", "w", encoding="utf-8-sig", newline="")
+        if "json" in self.formats:
+            self.json = open(str(self.root) + ".json", "w", encoding="utf-8")
+            self.json.write("[")
+        if "dataset" in self.formats and not self.append and self.dataset_dir.exists():
+            shutil.rmtree(self.dataset_dir)
+
+    def write(self, df: pd.DataFrame):
+        if self.schema is None:
+            self._open(list(df.columns))
+        new = [c for c in df.columns if c not in self.schema.names]
+        if new:
+            self._widen(self.schema.names + new)
+        if df.empty:
+            return
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self.parquet is not None:
+            self.parquet.write_table(table)
+        if self.csv is not None:
+            df.to_csv(self.csv, index=False, header=(self.rows == 0))
+        if self.json is not None:
+            body = df.to_json(orient="records", force_ascii=False, indent=2)[1:-1].rstrip("\n")
+            self.json.write(("," if self.rows else "") + body)
+        if "dataset" in self.formats:
+            self._write_partitions(table)
+        self.rows += len(df)
+
+    def _widen(self, columns):
+        """Cột xuất hiện giữa chừng (--stream): mở rộng schema, chép lại phần parquet / csv đã ghi với
+        cột mới rỗng. JSON không cần; part cũ của dataset giữ schema cũ (load_current gộp schema)."""
+        self.schema = arrow_schema(columns)
+        if self.parquet is not None:
+            self.parquet.close()
+            path = Path(str(self.root) + ".parquet")
+            tmp = path.with_name(path.name + ".tmp")
+            path.replace(tmp)
+            self.parquet = pq.ParquetWriter(str(path), self.schema)
+            for batch in pq.ParquetFile(tmp).iter_batches():
+                table = pa.Table.from_batches([batch])
+                for field in self.schema:
+                    if field.name not in table.column_names:
+                        table = table.append_column(field, pa.nulls(len(table), field.type))
+                self.parquet.write_table(table.select(self.schema.names).cast(self.schema))
+            tmp.unlink()
+        if self.csv is not None:
+            self.csv.close()
+            path = Path(str(self.root) + ".csv")
+            tmp = path.with_name(path.name + ".tmp")
+            path.replace(tmp)
+            self.csv = open(path, "w", encoding="utf-8-sig", newline="")
+            with open(tmp, "r", encoding="utf-8-sig", newline="") as f:
+                reader, writer = csv.reader(f), csv.writer(self.csv, lineterminator=os.linesep)
+                header = next(reader, None)
+                if header is not None:
+                    writer.writerow(columns)
+                    pad = [""] * (len(columns) - len(header))
+                    for row in reader:
+                        writer.writerow(row + pad)
+            tmp.unlink()
+
+    def _write_partitions(self, table: pa.Table):
+        # upload_month / city_guess rỗng -> null (__HIVE_DEFAULT_PARTITION__)
+        if "upload_date_iso" in table.column_names:
+            month = pc.strftime(table["upload_date_iso"], format="%Y-%m")
+        else:
+            month = pa.nulls(len(table), pa.string())
+        table = table.append_column("upload_month", month)
+        if "city_guess" in table.column_names:
+            city = table["city_guess"].cast(pa.string())
+            city = pc.if_else(pc.equal(city, ""), pa.scalar(None, pa.string()), city)
+            table = table.set_column(table.schema.get_field_index("city_guess"), "city_guess", city)
+        else:
+            table = table.append_column("city_guess", pa.nulls(len(table), pa.string()))
+        pds.write_dataset(
+            table, self.dataset_dir, format="parquet",
+            partitioning=pds.partitioning(pa.schema([(c, pa.string()) for c in PARTITION_COLS]), flavor="hive"),
+            basename_template=f"part-{self.run_id}-{self.parts}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        self.parts += 1
+
+    def close(self):
+        if self.parquet is not None:
+            self.parquet.close()
+        if self.csv is not None:
+            self.csv.close()
+        if self.json is not None:
+            self.json.write("\n]")
+            self.json.close()
+
+    def describe(self) -> str:
+        paths = {"parquet": f"{self.root}.parquet", "csv": f"{self.root}.csv",
+                 "json": f"{self.root}.json", "dataset": f"{self.dataset_dir}/"}
+        return " and ".join(paths[f] for f in self.formats)
+
+# ---------- Incremental mode ----------
+
+def content_hash(job: dict) -> str:
+    raw = json.dumps(job, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+class Manifest:
+    """link_job -> content hash của bản đang hiệu lực trong dataset.
+
+    Bản ghi đổi nội dung được ghi thêm một version mới; version cũ coi như tombstone
+    vì hash của nó không còn khớp manifest (xem load_current).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.hashes, self.first_seen, self.last_seen, self.updated = {}, {}, {}, {}
+        self.new = self.changed = self.unchanged = 0
+        if self.path.exists():
+            t = pq.read_table(self.path).to_pydict()
+            for link, h, first, last, upd in zip(t["link_job"], t["content_hash"], t["first_seen"],
+                                                 t["last_seen"], t["updated"]):
+                self.hashes[link] = h
+                self.first_seen[link] = first
+                self.last_seen[link] = last
+                self.updated[link] = upd
+
+    def delta(self, jobs, run_id: str):
+        """Chỉ trả về job mới hoặc đã đổi nội dung, kèm cột _content_hash."""
+        seen_now = set()
+        for job in jobs:
+            link = normalize_text(job.get("link_job"))
+            if link in seen_now:
+                continue
+            seen_now.add(link)
+            h = content_hash(job)
+            self.last_seen[link] = run_id
+            old = self.hashes.get(link)
+            if old == h:
+                self.unchanged += 1
+                continue
+            if old is None:
+                self.new += 1
+                self.first_seen[link] = run_id
+            else:
+                self.changed += 1
+            self.hashes[link] = h
+            self.updated[link] = run_id
+            yield dict(job, _content_hash=h)
+
+    def save(self):
+        links = list(self.hashes)
+        table = pa.table({
+            "link_job": links,
+            "content_hash": [self.hashes[k] for k in links],
+            "first_seen": [self.first_seen[k] for k in links],
+            "last_seen": [self.last_seen[k] for k in links],
+            "updated": [self.updated[k] for k in links],
+        })
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        pq.write_table(table, tmp)
+        tmp.replace(self.path)
+
+def manifest_path(output) -> Path:
+    return Path(str(output) + "_manifest.parquet")
+
+def load_current(output) -> pd.DataFrame:
+    """Đọc dataset incremental, bỏ các version đã bị thay thế."""
+    dataset = pds.dataset(Path(str(output) + "_dataset"), format="parquet", partitioning="hive")
+    # part ghi trước khi có cột mới (OutputWriter._widen) thiếu cột đó: đọc theo schema gộp
+    schema = pa.unify_schemas([dataset.schema] + [f.physical_schema for f in dataset.get_fragments()])
+    table = pds.dataset(Path(str(output) + "_dataset"), schema=schema, format="parquet",
+                        partitioning="hive").to_table()
+    current = pq.read_table(manifest_path(output), columns=["link_job", "content_hash"])
+    keys = pc.binary_join_element_wise(table["link_job"], table["_content_hash"], "\x00")
+    live = pc.binary_join_element_wise(current["link_job"], current["content_hash"], "\x00")
+    return table.filter(pc.is_in(keys, value_set=live.combine_chunks())).to_pandas()
+
+# ---------- Parallel mode ----------
+# Worker trả kết quả về dạng Arrow IPC thay vì pickle DataFrame; cột skills do process cha tính
+# (canonicalize_skills) theo thứ tự chunk, nên kết quả giống hệt --workers 1.
+
+def _transform_to_ipc(records) -> bytes:
+    df = order_columns(transform(pd.DataFrame(records), skills=False))
+    table = pa.Table.from_pandas(df, schema=arrow_schema(df.columns, dictionary=False), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as w:
+        w.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def _frame_from_ipc(buf: bytes) -> pd.DataFrame:
+    df = pa.ipc.open_stream(buf).read_all().to_pandas()
+    for c in LIST_COLS & set(df.columns):
+        df[c] = df[c].map(lambda v: v.tolist() if v is not None else v)
+    return df
+
+def transform_chunks(chunks, workers: int = 1, memo: BoundedMemo = None, skills: bool = True):
+    """Trả về các DataFrame đã transform theo đúng thứ tự chunk đầu vào.
+
+    skills=False: bỏ bước canonicalize_skills để gọi một lần trên toàn bộ kết quả.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield transform(pd.DataFrame(chunk), memo, skills)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        # giới hạn số chunk đang xử lý để bộ nhớ không phụ thuộc input
+        pending = deque()
+        for chunk in chunks:
+            pending.append(ex.submit(_transform_to_ipc, chunk))
+            if len(pending) >= 2 * workers:
+                df = _frame_from_ipc(pending.popleft().result())
+                yield canonicalize_skills(df, memo) if skills else df
+        while pending:
+            df = _frame_from_ipc(pending.popleft().result())
+            yield canonicalize_skills(df, memo) if skills else df
+
+def run_stream(jobs, writer: OutputWriter, chunk_size: int, workers: int = 1,
+               memo: BoundedMemo = None):
+    seen = LinkHashSet()
+    columns = []
+    try:
+        for df in transform_chunks(iter_chunks(jobs, chunk_size), workers, memo):
+            if "link_job" in df.columns:
+                df = df.drop_duplicates(subset=["link_job"])
+                hashes = np.fromiter(map(_link_hash, df["link_job"]), dtype=np.uint64, count=len(df))
+                new = ~seen.contains(hashes)
+                df = df[new]
+                seen.add(hashes[new])
+            # cột chỉ có từ chunk này trở đi được nối vào cuối (OutputWriter mở rộng schema)
+            columns += [c for c in order_columns(df).columns if c not in columns]
+            df = df.reindex(columns=columns)
+            for c in INT_COLS & set(columns):
+                df[c] = df[c].astype("float64")
+            writer.write(df)
+            print(f"Processed {writer.rows} rows")
+    finally:
+        writer.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="input", default="vietnamworks_test.json")
+    ap.add_argument("--out", dest="output", default="jobs_preprocessed")
+    ap.add_argument("--stream", action="store_true",
+                    help="Xử lý theo chunk, bộ nhớ không phụ thuộc kích thước input (.jsonl hoặc JSON qua ijson)")
+    ap.add_argument("--chunk-size", type=int, default=5000)
+    ap.add_argument("--workers", type=int, default=1, help="Số process dùng để transform song song")
+    ap.add_argument("--memo", default=None, help="File memo kết quả chuẩn hóa, giữ giữa các lần chạy")
+    ap.add_argument("--memo-size", type=int, default=200_000, help="Số giá trị tối đa giữ trong memo")
+    ap.add_argument("--format", default=None,
+                    help="Các output, phân tách bằng dấu phẩy: parquet, csv, json, dataset "
+                         "(Parquet partition theo upload_month/city_guess). Mặc định parquet,csv,json")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Chỉ chuẩn hóa job mới/đổi nội dung (theo manifest) và ghi thêm vào dataset")
+    add_profile_arg(ap)
+    args = ap.parse_args()
+    prof = Profiler("clean_data", args.profile)
+
+    default_format = "dataset" if args.incremental else "parquet,csv,json"
+    formats = [f.strip() for f in (args.format or default_format).split(",") if f.strip()]
+    unknown = set(formats) - set(OUTPUT_FORMATS)
+    if unknown:
+        ap.error(f"format không hỗ trợ: {', '.join(sorted(unknown))}")
+    if args.incremental and formats != ["dataset"]:
+        ap.error("--incremental chỉ ghi được format dataset")
+
+    run_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+    writer = OutputWriter(args.output, formats, append=args.incremental, run_id=run_id)
+
+    memo = None
+    if args.memo:
+        memo = BoundedMemo(args.memo, args.memo_size, file_fingerprint(__file__, *(Path(__file__).with_name(m) for m in ("gazetteer.py", "skill_canon.py"))))
+
+    if args.stream or args.incremental:
+        jobs = iter_jobs(args.input)
+        manifest = None
+        if args.incremental:
+            with prof.section("manifest_load"):
+                manifest = Manifest(manifest_path(args.output))
+            jobs = manifest.delta(jobs, run_id)
+        with prof.section("stream"):
+            run_stream(jobs, writer, args.chunk_size, args.workers, memo)
+        with prof.section("save_state"):
+            if manifest is not None:
+                manifest.save()
+                print(f"Incremental: {manifest.new} new, {manifest.changed} changed, "
+                      f"{manifest.unchanged} unchanged")
+            if memo is not None:
+                memo.save()
+            save_skill_canon()
+        print(f"Saved {writer.rows} rows -> {writer.describe()}")
+        prof.finish(args.output)
+        return
+
+    with prof.section("load"):
+        with open(args.input, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    jobs = data.get("jobs", [])
+    with prof.section("transform"):
+        if args.workers > 1:
+            df = pd.concat(list(transform_chunks(iter_chunks(jobs, args.chunk_size), args.workers, skills=False)),
+                           ignore_index=True)
+            # như transform trên cả bảng khi không có --workers
+            df = canonicalize_skills(df, memo)
+            for c in INT_COLS & set(df.columns):
+                df[c] = _as_int_if_complete(df[c])
+        else:
+            df = transform(pd.DataFrame(jobs), memo)
+    with prof.section("save_state"):
+        if memo is not None:
+            memo.save()
+        save_skill_canon()
+
     if "link_job" in df.columns:
         df = df.drop_duplicates(subset=["link_job"])
 
-    preferred = [
-        "name","company","field","career","career_main","career_sub",
-        "job_position","language_cv","minimum_years_of_experience","years_min","years_max",
-        "salary","currency","min","max","period",
-        "upload_date","upload_date_iso","expiration_date","expiration_date_iso",
-        "locations","locations_joined","city_guess",
-        "skills","benefits_list",
-        "description","requirements","link_job"
-    ]
-    cols = [c for c in preferred if c in df.columns] + [c for c in df.columns if c not in preferred]
-    df = df[cols]
-
-    root = Path(args.output)
-    df.to_parquet(str(root) + ".parquet", index=False)
-    df.to_csv(str(root) + ".csv", index=False, encoding="utf-8-sig")
-    df.to_json(str(root) + ".json", orient="records", force_ascii=False, indent=2)
-    print(f"Saved {len(df)} rows -> {root}.parquet and {root}.csv and {root}.json")
+    df = order_columns(df)
+
+    with prof.section("write"):
+        try:
+            writer.write(df)
+        finally:
+            writer.close()
+    print(f"Saved {len(df)} rows -> {writer.describe()}")
+    prof.finish(args.output)
 
 if __name__ == "__main__":
     main()
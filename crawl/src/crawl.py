@@ -1,9 +1,13 @@
 
 
+import argparse
 import json
+import os
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from queue import Queue
 
 from bs4 import BeautifulSoup
 from selenium import webdriver
@@ -14,8 +18,35 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.firefox import GeckoDriverManager
 
+from job_keys import job_id_from_link
+from job_record import NOTICE, Job, dump_jobs, load_jobs
+from listing_cards import CardState, parse_listing_card, set_base_url
+from listing_shards import ShardResult, format_coverage, listing_url, load_shards, merge_shards, parse_total
+from page_archive import PageArchive
+from profiling import Profiler, add_profile_arg
+from refresh_scheduler import RefreshScheduler
+from sitemap import SITEMAP_URL, SitemapState
+from snapshot_store import SnapshotStore
 
-NOTICE = 'Information is missed'
+# Lịch sử delta các lần crawl (vietnamworks.json chỉ giữ lần mới nhất)
+SNAPSHOT_DIR = "snapshots"
+OUTPUT = "vietnamworks.json"
+# fingerprint thẻ listing theo job_id, xem listing_cards.py
+CARD_STATE = "listing_cards.json"
+# lastmod của sitemap con / từng job ở chế độ --discovery sitemap, xem sitemap.py
+SITEMAP_STATE = "sitemap_state.json"
+# thống kê coverage của --discovery shards, xem listing_shards.py
+COVERAGE = "listing_coverage.json"
+# lịch làm mới từng job của --daemon, xem refresh_scheduler.py
+REFRESH_STATE = "refresh_state.json"
+# --base-url / --login-url (hoặc VNW_BASE_URL / VNW_LOGIN_URL) trỏ crawler vào replay_server.py;
+# đổi base mà không đổi login thì login là {base}{LOGIN_PATH}
+LOGIN_PATH = "/login/vi?client_id=3"
+LOGIN_URL = "https://secure.vietnamworks.com" + LOGIN_PATH
+# --record DIR: mọi trang đã render được ghi vào PageArchive (page_archive.py) để phát lại offline
+RECORDER = None
+# --delay-scale: hệ số nhân các khoảng chờ trang render (0 khi replay, không cần chờ JS của site)
+DELAY_SCALE = 1.0
 
 # ------------ Firefox options ------------
 options = webdriver.FirefoxOptions()
@@ -27,12 +58,22 @@ options.add_argument("-private")
 options.set_preference("dom.webnotifications.enabled", False)
 
 # ------------ Driver init (Selenium 4) ------------
-service = Service(GeckoDriverManager().install())
-driver = webdriver.Firefox(service=service, options=options)
-driver.set_window_size(1920, 1080)
+GECKODRIVER = GeckoDriverManager().install()
+
+def make_driver():
+    """Firefox mới với cùng options (mỗi worker của --discovery shards dùng một driver riêng)."""
+    drv = webdriver.Firefox(service=Service(GECKODRIVER), options=options)
+    drv.set_window_size(1920, 1080)
+    return drv
+
+driver = make_driver()
 
 wait = WebDriverWait(driver, 15)
 
+def job_key(job):
+    # vietnamworks.json của crawler cũ không có job_id
+    return job.get("job_id") or job_id_from_link(job.get("link_job", ""))
+
 def safe_text(elem, default=NOTICE):
     try:
         if elem is None:
@@ -42,55 +83,115 @@ def safe_text(elem, default=NOTICE):
     except Exception:
         return default
 
-def login():
-    driver.get("https://secure.vietnamworks.com/login/vi?client_id=3")
+def pause(seconds):
+    if DELAY_SCALE > 0:
+        time.sleep(seconds * DELAY_SCALE)
+
+def page_source(drv, url):
+    """HTML đã render của trang đang mở (url là địa chỉ đã yêu cầu); ghi vào archive nếu --record."""
+    html = drv.page_source
+    if RECORDER is not None:
+        RECORDER.save(url, html)
+    return html
+
+def login(drv=None):
+    drv = drv or driver
+    drv.get(LOGIN_URL)
     try:
-        wait.until(EC.presence_of_element_located((By.ID, "email")))
+        (wait if drv is driver else WebDriverWait(drv, 15)).until(
+            EC.presence_of_element_located((By.ID, "email")))
+        page_source(drv, LOGIN_URL)
         # TODO: Fill your credentials here
-        driver.find_element(By.ID, "email").send_keys("youremails")
-        driver.find_element(By.ID, "login__password").send_keys("yourpassword")
-        driver.find_element(By.ID, "button-login").click()
+        drv.find_element(By.ID, "email").send_keys("youremails")
+        drv.find_element(By.ID, "login__password").send_keys("yourpassword")
+        drv.find_element(By.ID, "button-login").click()
         # Optional: wait for redirect or some logged-in indicator
-        time.sleep(3)
+        pause(3)
     except TimeoutException:
         print("Login page did not load in time. Continuing without login...")
 
-def collect_listing_links(num_pages):
-    all_links = []
+def collect_listing_links(num_pages, params=None, drv=None, stats=None):
+    """Thẻ job (link, title, company, salary, location, fp) trên tối đa num_pages trang listing.
+
+    params là bộ lọc của một shard (listing_shards.py); dừng sớm khi một trang hết thẻ.
+    stats (dict) nhận số trang đã đọc, tổng số job site báo và cờ capped (chạm num_pages).
+    """
+    drv = drv or driver
+    all_cards = []
     page_num = 1
+    site_total, capped = None, False
     while page_num <= num_pages:
-        url = f'https://www.vietnamworks.com/viec-lam?page={page_num}'
-        driver.get(url)
-        time.sleep(2)
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
+        url = listing_url(page_num, params)
+        drv.get(url)
+        pause(2)
+        drv.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
 
-        page_source = driver.page_source
-        soup = BeautifulSoup(page_source, "html.parser")
+        soup = BeautifulSoup(page_source(drv, url), "html.parser")
+        if page_num == 1:
+            site_total = parse_total(soup.get_text(" "))
 
+        page_cards = []
         block_job_list = soup.find_all("div", {"class": "block-job-list"})
         for block in block_job_list:
             link_catalogue = block.find_all("div", {"class": "search_list"})
             for item in link_catalogue:
-                a = item.find("a")
-                if a and a.get("href"):
-                    href = a.get("href")
-                    if href.startswith("http"):
-                        all_links.append(href)
-                    else:
-                        all_links.append("https://www.vietnamworks.com" + href)
-        print(f"Collected links from page {page_num}")
+                card = parse_listing_card(item)
+                if card:
+                    page_cards.append(card)
+        if not page_cards:
+            break
+        all_cards.extend(page_cards)
+        print(f"Collected links from page {page_num}" + (f" {params}" if params else ""))
+        capped = page_num == num_pages
         page_num += 1
-        time.sleep(1)
+        pause(1)
+    if stats is not None:
+        stats.update(pages=page_num - 1, site_total=site_total, capped=capped)
             
     # Deduplicate while preserving order
     seen = set()
-    unique_links = []
-    for x in all_links:
-        if x not in seen:
-            unique_links.append(x)
-            seen.add(x)
-    return unique_links
+    unique_cards = []
+    for card in all_cards:
+        if card["job_id"] not in seen:
+            unique_cards.append(card)
+            seen.add(card["job_id"])
+    return unique_cards
     
+def crawl_shards(shards, num_pages, workers=4):
+    """Duyệt các shard song song (mỗi worker một Firefox), gộp thẻ; trả về (thẻ, báo cáo coverage).
+
+    Mỗi driver đều login như driver chính: thẻ khi chưa login có thể hiện lương khác, làm
+    fingerprint lệch với --discovery listing.
+    """
+    drivers = Queue()
+
+    def run(shard):
+        drv = drivers.get()
+        stats = {}
+        try:
+            cards = collect_listing_links(num_pages, shard.params, drv, stats)
+            return ShardResult(shard, cards, stats["pages"], stats["site_total"], stats["capped"])
+        except Exception as e:
+            print(f"Shard {shard.name} lỗi: {e}")
+            return ShardResult(shard, [], stats.get("pages", 0), stats.get("site_total"), False, str(e))
+        finally:
+            drivers.put(drv)
+
+    try:
+        for _ in range(min(workers, len(shards))):
+            drv = make_driver()
+            drivers.put(drv)
+            login(drv)
+        # trang 1 của listing không lọc: tổng số job để biết các shard phủ được bao nhiêu
+        reference = {}
+        collect_listing_links(1, stats=reference)
+        with ThreadPoolExecutor(max_workers=drivers.qsize()) as pool:
+            results = list(pool.map(run, shards))
+    finally:
+        while not drivers.empty():
+            drivers.get().quit()
+    return merge_shards(results, reference.get("site_total"))
+
 def get_section_text_by_title(title, soup):
     for h2 in soup.find_all("h2"):
         if h2.get_text(strip=True) == title:
@@ -102,8 +203,8 @@ def get_section_text_by_title(title, soup):
 def parse_job(url):
     driver.get(url)
     # Let dynamic content load a bit
-    time.sleep(1.5)
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+    pause(1.5)
+    soup = BeautifulSoup(page_source(driver, url), "html.parser")
 
     # Title
     name_job = safe_text(soup.find("h1", {"name": "title"}))
@@ -214,46 +315,199 @@ def parse_job(url):
         except Exception:
             pass
 
-    data = {
-        "name": name_job,
-        "salary": salary,
-        "upload_date": upload_date,
-        "expiration_date": expiration_date,
-        "locations": locations,
-        "skill": skill,
-        "career": career,
-        "company": name_company,
-        "job_position": position,
-        "field": field,
-        "language_cv": language_of_cv,
-        "minimum_years_of_experience": minimum_years_of_experience,
-        "benefits": benefits,
-        "description": description,
-        "requirements": requirements,
-        "link_job": url,
-    }
-    return data
+    return Job(
+        job_id=job_id_from_link(url),
+        name=name_job,
+        salary=salary,
+        upload_date=upload_date,
+        expiration_date=expiration_date,
+        locations=locations,
+        skill=skill,
+        career=career,
+        company=name_company,
+        job_position=position,
+        field=field,
+        language_cv=language_of_cv,
+        minimum_years_of_experience=minimum_years_of_experience,
+        benefits=benefits,
+        description=description,
+        requirements=requirements,
+        link_job=url,
+    )
+
+def discover(args, prof):
+    """(items, state, số trang đã tải) theo --discovery; item có job_id + link (+ fp / lastmod)."""
+    if args.discovery == "sitemap":
+        state = SitemapState(SITEMAP_STATE)
+        with prof.section("discovery"):
+            items = state.discover(args.sitemap)
+        print(f"Sitemap: {len(items)} jobs, {state.stats['sitemaps']} sitemaps read, "
+              f"{state.stats['sitemaps_skipped']} unchanged skipped")
+        return items, state, state.stats["sitemaps"]
+    if args.discovery == "shards":
+        with prof.section("listing"):
+            items, coverage = crawl_shards(load_shards(args.shards), args.pages, args.workers)
+        with open(COVERAGE, "w", encoding="utf-8") as f:
+            json.dump(coverage, f, ensure_ascii=False, indent=2)
+        print(format_coverage(coverage))
+        return items, CardState(CARD_STATE), 1 + sum(s["pages"] for s in coverage["shards"])
+    stats = {}
+    with prof.section("listing"):
+        items = collect_listing_links(args.pages, stats=stats)
+    return items, CardState(CARD_STATE), stats["pages"]
+
+def save_output(jobs):
+    dump_jobs(jobs, OUTPUT)
+    print(f"Saved {len(jobs)} jobs to {OUTPUT}")
+    print(f"Snapshot: {SnapshotStore(SNAPSHOT_DIR).ingest(jobs)}")
+
+def run_daemon(args, prof):
+    """Crawl liên tục: discovery mỗi --discover-every phút, tải trang chi tiết theo RefreshScheduler
+    trong giới hạn --budget lượt tải mỗi giờ, ghi output mỗi --save-every phút."""
+    sched = RefreshScheduler(REFRESH_STATE, args.budget)
+    jobs = {job_key(job): job for job in load_jobs(OUTPUT)} if os.path.exists(OUTPUT) else {}
+    # sig lúc tải của lần crawl một lượt trước, để job có thẻ / lastmod đổi từ đó vẫn được tải ngay
+    if args.discovery == "sitemap":
+        sigs = SitemapState(SITEMAP_STATE).saved
+    else:
+        sigs = {jid: e["fp"] for jid, e in CardState(CARD_STATE).saved.items()}
+    now = time.time()
+    for jid, job in jobs.items():
+        sched.adopt(jid, job, now, sigs.get(jid, ""))
+    next_discovery = next_save = now
+    dirty = False
+    try:
+        while True:
+            now = time.time()
+            if now >= next_discovery:
+                try:
+                    items, _, pages = discover(args, prof)
+                    sched.spend(pages, now)
+                    queued = sum(sched.offer(item, now) for item in items)
+                except Exception as e:
+                    print(f"Discovery lỗi: {e}")
+                    queued = 0
+                for jid in sched.expire(now):
+                    jobs.pop(jid, None)
+                    dirty = True
+                print(f"[{datetime.now():%H:%M}] {queued} queued, {len(sched)} scheduled, "
+                      f"budget left {sched.budget_left(now)}/h, {dict(sched.stats)}")
+                next_discovery = now + args.discover_every * 60
+            if dirty and now >= next_save:
+                with prof.section("save"):
+                    save_output(list(jobs.values()))
+                    sched.save()
+                dirty = False
+                next_save = now + args.save_every * 60
+
+            jid, link = sched.next_due(now)
+            if jid is None:
+                # link là số giây tới lần đến hạn kế tiếp / tới khi có lại ngân sách
+                time.sleep(max(1, min(link, next_discovery - now, 60)))
+                continue
+            try:
+                with prof.section("detail"):
+                    job = parse_job(link)
+            except Exception as e:
+                print(f"Failed to parse {link}: {e}")
+                sched.failed(jid, time.time())
+                if jid not in sched.entries:
+                    dirty = jobs.pop(jid, None) is not None or dirty
+                continue
+            if sched.fetched(jid, job, time.time()):
+                jobs[jid] = job
+            else:
+                jobs.pop(jid, None)
+            dirty = True
+    except KeyboardInterrupt:
+        print("Dừng daemon")
+    finally:
+        if dirty:
+            save_output(list(jobs.values()))
+        sched.save()
 
 def main():
+    global LOGIN_URL, RECORDER, DELAY_SCALE
+    ap = argparse.ArgumentParser(description=f"Crawl VietnamWorks -> {OUTPUT}")
+    ap.add_argument("--discovery", choices=["listing", "shards", "sitemap"], default="listing",
+                    help="listing: render trang viec-lam?page=N; shards: listing chia theo bộ lọc, chạy "
+                         "song song; sitemap: đọc sitemap index + sitemap job")
+    ap.add_argument("--pages", type=int, default=None,
+                    help="Số trang listing tối đa (mỗi shard); mặc định 150, với --daemon là 5")
+    ap.add_argument("--shards", default=None, help="File JSON định nghĩa shard (mặc định: theo địa điểm)")
+    ap.add_argument("--workers", type=int, default=4, help="Số Firefox chạy song song cho --discovery shards")
+    ap.add_argument("--sitemap", default=SITEMAP_URL, help="Sitemap index: URL hoặc file .xml/.xml.gz")
+    ap.add_argument("--max-fetch", type=int, default=None,
+                    help="Tối đa số trang chi tiết tải lần này; job còn lại để lần sau (giữ bản ghi cũ nếu có)")
+    ap.add_argument("--daemon", action="store_true",
+                    help="Chạy liên tục, làm mới job theo hạn (refresh_scheduler.py) thay vì crawl một lượt")
+    ap.add_argument("--budget", type=int, default=600, help="--daemon: số lượt tải trang tối đa mỗi giờ")
+    ap.add_argument("--discover-every", type=float, default=30, help="--daemon: phút giữa hai lần discovery")
+    ap.add_argument("--save-every", type=float, default=10, help="--daemon: phút giữa hai lần ghi output")
+    ap.add_argument("--base-url", default=os.environ.get("VNW_BASE_URL"),
+                    help="Gốc trang listing / chi tiết, vd. http://127.0.0.1:8765 của replay_server.py")
+    ap.add_argument("--login-url", default=os.environ.get("VNW_LOGIN_URL"),
+                    help=f"Trang login (mặc định {LOGIN_URL}, hoặc <base-url>{LOGIN_PATH} nếu có --base-url)")
+    ap.add_argument("--record", default=None, metavar="DIR",
+                    help="Ghi mọi trang đã render (login, listing, chi tiết) vào DIR cho replay_server.py")
+    ap.add_argument("--delay-scale", type=float, default=1.0,
+                    help="Hệ số nhân các khoảng chờ trang render (0: không chờ)")
+    add_profile_arg(ap)
+    args = ap.parse_args()
+    if args.pages is None:
+        args.pages = 5 if args.daemon else 150
+    if args.base_url:
+        LOGIN_URL = set_base_url(args.base_url) + LOGIN_PATH
+    LOGIN_URL = args.login_url or LOGIN_URL
+    if args.record:
+        RECORDER = PageArchive(args.record)
+    DELAY_SCALE = args.delay_scale
+    prof = Profiler("crawl", args.profile)
     try:
-        login()
-        max_pages = 150
-        links = collect_listing_links(max_pages)
+        with prof.section("login"):
+            login()
+        if args.daemon:
+            run_daemon(args, prof)
+            return
+        # mỗi item có job_id + link; state quyết định item nào cần mở trang chi tiết
+        items, state, _ = discover(args, prof)
 
+        # item không đổi so với lần trước: dùng lại bản ghi cũ thay vì mở trang chi tiết
+        previous = {job_key(job): job for job in load_jobs(OUTPUT)} if os.path.exists(OUTPUT) else {}
         results = {"jobs": []}
-        for idx, link in enumerate(links, 1):
+        reused = deferred = fetched = 0
+        for idx, item in enumerate(items, 1):
+            old = previous.get(item["job_id"])
+            if old is not None and not state.needs_fetch(item):
+                results["jobs"].append(old)
+                state.keep(item)
+                reused += 1
+                continue
+            if args.max_fetch is not None and fetched >= args.max_fetch:
+                # hết lượt: không ghi state để lần sau item vẫn được coi là cần tải
+                if old is not None:
+                    results["jobs"].append(old)
+                deferred += 1
+                continue
+            fetched += 1
             try:
-                job = parse_job(link)
+                with prof.section("detail"):
+                    job = parse_job(item["link"])
                 results["jobs"].append(job)
+                state.fetched(item)
             except Exception as e:
-                print(f"Failed to parse {link}: {e}")
-        with open("vietnamworks.json", "w", encoding="utf-8") as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
-
-        print(f"Total jobs collected: {len(results['jobs'])}")
-        print("Saved to vietnamworks.json")
+                print(f"Failed to parse {item['link']}: {e}")
+        del previous
+        print(f"Total jobs collected: {len(results['jobs'])} "
+              f"({fetched} fetched, {reused} unchanged reused, {deferred} deferred)")
+        with prof.section("save"):
+            save_output(results["jobs"])
+            state.save()
     finally:
         driver.quit()
+        if RECORDER is not None:
+            print(f"Recorded {len(RECORDER)} pages -> {args.record}")
+        prof.finish(OUTPUT)
 
 if __name__ == "__main__":
     main()
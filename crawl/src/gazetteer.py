@@ -0,0 +1,353 @@
+"""Gazetteer địa danh Việt Nam dùng chung cho clean_data, merge_llm_and_summaries và industry_report.
+
+- PROVINCES: 63 tỉnh/thành (tên chuẩn giống CITIES_REF cũ) kèm alias.
+- DISTRICTS: quận/huyện/thị xã/thành phố trực thuộc hay gặp trong tin tuyển dụng.
+- File bổ sung (CSV name,province[,level]) qua biến môi trường VNW_GAZETTEER_EXTRA,
+  dùng để nạp đầy đủ danh sách phường/xã.
+
+Mọi alias được so khớp trên text đã bỏ dấu (giữ nguyên độ dài nên vị trí khớp trùng với
+text gốc). Một match chỉ được nhận khi text gốc viết đúng dấu của alias hoặc viết không dấu,
+để "Huệ" không bị hiểu là "Huế". Bảng alias + automaton được build một lần và cache ra đĩa.
+"""
+import csv
+import hashlib
+import os
+import pickle
+import re
+import unicodedata
+from pathlib import Path
+
+PROVINCES = {
+    "Hà Nội": ["Ha Noi", "Hanoi", "TP Hà Nội", "Thành phố Hà Nội"],
+    "Hồ Chí Minh": ["TP HCM", "TP.HCM", "TP. HCM", "HCM", "HCMC", "Ho Chi Minh", "Tp Hồ Chí Minh",
+                    "Thành phố Hồ Chí Minh", "Sài Gòn", "Saigon"],
+    "Hải Phòng": ["Hai Phong"],
+    "Đà Nẵng": ["Da Nang", "Danang"],
+    "Cần Thơ": ["Can Tho"],
+    "An Giang": [],
+    "Bà Rịa - Vũng Tàu": ["Bà Rịa Vũng Tàu", "Bà Rịa-Vũng Tàu", "BR-VT", "BRVT"],
+    "Bắc Giang": [],
+    "Bắc Kạn": ["Bắc Cạn"],
+    "Bạc Liêu": [],
+    "Bắc Ninh": [],
+    "Bến Tre": [],
+    "Bình Định": [],
+    "Bình Dương": [],
+    "Bình Phước": [],
+    "Bình Thuận": [],
+    "Cà Mau": [],
+    "Cao Bằng": [],
+    "Đắk Lắk": ["Đắc Lắc", "Đắk Lắc", "Daklak"],
+    "Đắk Nông": ["Đắc Nông", "Daknong"],
+    "Điện Biên": [],
+    "Đồng Nai": [],
+    "Đồng Tháp": [],
+    "Gia Lai": [],
+    "Hà Giang": [],
+    "Hà Nam": [],
+    "Hà Tĩnh": [],
+    "Hải Dương": [],
+    "Hậu Giang": [],
+    "Hòa Bình": [],
+    "Hưng Yên": [],
+    "Khánh Hòa": [],
+    "Kiên Giang": [],
+    "Kon Tum": ["Kontum"],
+    "Lai Châu": [],
+    "Lâm Đồng": [],
+    "Lạng Sơn": [],
+    "Lào Cai": [],
+    "Long An": [],
+    "Nam Định": [],
+    "Nghệ An": [],
+    "Ninh Bình": [],
+    "Ninh Thuận": [],
+    "Phú Thọ": [],
+    "Phú Yên": [],
+    "Quảng Bình": [],
+    "Quảng Nam": [],
+    "Quảng Ngãi": [],
+    "Quảng Ninh": [],
+    "Quảng Trị": [],
+    "Sóc Trăng": [],
+    "Sơn La": [],
+    "Tây Ninh": [],
+    "Thái Bình": [],
+    "Thái Nguyên": [],
+    "Thanh Hóa": [],
+    "Thừa Thiên Huế": ["Thừa Thiên - Huế", "Huế"],
+    "Tiền Giang": [],
+    "Trà Vinh": [],
+    "Tuyên Quang": [],
+    "Vĩnh Long": [],
+    "Vĩnh Phúc": [],
+    "Yên Bái": [],
+}
+
+DISTRICTS = {
+    "Hồ Chí Minh": [
+        "Quận 1", "Quận 3", "Quận 4", "Quận 5", "Quận 6", "Quận 7", "Quận 8", "Quận 10", "Quận 11",
+        "Quận 12", "Thủ Đức", "Bình Thạnh", "Tân Bình", "Gò Vấp", "Phú Nhuận", "Tân Phú", "Bình Tân",
+        "Bình Chánh", "Củ Chi", "Hóc Môn", "Nhà Bè", "Cần Giờ",
+    ],
+    "Hà Nội": [
+        "Ba Đình", "Hoàn Kiếm", "Tây Hồ", "Long Biên", "Cầu Giấy", "Đống Đa", "Hai Bà Trưng",
+        "Hoàng Mai", "Thanh Xuân", "Nam Từ Liêm", "Bắc Từ Liêm", "Hà Đông", "Sóc Sơn", "Đông Anh",
+        "Gia Lâm", "Thanh Trì", "Mê Linh", "Hoài Đức", "Đan Phượng", "Thạch Thất", "Quốc Oai",
+        "Chương Mỹ", "Thanh Oai", "Thường Tín", "Sơn Tây", "Ba Vì", "Phúc Thọ", "Mỹ Đức", "Ứng Hòa",
+        "Phú Xuyên",
+    ],
+    "Đà Nẵng": ["Hải Châu", "Thanh Khê", "Sơn Trà", "Ngũ Hành Sơn", "Liên Chiểu", "Cẩm Lệ", "Hòa Vang"],
+    "Hải Phòng": [
+        "Hồng Bàng", "Ngô Quyền", "Lê Chân", "Hải An", "Kiến An", "Đồ Sơn", "Dương Kinh",
+        "Thủy Nguyên", "An Dương", "An Lão", "Kiến Thụy", "Tiên Lãng", "Vĩnh Bảo", "Cát Hải",
+    ],
+    "Cần Thơ": ["Ninh Kiều", "Bình Thủy", "Cái Răng", "Ô Môn", "Thốt Nốt"],
+    "Bình Dương": ["Thủ Dầu Một", "Dĩ An", "Thuận An", "Tân Uyên", "Bến Cát", "Bàu Bàng"],
+    "Đồng Nai": ["Biên Hòa", "Long Thành", "Nhơn Trạch", "Trảng Bom", "Long Khánh"],
+    "Bắc Ninh": ["Từ Sơn", "Quế Võ", "Yên Phong", "Tiên Du"],
+    "Bà Rịa - Vũng Tàu": ["Vũng Tàu", "Bà Rịa", "Phú Mỹ"],
+    "Khánh Hòa": ["Nha Trang", "Cam Ranh"],
+    "Lâm Đồng": ["Đà Lạt", "Bảo Lộc"],
+    "Quảng Ninh": ["Hạ Long", "Cẩm Phả", "Uông Bí", "Móng Cái"],
+    "Quảng Nam": ["Hội An", "Tam Kỳ"],
+    "Kiên Giang": ["Phú Quốc", "Rạch Giá"],
+    "Bình Định": ["Quy Nhơn"],
+    "Long An": ["Tân An", "Bến Lức", "Đức Hòa"],
+    "Hưng Yên": ["Mỹ Hào", "Văn Lâm"],
+    "Hải Dương": ["Chí Linh"],
+    "Vĩnh Phúc": ["Vĩnh Yên", "Phúc Yên"],
+    "Thái Nguyên": ["Sông Công", "Phổ Yên"],
+    "Bình Thuận": ["Phan Thiết"],
+    "Đắk Lắk": ["Buôn Ma Thuột"],
+    "Gia Lai": ["Pleiku"],
+    "Tây Ninh": ["Trảng Bàng"],
+    "Tiền Giang": ["Mỹ Tho"],
+}
+
+INVALID_VALUES = {"unknown", "n/a", "na", "none", ""}
+
+# "Hoà"/"Hòa", "Thuỷ"/"Thủy": hai kiểu đặt dấu thanh đều phổ biến
+_TONE_PAIRS = {
+    "òa": "oà", "óa": "oá", "ỏa": "oả", "õa": "oã", "ọa": "oạ",
+    "òe": "oè", "óe": "oé", "ỏe": "oẻ", "õe": "oẽ", "ọe": "oẹ",
+    "ùy": "uỳ", "úy": "uý", "ủy": "uỷ", "ũy": "uỹ", "ụy": "uỵ",
+}
+
+_WORD = r"0-9a-z"
+_CACHE_VERSION = 1
+
+
+def fold_char(c: str) -> str:
+    if c in "đĐ":
+        return "d" if c == "đ" else "D"
+    return unicodedata.normalize("NFD", c)[0]
+
+
+def fold(s: str) -> str:
+    """Bỏ dấu + lowercase, giữ nguyên độ dài chuỗi (NFC)."""
+    s = unicodedata.normalize("NFC", s)
+    return "".join(fold_char(c) for c in s).lower()
+
+
+def _lower_nfc(s: str) -> str:
+    return unicodedata.normalize("NFC", s).lower()
+
+
+def _tone_variants(alias: str):
+    out = {alias}
+    for new, old in _TONE_PAIRS.items():
+        for a in list(out):
+            if new in a:
+                out.add(a.replace(new, old))
+            if old in a:
+                out.add(a.replace(old, new))
+    return out
+
+
+def _iter_entries(extra_path=None):
+    for prov, aliases in PROVINCES.items():
+        for a in [prov] + aliases:
+            yield a, prov, "province"
+    for prov, names in DISTRICTS.items():
+        for n in names:
+            yield n, prov, "district"
+    if extra_path and Path(extra_path).exists():
+        with open(extra_path, "r", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                if row.get("name") and row.get("province") in PROVINCES:
+                    yield row["name"].strip(), row["province"], (row.get("level") or "ward").strip()
+
+
+class Gazetteer:
+    def __init__(self, extra_path=None):
+        # folded alias -> {diacritic lower form: (province, level)}
+        aliases = {}
+        conflicts = set()
+        for name, prov, level in _iter_entries(extra_path):
+            for form in _tone_variants(_lower_nfc(name)):
+                key = fold(form)
+                slot = aliases.setdefault(key, {})
+                if form in slot and slot[form][0] != prov:
+                    conflicts.add((key, form))
+                # tên tỉnh luôn thắng tên quận/phường trùng
+                if form not in slot or (level == "province" and slot[form][1] != "province"):
+                    slot[form] = (prov, level)
+        for key, form in conflicts:
+            if aliases[key][form][1] != "province":
+                del aliases[key][form]
+        self.aliases = {k: v for k, v in aliases.items() if v}
+        self.provinces = list(PROVINCES)
+        self.provinces_ascii = [fold(p) for p in self.provinces]
+        self._build_matcher()
+
+    def _build_matcher(self):
+        try:
+            import ahocorasick
+        except ImportError:
+            ahocorasick = None
+        if ahocorasick is not None:
+            A = ahocorasick.Automaton()
+            for key in self.aliases:
+                A.add_word(key, key)
+            A.make_automaton()
+            self.automaton, self.pattern = A, None
+        else:
+            keys = sorted(self.aliases, key=len, reverse=True)
+            self.automaton = None
+            self.pattern = re.compile(rf"(?<![{_WORD}])(?:{'|'.join(re.escape(k) for k in keys)})(?![{_WORD}])")
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["pattern"] = self.pattern.pattern if self.pattern is not None else None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.pattern is not None:
+            self.pattern = re.compile(self.pattern)
+
+    def _spans(self, folded: str):
+        if self.automaton is not None:
+            # pyahocorasick: lấy match dài nhất, không chồng lấn, có ranh giới từ
+            for end, key in self.automaton.iter_long(folded):
+                start = end - len(key) + 1
+                if (start == 0 or not re.match(f"[{_WORD}]", folded[start - 1])) and \
+                   (end + 1 == len(folded) or not re.match(f"[{_WORD}]", folded[end + 1])):
+                    yield start, end + 1, key
+        else:
+            for m in self.pattern.finditer(folded):
+                yield m.start(), m.end(), m.group(0)
+
+    def matches(self, text: str):
+        """[(start, end, province, level)] theo thứ tự xuất hiện trong text."""
+        if not isinstance(text, str) or not text:
+            return []
+        text = unicodedata.normalize("NFC", text)
+        folded = fold(text)
+        low = text.lower()
+        out = []
+        for start, end, key in self._spans(folded):
+            span = low[start:end]
+            forms = self.aliases[key]
+            if span in forms:
+                prov, level = forms[span]
+            elif span == key:
+                # viết không dấu: chấp nhận nếu alias không mơ hồ
+                provs = {p for p, _ in forms.values()}
+                if len(provs) != 1:
+                    continue
+                prov, level = next(iter(forms.values()))
+            else:
+                continue
+            out.append((start, end, prov, level))
+        return out
+
+    def find_provinces(self, text: str):
+        """Mỗi địa chỉ (tách bằng ; hoặc |) lấy tỉnh khớp cuối cùng - tỉnh thường đứng cuối địa chỉ."""
+        if not isinstance(text, str):
+            return []
+        result = []
+        for segment in re.split(r"[;|]", text):
+            found = self.matches(segment)
+            if found:
+                prov = found[-1][2]
+                if prov not in result:
+                    result.append(prov)
+        return result
+
+    def guess_city(self, text: str) -> str:
+        found = self.find_provinces(text)
+        return found[0] if found else ""
+
+    def normalize_city_lists(self, values, threshold: int = 80):
+        """Bản batch của normalize_city_auto: mỗi giá trị -> list tỉnh chuẩn.
+
+        Phần nào khớp alias thì lấy luôn; phần còn lại được fuzzy match (fuzz.ratio trên
+        dạng không dấu) với danh sách tỉnh trong một lần rapidfuzz.process.cdist.
+        """
+        from rapidfuzz import fuzz, process
+
+        split = []
+        pending = {}
+        for val in values:
+            parts = []
+            if isinstance(val, str) and val.strip():
+                for part in re.split(r"[;,]", val):
+                    part = part.strip()
+                    if not part or fold(part).strip() in INVALID_VALUES:
+                        continue
+                    parts.append(part)
+                    if part not in pending:
+                        found = self.find_provinces(part)
+                        pending[part] = found[0] if found else None
+            split.append(parts)
+
+        todo = [p for p, v in pending.items() if v is None]
+        if todo:
+            scores = process.cdist([fold(p).strip() for p in todo], self.provinces_ascii,
+                                   scorer=fuzz.ratio, workers=-1)
+            for part, row in zip(todo, scores):
+                best = int(row.argmax())
+                pending[part] = self.provinces[best] if row[best] >= threshold else part.title()
+        return [[pending[p] for p in parts] for parts in split]
+
+
+def _cache_path() -> Path:
+    return Path(os.environ.get("VNW_GAZETTEER_CACHE", Path(__file__).with_name(".gazetteer_cache.pkl")))
+
+
+def _source_hash(extra_path) -> str:
+    h = hashlib.sha1(Path(__file__).read_bytes())
+    h.update(str(_CACHE_VERSION).encode())
+    if extra_path and Path(extra_path).exists():
+        h.update(Path(extra_path).read_bytes())
+    return h.hexdigest()
+
+
+_GAZ = None
+
+
+def get_gazetteer() -> Gazetteer:
+    """Gazetteer dùng chung, build một lần rồi cache ra đĩa (tự build lại khi dữ liệu đổi)."""
+    global _GAZ
+    if _GAZ is not None:
+        return _GAZ
+    extra = os.environ.get("VNW_GAZETTEER_EXTRA")
+    path = _cache_path()
+    src = _source_hash(extra)
+    try:
+        with open(path, "rb") as f:
+            saved = pickle.load(f)
+        if saved.get("source") == src:
+            _GAZ = saved["gazetteer"]
+            return _GAZ
+    except Exception:
+        pass
+    _GAZ = Gazetteer(extra)
+    try:
+        with open(path, "wb") as f:
+            pickle.dump({"source": src, "gazetteer": _GAZ}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        print(f"Không ghi được cache gazetteer {path}: {e}")
+    return _GAZ
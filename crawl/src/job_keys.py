@@ -0,0 +1,17 @@
+"""Khóa job ổn định dùng xuyên suốt các stage: crawl -> summary -> classify -> clean -> merge."""
+import hashlib
+import re
+
+# https://www.vietnamworks.com/nhan-vien-kinh-doanh-...--1959058-jv?source=...
+_VNW_ID_RE = re.compile(r"-(\d+)-jv\b")
+
+
+def job_id_from_link(link) -> str:
+    """Lấy id số của VietnamWorks từ link_job; link lạ thì dùng hash của URL (bỏ query)."""
+    if not isinstance(link, str) or not link.strip():
+        return ""
+    m = _VNW_ID_RE.search(link)
+    if m:
+        return m.group(1)
+    base = link.strip().split("?", 1)[0].rstrip("/")
+    return "h" + hashlib.sha1(base.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,95 @@
+"""Bản ghi job gọn cho crawl.py -> job_summary.py -> Classification_job.py.
+
+Job dùng __slots__ thay cho dict 17 khóa; các field categorical (company, career, field,
+job_position, language_cv, NOTICE, ...) được sys.intern nên hàng nghìn tin dùng chung một
+object str; locations / benefits giữ dạng tuple. Job là một Mapping chỉ đọc (job.get,
+job["name"], job.items()) nên code đang dùng dict vẫn chạy, và to_dict() / dump_jobs()
+ghi ra đúng JSON hiện tại ({"jobs": [...]}, khóa theo thứ tự parse_job, field lạ giữ nguyên).
+"""
+import json
+import sys
+from collections.abc import Mapping
+
+NOTICE = "Information is missed"
+
+JOB_FIELDS = ("job_id", "name", "salary", "upload_date", "expiration_date", "locations", "skill", "career",
+              "company", "job_position", "field", "language_cv", "minimum_years_of_experience", "benefits",
+              "description", "requirements", "link_job")
+INTERNED_FIELDS = frozenset({"salary", "upload_date", "expiration_date", "skill", "career", "company",
+                             "job_position", "field", "language_cv", "minimum_years_of_experience"})
+LIST_FIELDS = frozenset({"locations", "benefits"})
+
+
+def intern_value(v):
+    return sys.intern(v) if type(v) is str else v
+
+def intern_fields(record: dict, fields) -> dict:
+    """Intern tại chỗ các field chuỗi lặp lại của một dict (vd. kết quả phân loại của LLM)."""
+    for k in fields:
+        if k in record:
+            record[k] = intern_value(record[k])
+    return record
+
+
+class Job(Mapping):
+    # field không có trong tin thì slot để trống (không xuất hiện khi ghi JSON); field lạ vào extra
+    __slots__ = JOB_FIELDS + ("extra",)
+    __hash__ = None
+
+    def __init__(self, data: dict = None, **fields):
+        self.extra = None
+        for k, v in ({**data, **fields} if data else fields).items():
+            if k in LIST_FIELDS and isinstance(v, list):
+                v = tuple(map(intern_value, v))
+            elif k in INTERNED_FIELDS:
+                v = intern_value(v)
+            if k in JOB_FIELDS:
+                setattr(self, k, v)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[k] = v
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Job":
+        return cls(d)
+
+    def __getitem__(self, key):
+        if key in JOB_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for k in JOB_FIELDS:
+            if hasattr(self, k):
+                yield k
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Job(job_id={self.get('job_id')!r}, name={self.get('name')!r})"
+
+    def to_dict(self) -> dict:
+        return {k: list(v) if k in LIST_FIELDS and isinstance(v, tuple) else v for k, v in self.items()}
+
+
+def load_jobs(path) -> list:
+    """Đọc file crawl ({"jobs": [...]}) thành list Job, thả từng dict ngay sau khi chuyển."""
+    with open(path, "r", encoding="utf-8") as f:
+        jobs = json.load(f).get("jobs", [])
+    for i, d in enumerate(jobs):
+        jobs[i] = Job(d)
+    return jobs
+
+def dump_jobs(jobs, path):
+    with open(path, "w", encoding="utf-8") as f:
+        # Job không phải dict nên json gọi default cho từng tin: chỉ một dict tạm tồn tại mỗi lúc
+        json.dump({"jobs": jobs}, f, ensure_ascii=False, indent=2, default=Job.to_dict)
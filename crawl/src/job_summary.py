@@ -2,6 +2,14 @@ import os
 import json
 from groq import Groq
 
+from job_keys import job_id_from_link
+from job_record import load_jobs
+from near_dup import representatives
+from profiling import Profiler, profile_requested
+
+# --profile hoặc VNW_PROFILE=1: ghi summarized_jobs1.profile.json
+prof = Profiler("job_summary", profile_requested())
+
 # Khởi tạo client Groq với API key
 client = Groq(api_key="your_api)ey")
 
@@ -21,13 +29,37 @@ models = [
 # Mark
 model_flags = [True] * len(models)
 
-# Đọc dữ liệu từ file JSON
-with open("vietnamworks.json", "r", encoding="utf-8") as file:
-    data = json.load(file)
+# Đọc dữ liệu từ file JSON (mỗi tin là một Job gọn, xem job_record.py)
+with prof.section("load"):
+    jobs = load_jobs("vietnamworks.json")
 
 summarized_jobs = []
 
-for index, job in enumerate(data["jobs"], start=1):
+# Tin đăng lại gần trùng (MinHash/LSH trên description + requirements) chỉ gọi LLM
+# cho tin đại diện, các tin còn lại trong cụm dùng lại bản tóm tắt đó
+with prof.section("near_dup"):
+    rep = representatives(jobs)
+summaries = {}
+
+def job_key(job):
+    return job.get("job_id") or job_id_from_link(job.get("link_job", ""))
+
+for index, job in enumerate(jobs, start=1):
+    r = rep[index - 1]
+    if r != index - 1 and summaries.get(r):
+        print(f"Job {index} gần trùng job {r + 1}, dùng lại bản tóm tắt")
+        summarized_jobs.append({
+            "job_id": job_key(job),
+            "name": job.get("name", f"Job {index}"),
+            "company": job.get("company", ""),
+            "location": job.get("locations", ""),
+            "skills": job.get("skill", ""),
+            "salary": job.get("salary", ""),
+            "summary": summaries[r],
+            "duplicate_of": job_key(jobs[r]),
+        })
+        continue
+
     description = job.get("description", "")
     requirements = job.get("requirements", "")
     combined_text = f"{description}\n\n{requirements}"
@@ -49,39 +81,45 @@ TEXT:
     summary = None
     used_model = None
 
-    for i, model in enumerate(models):
-        if not model_flags[i]:
-            continue 
+    with prof.section("llm"):
+        for i, model in enumerate(models):
+            if not model_flags[i]:
+                continue 
 
-        try:
-            response = client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model=model,
-            )
+            try:
+                response = client.chat.completions.create(
+                    messages=[{"role": "user", "content": prompt}],
+                    model=model,
+                )
 
-            summary = response.choices[0].message.content.strip()
-            used_model = model
-            print(f"Job {index} summarized using model {used_model}")
-            break  
+                summary = response.choices[0].message.content.strip()
+                used_model = model
+                print(f"Job {index} summarized using model {used_model}")
+                break  
 
-        except Exception as e:
-            print(f"Model {model} lỗi: {e}")
-            model_flags[i] = False 
+            except Exception as e:
+                print(f"Model {model} lỗi: {e}")
+                model_flags[i] = False 
 
+    summaries[index - 1] = summary
     if summary:
         summarized_job = {
+            "job_id": job_key(job),
             "name": job.get("name", f"Job {index}"),
             "company": job.get("company", ""),
             "location": job.get("locations", ""),
             "skills": job.get("skill", ""),
-            "summary": summary
+            "salary": job.get("salary", ""),
+            "summary": summary,
+            "duplicate_of": "",
         }
         summarized_jobs.append(summarized_job)
     else:
         print(f"Không tóm tắt được job {index} bằng bất kỳ model nào.")
 
 # Ghi ra file kết quả
-with open("summarized_jobs1.json", "w", encoding="utf-8") as outfile:
+with prof.section("write"), open("summarized_jobs1.json", "w", encoding="utf-8") as outfile:
     json.dump(summarized_jobs, outfile, ensure_ascii=False, indent=2)
+prof.finish("summarized_jobs1.json")
 
 
@@ -0,0 +1,95 @@
+"""Fingerprint thẻ job trên trang listing, để lần crawl sau bỏ qua trang chi tiết không đổi.
+
+Mỗi thẻ search_list hiển thị title, company, salary, location. collect_listing_links lấy các
+field này cùng fingerprint (hash của chúng); crawl.py so với fingerprint lưu theo job_id ở
+lần trước (listing_cards.json) và chỉ gọi parse_job cho:
+  - job mới hoặc chưa có bản ghi trong vietnamworks.json lần trước,
+  - job có thẻ đổi (lương, tiêu đề, địa điểm, ...),
+  - job chưa tải lại quá REFETCH_DAYS ngày (mô tả có thể sửa mà thẻ không đổi).
+Đặt VNW_REFETCH_DAYS=0 để tải lại toàn bộ.
+
+Chữ đổi theo ngày trên thẻ ("Đăng 2 ngày trước", "Hết hạn trong 5 ngày", badge "Mới") không
+đưa vào fingerprint.
+
+BASE_URL đổi được (VNW_BASE_URL hoặc crawl.py --base-url), vd. trỏ vào replay_server.py.
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import date
+from pathlib import Path
+
+from job_keys import job_id_from_link
+
+BASE_URL = os.environ.get("VNW_BASE_URL", "https://www.vietnamworks.com").rstrip("/")
+REFETCH_DAYS = int(os.environ.get("VNW_REFETCH_DAYS", 7))
+CARD_FIELDS = ("title", "company", "salary", "location")
+_SALARY_RE = re.compile(r"\$|₫|\b(?:vnd|usd|tr|triệu|million)\b|thương lượng|thỏa thuận|negotiable|lên đến|up to", re.I)
+_VOLATILE_RE = re.compile(r"trước|\bago\b|hôm nay|hôm qua|hết hạn|còn \d+ ngày|^(?:mới|new|hot|gấp|urgent|top)$",
+                          re.I)
+_COMPANY_HREF_RE = re.compile(r"nha-tuyen-dung|/company")
+
+
+def set_base_url(url: str):
+    global BASE_URL
+    BASE_URL = url.rstrip("/")
+    return BASE_URL
+
+def absolute_url(href: str) -> str:
+    return href if href.startswith("http") else BASE_URL + href
+
+def card_fingerprint(card: dict) -> str:
+    text = "\x1f".join(card.get(f) or "" for f in CARD_FIELDS)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+def parse_listing_card(item) -> dict:
+    """Field của một thẻ search_list (BeautifulSoup Tag); None nếu thẻ không có link."""
+    a = item.find("a", href=True)
+    if a is None:
+        return None
+    link = absolute_url(a["href"])
+    heading = item.find(["h2", "h3"]) or a
+    title = heading.get_text(" ", strip=True)
+    company_tag = item.find("a", href=_COMPANY_HREF_RE)
+    company = company_tag.get_text(" ", strip=True) if company_tag else ""
+    strings = [s for s in item.stripped_strings if not _VOLATILE_RE.search(s)]
+    salary = next((s for s in strings if _SALARY_RE.search(s)), "")
+    # phần còn lại của thẻ (thường là địa điểm, có khi kèm tag skill): vẫn là nội dung ổn định
+    used = {*heading.stripped_strings, *(company_tag.stripped_strings if company_tag else ()), salary}
+    location = " | ".join(s for s in strings if s not in used)
+    card = {"job_id": job_id_from_link(link), "link": link, "title": title, "company": company,
+            "salary": salary, "location": location}
+    card["fp"] = card_fingerprint(card)
+    return card
+
+
+class CardState:
+    """job_id -> fingerprint thẻ + ngày tải trang chi tiết gần nhất, lưu JSON cạnh output."""
+
+    def __init__(self, path, refetch_days: int = REFETCH_DAYS, today: date = None):
+        self.path = Path(path)
+        self.refetch_days = refetch_days
+        self.today = today or date.today()
+        self.saved = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+        # chỉ giữ job còn trên listing của lần này
+        self.current = {}
+
+    def needs_fetch(self, card: dict) -> bool:
+        old = self.saved.get(card["job_id"])
+        if old is None or old["fp"] != card["fp"]:
+            return True
+        return (self.today - date.fromisoformat(old["fetched"])).days >= self.refetch_days
+
+    def keep(self, card: dict):
+        """Thẻ không đổi, dùng lại bản ghi cũ: giữ nguyên ngày tải."""
+        self.current[card["job_id"]] = dict(self.saved[card["job_id"]], card={f: card[f] for f in CARD_FIELDS})
+
+    def fetched(self, card: dict):
+        self.current[card["job_id"]] = {"fp": card["fp"], "fetched": self.today.isoformat(),
+                                        "card": {f: card[f] for f in CARD_FIELDS}}
+
+    def save(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.current, ensure_ascii=False, indent=1), encoding="utf-8")
+        tmp.replace(self.path)
@@ -0,0 +1,114 @@
+"""Chia listing thành các lát (shard) theo bộ lọc để vượt giới hạn độ sâu phân trang và chạy song song.
+
+Một shard là một bộ query param của trang viec-lam (địa điểm, ngành nghề, ngày đăng, ...).
+crawl.py --discovery shards duyệt từng shard bằng một Firefox riêng (--workers), dừng shard
+khi hết thẻ, rồi gộp và bỏ trùng theo job_id. Thống kê coverage (listing_coverage.json) cho
+từng shard: số trang, số thẻ, số job chỉ shard đó có, tổng kết quả site báo, và shard có chạm
+--pages hay không (có thể bị cắt); cộng với tổng của listing không lọc để biết các shard đã
+phủ đủ chưa.
+
+Tên param lọc của site có thể đổi: định nghĩa shard trong file JSON (--shards) dạng
+    [{"name": "hcm", "params": {"l": "29"}}, {"name": "it", "params": {"g": "35"}}, ...]
+"""
+import json
+import re
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+import listing_cards
+
+LISTING_PATH = "/viec-lam"
+# tổng số kết quả hiển thị đầu trang listing, vd. "12.345 việc làm" / "Tìm thấy 1,234 việc làm"
+_TOTAL_RE = re.compile(r"(\d{1,3}(?:[.,]\d{3})+|\d+)\s+(?:việc làm|jobs?)\b", re.I)
+
+
+class Shard(NamedTuple):
+    name: str
+    params: dict
+
+
+# địa điểm có nhiều tin nhất; phần còn lại được đo bằng coverage so với listing không lọc
+DEFAULT_SHARDS = [
+    Shard("ho-chi-minh", {"l": "29"}),
+    Shard("ha-noi", {"l": "24"}),
+    Shard("da-nang", {"l": "17"}),
+    Shard("binh-duong", {"l": "8"}),
+    Shard("dong-nai", {"l": "19"}),
+    Shard("hai-phong", {"l": "28"}),
+    Shard("bac-ninh", {"l": "5"}),
+    Shard("can-tho", {"l": "13"}),
+]
+
+
+def load_shards(path=None) -> list:
+    if not path:
+        return list(DEFAULT_SHARDS)
+    return [Shard(s["name"], {k: str(v) for k, v in s.get("params", {}).items()})
+            for s in json.loads(Path(path).read_text(encoding="utf-8"))]
+
+def listing_url(page: int, params: dict = None, base_url: str = None) -> str:
+    # đọc listing_cards.BASE_URL lúc gọi để --base-url có hiệu lực
+    return f"{base_url or listing_cards.BASE_URL}{LISTING_PATH}?{urlencode({**(params or {}), 'page': page})}"
+
+def parse_total(text: str):
+    """Tổng số job site báo trên trang listing; None nếu không thấy."""
+    m = _TOTAL_RE.search(text or "")
+    return int(re.sub(r"[.,]", "", m.group(1))) if m else None
+
+
+class ShardResult(NamedTuple):
+    shard: Shard
+    cards: list
+    pages: int
+    site_total: int
+    capped: bool
+    error: str = ""
+
+
+def merge_shards(results, reference_total: int = None):
+    """Gộp thẻ các shard (bỏ trùng theo job_id, giữ thứ tự shard) + thống kê coverage."""
+    owners = {}
+    for r in results:
+        for card in r.cards:
+            owners.setdefault(card["job_id"], set()).add(r.shard.name)
+    merged, seen, shards = [], set(), []
+    for r in results:
+        ids = {c["job_id"] for c in r.cards}
+        for card in r.cards:
+            if card["job_id"] not in seen:
+                seen.add(card["job_id"])
+                merged.append(card)
+        shards.append({
+            "shard": r.shard.name,
+            "params": r.shard.params,
+            "pages": r.pages,
+            "cards": len(ids),
+            "only_here": sum(1 for j in ids if len(owners[j]) == 1),
+            "site_total": r.site_total,
+            "coverage": round(len(ids) / r.site_total, 3) if r.site_total else None,
+            "capped": r.capped,
+            "error": r.error,
+        })
+    summary = {
+        "jobs": len(merged),
+        "in_several_shards": sum(1 for o in owners.values() if len(o) > 1),
+        "sum_site_totals": sum(s["site_total"] or 0 for s in shards),
+        "reference_total": reference_total,
+        "coverage": round(len(merged) / reference_total, 3) if reference_total else None,
+        "capped_shards": [s["shard"] for s in shards if s["capped"]],
+    }
+    return merged, {"summary": summary, "shards": shards}
+
+def format_coverage(report: dict) -> str:
+    lines = [f"{'shard':16s} {'pages':>5s} {'cards':>7s} {'only':>6s} {'site':>7s} {'cov':>6s}"]
+    for s in report["shards"]:
+        cov = f"{s['coverage']:.0%}" if s["coverage"] is not None else "-"
+        flag = " CAPPED" if s["capped"] else (f" ERROR {s['error']}" if s["error"] else "")
+        lines.append(f"{s['shard']:16s} {s['pages']:5d} {s['cards']:7d} {s['only_here']:6d} "
+                     f"{s['site_total'] if s['site_total'] is not None else '-':>7} {cov:>6s}{flag}")
+    sm = report["summary"]
+    cov = f"{sm['coverage']:.0%}" if sm["coverage"] is not None else "-"
+    lines.append(f"{'(union)':16s} {'':5s} {sm['jobs']:7d} {'':6s} "
+                 f"{sm['reference_total'] if sm['reference_total'] is not None else '-':>7} {cov:>6s}")
+    return "\n".join(lines)
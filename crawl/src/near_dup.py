@@ -0,0 +1,172 @@
+"""Gom tin đăng gần trùng (đăng lại với tiêu đề / địa điểm hơi khác) bằng MinHash + LSH.
+
+Văn bản description + requirements được bỏ dấu, tách từ và cắt thành shingle k từ.
+Mỗi tin có một chữ ký MinHash; LSH chia chữ ký thành các band để chỉ so sánh các cặp
+rơi vào cùng bucket, nên chi phí gần tuyến tính theo số tin. Cặp ứng viên được xác nhận
+bằng độ tương đồng Jaccard ước lượng >= threshold rồi gom cụm bằng union-find.
+
+Đại diện của một cụm là tin xuất hiện đầu tiên; chỉ tin đại diện được gửi cho LLM.
+
+    python near_dup.py --in vietnamworks.json --out near_dup.json
+"""
+import argparse
+import json
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+from job_keys import job_id_from_link
+
+NOTICE = "Information is missed"
+EMPTY = np.uint32(0xFFFFFFFF)
+_ROLL = np.uint64(0x9E3779B97F4A7C15)
+_WORD_RE = re.compile(r"\w+")
+_MARKS_RE = re.compile(r"[\u0300-\u036f]")
+
+
+class _WordHashes(dict):
+    """Cache word -> hash 64-bit của dạng bỏ dấu; tra bằng map(__getitem__) để vòng lặp chạy trong C.
+
+    Bỏ dấu theo từng từ distinct (vài chục nghìn) thay vì từng ký tự của mọi tin.
+    """
+
+    def __missing__(self, w):
+        b = _MARKS_RE.sub("", unicodedata.normalize("NFD", w)).replace("đ", "d").encode("utf-8")
+        h = self[w] = zlib.crc32(b) | (zlib.adler32(b) << 32)
+        return h
+
+_word_hashes = _WordHashes()
+
+
+def job_text(job: dict) -> str:
+    parts = [job.get("description") or "", job.get("requirements") or ""]
+    return "\n".join(p for p in parts if isinstance(p, str) and p != NOTICE)
+
+def _words(text: str) -> list:
+    return _WORD_RE.findall(unicodedata.normalize("NFC", text).lower())
+
+def shingles(text: str, k: int = 5) -> np.ndarray:
+    """Hash 64-bit (rolling) của các shingle k từ liên tiếp, đã bỏ dấu và lowercase."""
+    words = _words(text)
+    if len(words) < k:
+        return np.empty(0, dtype=np.uint64)
+    ids = np.fromiter(map(_word_hashes.__getitem__, words), dtype=np.uint64, count=len(words))
+    n = len(ids) - k + 1
+    grams = ids[:n].copy()
+    for j in range(1, k):
+        grams = grams * _ROLL + ids[j:j + n]   # tràn số uint64 là chủ ý (mod 2^64)
+    return np.unique(grams)
+
+
+class MinHashLSH:
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.8,
+                 shingle_size: int = 5, min_shingles: int = 10, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm phải chia hết cho bands")
+        self.num_perm, self.bands, self.rows = num_perm, bands, num_perm // bands
+        self.threshold, self.shingle_size, self.min_shingles = threshold, shingle_size, min_shingles
+        rng = np.random.default_rng(seed)
+        # multiply-shift hashing: ((a*x + b) mod 2^64) >> 32, a lẻ
+        self.a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)[:, None] * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)[:, None]
+
+    def signatures(self, texts, batch: int = 100_000):
+        """Chữ ký (n, num_perm) uint32; tin quá ngắn (ít hơn min_shingles) có valid=False."""
+        texts = list(texts)
+        sig = np.full((len(texts), self.num_perm), EMPTY, dtype=np.uint32)
+        valid = np.zeros(len(texts), dtype=bool)
+        hashes, docs, starts, n_buf = [], [], [], 0
+
+        def flush():
+            if not hashes:
+                return
+            h = np.concatenate(hashes)
+            # (num_perm, n_shingle): reduceat theo trục cuối, mỗi đoạn liên tiếp là một tin
+            ph = ((self.a * h[None, :] + self.b) >> np.uint64(32)).astype(np.uint32)
+            sig[docs] = np.minimum.reduceat(ph, starts, axis=1).T
+            hashes.clear()
+            docs.clear()
+            starts.clear()
+
+        for i, text in enumerate(texts):
+            sh = shingles(text, self.shingle_size)
+            if len(sh) < self.min_shingles:
+                continue
+            valid[i] = True
+            docs.append(i)
+            starts.append(n_buf)
+            hashes.append(sh)
+            n_buf += len(sh)
+            if n_buf >= batch:
+                flush()
+                n_buf = 0
+        flush()
+        return sig, valid
+
+    def clusters(self, sig: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """rep[i] = chỉ số tin đại diện (nhỏ nhất) trong cụm của tin i."""
+        n = len(sig)
+        parent = np.arange(n)
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        idx = np.flatnonzero(valid)
+        for band in range(self.bands):
+            chunk = np.ascontiguousarray(sig[idx, band * self.rows:(band + 1) * self.rows])
+            keys = chunk.view(np.dtype((np.void, chunk.dtype.itemsize * self.rows))).ravel()
+            _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+            if counts.max(initial=0) < 2:
+                continue
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.cumsum(counts)[:-1]
+            for group in np.split(idx[order], bounds):
+                if len(group) < 2:
+                    continue
+                # so mọi cặp trong bucket: b, c có thể giống nhau dù cả hai dưới ngưỡng với group[0]
+                for j in range(len(group) - 1):
+                    a, rest = group[j], group[j + 1:]
+                    ra = find(a)
+                    rest = rest[np.fromiter((find(o) != ra for o in rest), bool, len(rest))]
+                    if not len(rest):
+                        continue
+                    sim = (sig[rest] == sig[a]).mean(axis=1)
+                    for other in rest[sim >= self.threshold]:
+                        ra, rb = find(a), find(other)
+                        if ra != rb:
+                            parent[max(ra, rb)] = min(ra, rb)
+        return np.array([find(i) for i in range(n)])
+
+
+def representatives(jobs, **kwargs) -> list:
+    """Chỉ số tin đại diện cho từng job (chính nó nếu không trùng tin nào trước đó)."""
+    lsh = MinHashLSH(**kwargs)
+    sig, valid = lsh.signatures(job_text(j) for j in jobs)
+    return lsh.clusters(sig, valid).tolist()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Gom tin gần trùng bằng MinHash/LSH")
+    ap.add_argument("--in", dest="input", default="vietnamworks.json")
+    ap.add_argument("--out", default="near_dup.json", help="{job_id: job_id đại diện} cho tin bị trùng")
+    ap.add_argument("--threshold", type=float, default=0.8)
+    ap.add_argument("--num-perm", type=int, default=128)
+    ap.add_argument("--bands", type=int, default=16)
+    args = ap.parse_args()
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        jobs = json.load(f)["jobs"]
+    rep = representatives(jobs, num_perm=args.num_perm, bands=args.bands, threshold=args.threshold)
+    ids = [j.get("job_id") or job_id_from_link(j.get("link_job", "")) for j in jobs]
+    dup = {ids[i]: ids[r] for i, r in enumerate(rep) if r != i and ids[i] != ids[r]}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(dup, f, ensure_ascii=False, indent=2)
+    print(f"{len(jobs)} tin, {len(set(rep))} cụm, {len(dup)} tin gần trùng -> {args.out}")
+
+if __name__ == "__main__":
+    main()
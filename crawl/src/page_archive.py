@@ -0,0 +1,77 @@
+"""Kho trang đã render để chạy crawler offline (crawl.py --record ghi, replay_server.py phát lại).
+
+    archive/
+      index.jsonl            mỗi dòng {"key": "/path?query", "url", "file", "recorded"}; dòng sau thắng
+      pages/<hash>.html.gz   HTML (driver.page_source) nén gzip
+
+Index ghi kiểu append nên nhiều worker (--discovery shards) ghi song song được và một lần
+record dở dang vẫn phát lại được phần đã có.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from sitemap import JOB_URL_RE
+
+# origin thật trong HTML đã ghi; replay_server.py thay bằng địa chỉ của nó khi phát lại
+SITE_ORIGINS = ("https://www.vietnamworks.com", "https://secure.vietnamworks.com")
+
+
+def page_key(url: str) -> str:
+    parts = urlsplit(url)
+    return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+
+class PageArchive:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.pages = self.root / "pages"
+        self.pages.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.jsonl"
+        self.index = {}
+        if self.index_path.exists():
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.index[entry["key"]] = entry
+        self._lock = threading.Lock()
+        self._by_path = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def save(self, url: str, html: str):
+        key = page_key(url)
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + ".html.gz"
+        data = gzip.compress(html.encode("utf-8"), compresslevel=6)
+        entry = {"key": key, "url": url, "file": name, "recorded": datetime.now().isoformat(timespec="seconds")}
+        with self._lock:
+            (self.pages / name).write_bytes(data)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.index[key] = entry
+            self._by_path = None
+
+    def get(self, key: str):
+        """HTML (bytes) của key; None nếu không có.
+
+        Trang chi tiết job (link kèm ?source=... khác lần ghi) được thử thêm theo path bỏ query, khi
+        path đó có đúng một trang. Trang khác (listing ?page=N) phải khớp cả query.
+        """
+        entry = self.index.get(key)
+        path = key.split("?", 1)[0]
+        if entry is None and JOB_URL_RE.search(path):
+            if self._by_path is None:
+                by_path = {}
+                for k, e in self.index.items():
+                    by_path.setdefault(k.split("?", 1)[0], []).append(e)
+                self._by_path = {p: es[0] for p, es in by_path.items() if len(es) == 1}
+            entry = self._by_path.get(path)
+        if entry is None:
+            return None
+        return gzip.decompress((self.pages / entry["file"]).read_bytes())
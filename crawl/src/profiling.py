@@ -0,0 +1,243 @@
+"""--profile dùng chung cho các script của pipeline.
+
+Khi bật, mỗi section đặt tên (with prof.section("transform"): ...) được đo wall / CPU, cộng
+thêm tùy chế độ (--profile [MODES], mặc định cprofile,memory):
+  - cprofile: cProfile cho cả lần chạy, ghi <out>.prof (mở bằng snakeviz / pstats).
+  - memory:   tracemalloc, peak memory của từng section. Chậm đáng kể với code cấp phát
+              nhiều (ghi xlsx chậm ~3.5 lần), nên wall time của lần chạy này chỉ để tham khảo.
+  - sample:   sampling profiler (thread lấy stack của main thread mỗi SAMPLE_INTERVAL giây),
+              overhead thấp; ghi <out>.stacks.txt dạng collapsed stack cho flamegraph / speedscope.
+Khi tắt, section() là no-op.
+
+Báo cáo chung ghi cạnh output: <out>.profile.json, so sánh được giữa các lần chạy:
+
+    python clean_data.py --in vietnamworks.json --out jobs_preprocessed --profile
+    python industry_report.py --merged jobs_with_llm.parquet --profile sample
+    python profiling.py compare old.profile.json new.profile.json
+
+Script không dùng argparse (job_summary.py, Classification_job.py) nhận --profile /
+--profile=MODES trên dòng lệnh hoặc biến môi trường VNW_PROFILE=MODES.
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODES = ("cprofile", "memory", "sample")
+DEFAULT_MODES = "cprofile,memory"
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 25
+MB = 1 << 20
+
+
+def parse_modes(spec) -> set:
+    if not spec:
+        return set()
+    modes = {m.strip() for m in (DEFAULT_MODES if spec is True else spec).split(",") if m.strip()}
+    unknown = modes - set(MODES)
+    if unknown:
+        raise ValueError(f"chế độ profile không hỗ trợ: {', '.join(sorted(unknown))}")
+    return modes
+
+def add_profile_arg(ap: argparse.ArgumentParser):
+    ap.add_argument("--profile", nargs="?", const=DEFAULT_MODES, default="", metavar="MODES",
+                    help=f"Ghi <out>.profile.json; MODES phân tách bằng dấu phẩy trong {', '.join(MODES)} "
+                         f"(mặc định {DEFAULT_MODES})")
+
+def profile_requested() -> str:
+    """Cho script không dùng argparse: --profile[=MODES] trên dòng lệnh hoặc VNW_PROFILE=MODES."""
+    for arg in sys.argv[1:]:
+        if arg == "--profile":
+            return DEFAULT_MODES
+        if arg.startswith("--profile="):
+            return arg.partition("=")[2]
+    env = os.environ.get("VNW_PROFILE", "")
+    return DEFAULT_MODES if env == "1" else env
+
+
+class StackSampler(threading.Thread):
+    """Lấy stack của một thread theo chu kỳ, đếm theo stack (collapsed) và theo hàm đang chạy."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def top(self, n: int) -> list:
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            funcs = stack.split(";")
+            own[funcs[-1]] += count
+            for f in set(funcs):
+                total[f] += count
+        return [{"function": f, "self_pct": round(100 * c / self.samples, 1),
+                 "total_pct": round(100 * total[f] / self.samples, 1)} for f, c in own.most_common(n)]
+
+
+class Profiler:
+    def __init__(self, script: str, modes=""):
+        self.script = script
+        self.modes = parse_modes(modes)
+        self.enabled = bool(self.modes)
+        self.sections = {}
+        self._stack = []
+        if not self.enabled:
+            return
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self._peak = 0
+        if "memory" in self.modes:
+            tracemalloc.start()
+        self._cprofile = self._sampler = None
+        if "sample" in self.modes:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        if "cprofile" in self.modes:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def _bump_peak(self):
+        # tracemalloc chỉ có một peak toàn cục: dồn peak hiện tại lên mọi section đang mở trước khi reset
+        if "memory" not in self.modes:
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        self._peak = max(self._peak, peak)
+        for frame in self._stack:
+            frame["peak"] = max(frame["peak"], peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def _timed(self, name: str):
+        self._bump_peak()
+        frame = {"peak": tracemalloc.get_traced_memory()[0] if "memory" in self.modes else 0}
+        self._stack.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._bump_peak()
+            self._stack.pop()
+            s = self.sections.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak": 0})
+            s["calls"] += 1
+            s["wall_s"] += wall
+            s["cpu_s"] += cpu
+            s["peak"] = max(s["peak"], frame["peak"])
+
+    def section(self, name: str):
+        return self._timed(name) if self.enabled else nullcontext()
+
+    def finish(self, out_root) -> Path:
+        """Dừng đo và ghi <out_root>.profile.json (+ .prof / .stacks.txt); không làm gì nếu tắt."""
+        if not self.enabled:
+            return None
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        wall, cpu = time.perf_counter() - self._wall, time.process_time() - self._cpu
+        if self._sampler is not None:
+            self._sampler.stop()
+        self._bump_peak()
+        if "memory" in self.modes:
+            tracemalloc.stop()
+
+        root = Path(out_root)
+        if root.suffix in (".json", ".csv", ".parquet", ".xlsx"):
+            root = root.with_suffix("")
+        memory = "memory" in self.modes
+        report = {
+            "script": self.script,
+            "started": self.started,
+            "argv": sys.argv[1:],
+            "modes": sorted(self.modes),
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu, 3),
+            "peak_mb": round(self._peak / MB, 1) if memory else None,
+            # ru_maxrss: kB trên Linux
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) if resource else None,
+            "sections": {k: {"calls": v["calls"], "wall_s": round(v["wall_s"], 3), "cpu_s": round(v["cpu_s"], 3),
+                             "peak_mb": round(v["peak"] / MB, 1) if memory else None}
+                         for k, v in self.sections.items()},
+        }
+        if self._cprofile is not None:
+            prof_path = root.with_name(root.name + ".prof")
+            self._cprofile.dump_stats(prof_path)
+            stats = pstats.Stats(self._cprofile).stats
+            top = sorted(stats.items(), key=lambda kv: kv[1][3], reverse=True)[:TOP_FUNCTIONS]
+            report["top_functions"] = [{"function": f"{func} ({Path(file).name}:{line})", "calls": nc,
+                                        "tottime_s": round(tt, 3), "cumtime_s": round(ct, 3)}
+                                       for (file, line, func), (cc, nc, tt, ct, _) in top]
+            report["pstats"] = prof_path.name
+        if self._sampler is not None:
+            stacks_path = root.with_name(root.name + ".stacks.txt")
+            stacks_path.write_text("".join(f"{s} {c}\n" for s, c in self._sampler.stacks.most_common()),
+                                   encoding="utf-8")
+            report["samples"] = self._sampler.samples
+            report["top_sampled"] = self._sampler.top(TOP_FUNCTIONS)
+            report["stacks"] = stacks_path.name
+
+        path = root.with_name(root.name + ".profile.json")
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Profile -> {path}")
+        return path
+
+
+def compare(old: dict, new: dict) -> str:
+    fmt = lambda v, unit: f"{v:.2f}{unit}" if v is not None else "-"
+    lines = [f"{'section':24s} {'wall old':>9s} {'wall new':>9s} {'Δ%':>7s} {'peak old':>9s} {'peak new':>9s}"]
+    rows = [("(total)", old, new)] + [(k, old["sections"].get(k), new["sections"].get(k))
+                                      for k in dict.fromkeys([*old["sections"], *new["sections"]])]
+    for name, a, b in rows:
+        wa, wb = (a or {}).get("wall_s"), (b or {}).get("wall_s")
+        pa, pb = (a or {}).get("peak_mb"), (b or {}).get("peak_mb")
+        delta = f"{(wb - wa) / wa * 100:+.1f}" if wa and wb is not None else ""
+        lines.append(f"{name:24s} {fmt(wa, 's'):>9s} {fmt(wb, 's'):>9s} {delta:>7s} "
+                     f"{fmt(pa, 'M'):>9s} {fmt(pb, 'M'):>9s}")
+    if old.get("modes") != new.get("modes"):
+        lines.append(f"(chế độ khác nhau: {old.get('modes')} / {new.get('modes')}, wall time không so được trực tiếp)")
+    return "\n".join(lines)
+
+def main():
+    ap = argparse.ArgumentParser(description="So sánh hai file .profile.json")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("compare")
+    p.add_argument("old")
+    p.add_argument("new")
+    args = ap.parse_args()
+    load = lambda p: json.loads(Path(p).read_text(encoding="utf-8"))
+    print(compare(load(args.old), load(args.new)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""KLL quantile sketch: một lượt duyệt, bộ nhớ cố định, merge được giữa các shard / ngày.
+
+Mỗi tầng h giữ các giá trị có trọng số 2^h. Khi một tầng đầy, nó được sắp xếp và nén
+bằng cách giữ xen kẽ một nửa (lẻ hoặc chẵn, chọn ngẫu nhiên) đẩy lên tầng trên. Sai số
+hạng (rank error) cỡ 1.7/k; với k=200 là khoảng 1%.
+
+Sketch được lưu dạng chuỗi JSON (to_json/from_json) để nằm chung Parquet với các cube.
+"""
+import json
+import math
+import random
+
+import numpy as np
+
+
+class KLLSketch:
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.levels = [np.empty(0)]
+        self._buffer = []
+        self._rng = random.Random(seed)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - 1 - h
+        return max(8, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _flush(self):
+        if self._buffer:
+            self.levels[0] = np.concatenate([self.levels[0], np.asarray(self._buffer, dtype=float)])
+            self._buffer = []
+        self._compress()
+
+    def _compress(self):
+        # nén lười: chỉ khi tổng số phần tử vượt tổng sức chứa, nén tầng thấp nhất đã đầy
+        while sum(map(len, self.levels)) >= sum(map(self._capacity, range(len(self.levels)))):
+            h = next(h for h, lv in enumerate(self.levels) if len(lv) >= self._capacity(h))
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            level = np.sort(self.levels[h])
+            keep_one = level[:1] if len(level) % 2 else level[:0]
+            promoted = level[len(keep_one):][self._rng.randrange(2)::2]
+            self.levels[h] = keep_one
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def update(self, x: float):
+        if x is None or not math.isfinite(x):
+            return
+        self.n += 1
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        self._buffer.append(x)
+        if len(self._buffer) >= self.k:
+            self._flush()
+
+    def update_many(self, values):
+        v = np.asarray(values, dtype=float)
+        v = v[np.isfinite(v)]
+        if not len(v):
+            return
+        self._flush()
+        self.n += len(v)
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+        for start in range(0, len(v), self.k):
+            self.levels[0] = np.concatenate([self.levels[0], v[start:start + self.k]])
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        self._flush()
+        other._flush()
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs) -> list:
+        self._flush()
+        if not self.n:
+            return [np.nan for _ in qs]
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2 ** h, dtype=float) for h, lv in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values, cum = values[order], np.cumsum(weights[order])
+        out = []
+        for q in qs:
+            if q <= 0:
+                out.append(self.min)
+            elif q >= 1:
+                out.append(self.max)
+            else:
+                out.append(float(values[min(np.searchsorted(cum, q * cum[-1]), len(values) - 1)]))
+        return out
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles([q])[0]
+
+    def to_json(self) -> str:
+        self._flush()
+        return json.dumps({"k": self.k, "n": self.n, "min": self.min if self.n else None,
+                           "max": self.max if self.n else None,
+                           "levels": [lv.tolist() for lv in self.levels]})
+
+    @classmethod
+    def from_json(cls, s: str) -> "KLLSketch":
+        d = json.loads(s)
+        sk = cls(d["k"])
+        sk.n = d["n"]
+        sk.min = d["min"] if d["min"] is not None else math.inf
+        sk.max = d["max"] if d["max"] is not None else -math.inf
+        sk.levels = [np.asarray(lv, dtype=float) for lv in d["levels"]] or [np.empty(0)]
+        return sk
+
+
+def merge_json(values) -> str:
+    """Gộp nhiều sketch dạng JSON thành một (dùng trong groupby().agg)."""
+    merged = None
+    for v in values:
+        if not isinstance(v, str):
+            continue
+        sk = KLLSketch.from_json(v)
+        merged = sk if merged is None else merged.merge(sk)
+    return (merged or KLLSketch()).to_json()
+
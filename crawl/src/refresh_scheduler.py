@@ -0,0 +1,180 @@
+"""Lịch làm mới cho crawl.py --daemon: hàng đợi ưu tiên theo thời điểm cần tải lại từng job.
+
+- Job mới, hoặc job có thẻ listing (fp) / lastmod sitemap đổi, đến hạn ngay.
+- Job đã tải được hẹn lại theo số ngày còn tới expiration_date: càng gần hết hạn càng dày,
+  interval = days_left * HOURS_PER_DAY_LEFT giờ, kẹp trong [MIN_INTERVAL_H, MAX_INTERVAL_H];
+  job không rõ hạn dùng DEFAULT_INTERVAL_H.
+- Job quá hạn bị bỏ khỏi tập làm mới (crawl.py bỏ luôn khỏi output).
+- Tải lỗi thì lùi lại RETRY_H, 2*RETRY_H, ...; lỗi MAX_FAILURES lần liên tiếp thì bỏ.
+- Job bị bỏ để lại tombstone (lý do, fp/lastmod lúc bỏ): discovery gặp lại nó (sitemap thường
+  còn giữ URL hết hạn) thì bỏ qua, trừ khi fp/lastmod đổi (tin được đăng lại / gia hạn).
+  Tombstone quá TOMBSTONE_DAYS ngày thì xóa.
+- Ngân sách: tối đa budget lượt tải trang mỗi giờ (cửa sổ trượt), tính cả trang listing của
+  discovery.
+Trạng thái (refresh_state.json) giữ qua các lần khởi động lại daemon.
+"""
+import heapq
+import json
+import math
+from collections import Counter, deque
+from datetime import date, datetime
+from pathlib import Path
+
+HOURS_PER_DAY_LEFT = 6
+MIN_INTERVAL_H = 6
+MAX_INTERVAL_H = 72
+DEFAULT_INTERVAL_H = 24
+RETRY_H = 1
+MAX_FAILURES = 3
+TOMBSTONE_DAYS = 30
+_DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d")
+
+
+def parse_vnw_date(s):
+    """Ngày dạng parse_job ghi ("17/09/2025", "17/10/25"); None nếu không đọc được (vd. NOTICE)."""
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(str(s).strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def refresh_interval_h(expires: date, today: date):
+    """Số giờ tới lần tải lại; None nếu job đã hết hạn."""
+    if expires is None:
+        return DEFAULT_INTERVAL_H
+    days_left = (expires - today).days
+    if days_left < 0:
+        return None
+    return min(MAX_INTERVAL_H, max(MIN_INTERVAL_H, days_left * HOURS_PER_DAY_LEFT))
+
+
+class RefreshScheduler:
+    def __init__(self, path=None, budget_per_hour: int = 600):
+        self.path = Path(path) if path else None
+        self.budget = budget_per_hour
+        saved = json.loads(self.path.read_text(encoding="utf-8")) if self.path and self.path.exists() else {}
+        # job_id -> {"link", "sig", "due" (epoch giây), "expires" (ISO hoặc None), "fails"}
+        self.entries = saved.get("jobs", {})
+        # job đã bỏ: job_id -> {"reason", "sig", "expires", "dropped" (epoch giây)}
+        self.dropped = saved.get("dropped", {})
+        self.heap = [(e["due"], jid) for jid, e in self.entries.items()]
+        heapq.heapify(self.heap)
+        self.window = deque()
+        self.stats = Counter()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _push(self, jid: str, due: float):
+        self.entries[jid]["due"] = due
+        heapq.heappush(self.heap, (due, jid))
+
+    def offer(self, item: dict, now: float) -> bool:
+        """Item của discovery (job_id, link, fp hoặc lastmod); True nếu nó được xếp tải ngay."""
+        jid, sig = item["job_id"], item.get("fp") or item.get("lastmod") or ""
+        e = self.entries.get(jid)
+        if e is None:
+            tomb = self.dropped.get(jid)
+            if tomb is not None:
+                if not sig or sig == tomb["sig"]:
+                    self.stats["dropped_seen"] += 1
+                    return False
+                del self.dropped[jid]
+                self.stats["revived"] += 1
+            self.entries[jid] = {"link": item["link"], "sig": sig, "due": now, "expires": None, "fails": 0}
+            self._push(jid, now)
+            self.stats["new"] += 1
+            return True
+        if sig and not e["sig"]:
+            # job adopt từ output mà không biết sig lúc tải: nhận sig đầu tiên, giữ lịch đã hẹn
+            e["sig"] = sig
+            return False
+        if sig and e["sig"] != sig:
+            e.update(link=item["link"], sig=sig)
+            if e["due"] > now:
+                self._push(jid, now)
+            self.stats["changed"] += 1
+            return True
+        return False
+
+    def adopt(self, jid: str, job, now: float, sig: str = ""):
+        """Job đã có trong output nhưng chưa có lịch (lần chạy daemon đầu): hẹn theo hạn, không tải ngay.
+
+        sig: fp / lastmod lúc tải (listing_cards.json, sitemap_state.json) nếu biết; để trống thì
+        offer() nhận sig đầu tiên discovery thấy mà không coi là đổi.
+        """
+        if jid in self.entries or jid in self.dropped:
+            return
+        self.entries[jid] = {"link": job.get("link_job", ""), "sig": sig, "due": now, "expires": None, "fails": 0}
+        self.fetched(jid, job, now)
+
+    def fetched(self, jid: str, job, now: float) -> bool:
+        """Ghi nhận lần tải thành công và hẹn lần sau; False nếu job đã hết hạn (bị bỏ)."""
+        e = self.entries[jid]
+        expires = parse_vnw_date(job.get("expiration_date"))
+        e.update(fails=0, expires=expires.isoformat() if expires else None)
+        hours = refresh_interval_h(expires, datetime.fromtimestamp(now).date())
+        if hours is None:
+            self.drop(jid, "expired", now)
+            return False
+        self._push(jid, now + hours * 3600)
+        return True
+
+    def failed(self, jid: str, now: float):
+        e = self.entries[jid]
+        e["fails"] += 1
+        if e["fails"] >= MAX_FAILURES:
+            self.drop(jid, "failed", now)
+        else:
+            self._push(jid, now + RETRY_H * 3600 * 2 ** (e["fails"] - 1))
+
+    def drop(self, jid: str, reason: str, now: float = None):
+        e = self.entries.pop(jid, None)
+        if e is not None:
+            self.dropped[jid] = {"reason": reason, "sig": e["sig"], "expires": e["expires"],
+                                 "dropped": now if now is not None else e["due"]}
+        self.stats[reason] += 1
+
+    def expire(self, now: float) -> list:
+        """Bỏ mọi job đã quá expiration_date (và tombstone quá cũ); trả về job_id bị bỏ."""
+        today = datetime.fromtimestamp(now).date().isoformat()
+        gone = [jid for jid, e in self.entries.items() if e["expires"] and e["expires"] < today]
+        for jid in gone:
+            self.drop(jid, "expired", now)
+        cutoff = now - TOMBSTONE_DAYS * 86400
+        self.dropped = {jid: t for jid, t in self.dropped.items() if t["dropped"] >= cutoff}
+        return gone
+
+    def spend(self, n: int, now: float):
+        """Tính n lượt tải trang (vd. trang listing của discovery) vào ngân sách giờ này."""
+        self.window.extend([now] * n)
+
+    def budget_left(self, now: float) -> int:
+        while self.window and self.window[0] <= now - 3600:
+            self.window.popleft()
+        return self.budget - len(self.window)
+
+    def next_due(self, now: float):
+        """(job_id, link) đến hạn và còn ngân sách, hoặc (None, số giây nên chờ)."""
+        while self.heap and (self.heap[0][1] not in self.entries
+                             or self.entries[self.heap[0][1]]["due"] != self.heap[0][0]):
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return None, math.inf
+        if self.budget_left(now) <= 0:
+            return None, self.window[0] + 3600 - now
+        due, jid = self.heap[0]
+        if due > now:
+            return None, due - now
+        heapq.heappop(self.heap)
+        self.spend(1, now)
+        return jid, self.entries[jid]["link"]
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"jobs": self.entries, "dropped": self.dropped}, ensure_ascii=False),
+                       encoding="utf-8")
+        tmp.replace(self.path)
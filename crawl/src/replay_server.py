@@ -0,0 +1,149 @@
+"""Phát lại các trang đã ghi bằng crawl.py --record, để đo / kiểm tra hồi quy crawler offline.
+
+    python crawl.py --record archive --pages 5 --max-fetch 200          # ghi từ site thật
+    python replay_server.py --archive archive --latency 300 --jitter 200 --error-rate 0.02
+    python crawl.py --base-url http://127.0.0.1:8765 --pages 5 --profile  # chạy trên bản ghi
+
+- Trang tra theo path + query (page_archive.PageArchive.get); không có thì 404 với trang rỗng
+  (listing hết thẻ -> crawler dừng như ở trang cuối thật).
+- Origin thật trong HTML (SITE_ORIGINS) được thay bằng địa chỉ server, nên link job tuyệt đối
+  và form login đều quay về replay. <script> bị bỏ (trừ --keep-scripts): page_source đã là DOM
+  đã render, chạy lại JS của site chỉ gọi ra ngoài.
+- POST (submit form login) trả 303 về "/".
+- --latency / --jitter (ms) cho mỗi request, --error-rate trả --error-status ngẫu nhiên
+  (--seed để lặp lại được). GET /__stats trả thống kê JSON; thống kê in ra khi dừng.
+Sitemap không được ghi: --discovery sitemap dùng file fixture cục bộ qua --sitemap.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from page_archive import SITE_ORIGINS, PageArchive, page_key
+
+_SCRIPT_RE = re.compile(rb"<script\b[^>]*>.*?</script\s*>", re.I | re.S)
+EMPTY_PAGE = b"<!DOCTYPE html><html><head><title>replay</title></head><body></body></html>"
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, archive: PageArchive, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 error_status=503, keep_scripts=False, seed=None, verbose=False):
+        super().__init__(address, ReplayHandler)
+        self.archive = archive
+        self.latency_ms, self.jitter_ms = latency_ms, jitter_ms
+        self.error_rate, self.error_status = error_rate, error_status
+        self.keep_scripts = keep_scripts
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def count(self, key: str, n: int = 1):
+        with self.lock:
+            self.stats[key] += n
+
+    def delay_and_fail(self) -> bool:
+        """Chờ latency ± jitter; True nếu request này phải trả lỗi."""
+        with self.lock:
+            delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self.rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def render(self, body: bytes, origin: str) -> bytes:
+        for site in SITE_ORIGINS:
+            body = body.replace(site.encode(), origin.encode())
+        return body if self.keep_scripts else _SCRIPT_RE.sub(b"", body)
+
+    def report(self) -> dict:
+        elapsed = time.time() - self.started
+        with self.lock:
+            stats = dict(self.stats)
+        return {"pages": len(self.archive), "uptime_s": round(elapsed, 1),
+                "requests_per_s": round(stats.get("requests", 0) / elapsed, 2) if elapsed else None, **stats}
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: bytes, content_type="text/html; charset=utf-8", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        srv = self.server
+        if self.path == "/__stats":
+            self._send(200, json.dumps(srv.report()).encode(), "application/json")
+            return
+        srv.count("requests")
+        if srv.delay_and_fail():
+            srv.count("errors")
+            self._send(srv.error_status, EMPTY_PAGE)
+            return
+        body = srv.archive.get(page_key(self.path))
+        if body is None:
+            srv.count("misses")
+            self._send(200 if self.path == "/" else 404, EMPTY_PAGE)
+            return
+        srv.count("hits")
+        body = srv.render(body, f"http://{self.headers.get('Host') or '%s:%d' % srv.server_address[:2]}")
+        srv.count("bytes", len(body))
+        self._send(200, body)
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.count("posts")
+        self._send(303, b"", headers=[("Location", "/")])
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="HTTP server phát lại archive của crawl.py --record")
+    ap.add_argument("--archive", required=True, help="Thư mục đã ghi bằng crawl.py --record")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0, help="Độ trễ mỗi request (ms)")
+    ap.add_argument("--jitter", type=float, default=0, help="Dao động ± của độ trễ (ms)")
+    ap.add_argument("--error-rate", type=float, default=0, help="Tỉ lệ request trả lỗi, 0..1")
+    ap.add_argument("--error-status", type=int, default=503)
+    ap.add_argument("--keep-scripts", action="store_true", help="Không bỏ <script> khỏi trang")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--verbose", action="store_true", help="In từng request")
+    args = ap.parse_args()
+
+    archive = PageArchive(args.archive)
+    srv = ReplayServer((args.host, args.port), archive, args.latency, args.jitter, args.error_rate,
+                       args.error_status, args.keep_scripts, args.seed, args.verbose)
+    print(f"Replay {len(archive)} pages from {args.archive} on http://{args.host}:{args.port} "
+          f"(crawl.py --base-url http://{args.host}:{args.port})")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        print(json.dumps(srv.report(), ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Aggregate cube lưu trên đĩa cho industry_report.
+
+Mỗi cube là một file Parquet: các cột chuỗi là chiều (crawl_date luôn đứng đầu), các cột
+số là measure cộng được (posts, count, *_sum, *_n), cột *_sketch là quantile sketch dạng
+JSON (quantile_sketch.py) được merge thay vì cộng. Mỗi batch job mới được cộng dồn vào
+cube; danh sách batch đã nạp giúp chạy lại không bị đếm hai lần.
+
+    cubes/
+      manifest.json          {"generation", "batches": {batch_key: crawl_date}, "cubes": {name: file}}
+      gen-000007/<name>.parquet
+
+Một batch ghi các cube mới vào thư mục gen-* riêng rồi mới thay manifest.json (một lần
+replace), nên cube và danh sách batch luôn đổi cùng nhau: crash giữa chừng chỉ để lại thư
+mục gen-* chưa được trỏ tới, lần add sau xóa đi, và batch chạy lại được cộng đúng một lần.
+"""
+import json
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from quantile_sketch import merge_json
+
+SKETCH_SUFFIX = "_sketch"
+
+
+class CubeStore:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.root / "manifest.json"
+        self.manifest = (json.loads(self.manifest_path.read_text(encoding="utf-8"))
+                         if self.manifest_path.exists() else {"generation": 0, "batches": {}, "cubes": {}})
+
+    @property
+    def batches(self) -> dict:
+        return self.manifest["batches"]
+
+    def cube_path(self, name: str):
+        """File Parquet hiện tại của cube; None nếu chưa có."""
+        file = self.manifest["cubes"].get(name)
+        return self.root / file if file else None
+
+    def add(self, cubes: dict, crawl_date: str, batch_key: str) -> bool:
+        """Cộng các cube của một batch vào store; False nếu batch này đã được nạp."""
+        if batch_key in self.batches:
+            return False
+        generation = self.manifest["generation"] + 1
+        gen_dir = self.root / f"gen-{generation:06d}"
+        if gen_dir.exists():
+            # tàn dư của lần add trước bị crash trước khi thay manifest
+            shutil.rmtree(gen_dir)
+        gen_dir.mkdir()
+        files = dict(self.manifest["cubes"])
+        for name, frame in cubes.items():
+            frame = frame.copy()
+            frame.insert(0, "crawl_date", crawl_date)
+            path = self.cube_path(name)
+            if path is not None:
+                frame = pd.concat([pd.read_parquet(path), frame], ignore_index=True)
+            sketches = [c for c in frame.columns if c.endswith(SKETCH_SUFFIX)]
+            dims = [c for c in frame.columns
+                    if c not in sketches and not pd.api.types.is_numeric_dtype(frame[c])]
+            agg = {c: merge_json if c in sketches else "sum" for c in frame.columns if c not in dims}
+            frame = frame.groupby(dims, dropna=False).agg(agg).reset_index().sort_values(dims)
+            frame.to_parquet(gen_dir / f"{name}.parquet", index=False)
+            files[name] = f"{gen_dir.name}/{name}.parquet"
+        manifest = {"generation": generation, "batches": {**self.batches, batch_key: crawl_date},
+                    "cubes": files}
+        tmp = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.manifest_path)
+        self.manifest = manifest
+        self._collect()
+        return True
+
+    def _collect(self):
+        # Xóa file/thư mục gen-* manifest không còn trỏ tới (cube đã được thay, add bị crash)
+        live = {self.root / f for f in self.manifest["cubes"].values()}
+        for gen_dir in self.root.glob("gen-*"):
+            for path in gen_dir.iterdir():
+                if path not in live:
+                    path.unlink()
+            if not any(gen_dir.iterdir()):
+                gen_dir.rmdir()
+
+    def load(self, since: str = None, until: str = None) -> dict:
+        """Đọc mọi cube, lọc crawl_date trong [since, until] (ISO date, bao gồm hai đầu)."""
+        filters = []
+        if since:
+            filters.append(("crawl_date", ">=", since))
+        if until:
+            filters.append(("crawl_date", "<=", until))
+        cubes = {}
+        for name in sorted(self.manifest["cubes"]):
+            cubes[name] = pd.read_parquet(self.cube_path(name), filters=filters or None)
+        return cubes
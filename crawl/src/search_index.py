@@ -0,0 +1,254 @@
+"""Chỉ mục tìm kiếm full-text (SQLite FTS5) trên output của clean_data.py.
+
+Index name, company, skills, description, requirements. Tokenizer unicode61 với
+remove_diacritics 2 bỏ dấu tiếng Việt; riêng "đ" không được SQLite tách dấu nên được đổi
+sang "d" trước khi index và trước khi query ("duong" khớp "đường").
+
+Cập nhật incremental: mỗi tin (theo link_job) lưu content hash của các cột được index,
+chạy lại chỉ ghi tin mới / đổi nội dung; --prune xóa tin không còn trong input.
+
+    python search_index.py build --in jobs_preprocessed.parquet --db jobs_search.db
+    python search_index.py query --db jobs_search.db "lap trinh python" --city hcm --salary-min 20000000
+"""
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from clean_data import load_current, parse_fx, salary_range_vnd_month
+from gazetteer import get_gazetteer
+
+FTS_COLS = ["name", "company", "skills", "description", "requirements"]
+META_COLS = ["job_id", "name", "company", "city_guess", "salary", "upload_date_iso", "expiration_date_iso"]
+SALARY_COLS = ["currency", "min", "max", "period"]
+DATE_COLS = {"upload_date_iso", "expiration_date_iso"}
+# trọng số bm25 theo thứ tự FTS_COLS: khớp ở tên job quan trọng hơn ở mô tả
+BM25_WEIGHTS = (5.0, 3.0, 3.0, 1.0, 1.0)
+_TOKEN_RE = re.compile(r"\w+\*?")
+_LIST_CHARS_RE = re.compile(r"[\[\]'\"]")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    link_job TEXT UNIQUE NOT NULL,
+    content_hash TEXT NOT NULL,
+    job_id TEXT, name TEXT, company TEXT, city_guess TEXT, salary TEXT,
+    salary_lo REAL, salary_hi REAL, upload_date TEXT, expiration_date TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_city ON jobs (city_guess, upload_date);
+CREATE INDEX IF NOT EXISTS jobs_upload ON jobs (upload_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5 (
+    {", ".join(FTS_COLS)}, tokenize = "unicode61 remove_diacritics 2"
+);
+"""
+
+
+def _text(v) -> str:
+    if isinstance(v, str):
+        # list được ghi ra CSV dạng "['a', 'b']"
+        return _LIST_CHARS_RE.sub("", v) if v.startswith("[") else v
+    if v is None or (pd.api.types.is_scalar(v) and pd.isna(v)):
+        return ""
+    return ", ".join(str(x) for x in v) if hasattr(v, "__iter__") else str(v)
+
+def _iso_dates(s: pd.Series) -> list:
+    # output .json của clean_data ghi ngày dạng epoch ms; parquet/csv là date / "YYYY-MM-DD"
+    num = pd.to_numeric(s, errors="coerce")
+    d = pd.to_datetime(num, unit="ms", errors="coerce")
+    d = d.where(num.notna(), pd.to_datetime(s.where(num.isna()).astype(str), errors="coerce", format="%Y-%m-%d"))
+    return d.dt.strftime("%Y-%m-%d").fillna("").tolist()
+
+def fold_d(s: str) -> str:
+    # str.replace chạy trong C, nhanh hơn nhiều so với str.translate trên văn bản dài
+    return s.replace("đ", "d").replace("Đ", "D")
+
+def fts_query(q: str) -> str:
+    """Câu query tự do -> cú pháp FTS5: mỗi từ là một token (AND), "pyth*" là tìm theo tiền tố."""
+    tokens = _TOKEN_RE.findall(fold_d(q))
+    return " ".join(f'"{t[:-1]}"*' if t.endswith("*") else f'"{t}"' for t in tokens)
+
+def read_chunks(path, chunk_size: int = 20_000):
+    """DataFrame từng phần từ .parquet / .csv / .json, hoặc dataset incremental (root output)."""
+    path = Path(path)
+    cols = set(FTS_COLS + META_COLS + SALARY_COLS + ["link_job"])
+    if path.suffix == ".parquet":
+        pf = pq.ParquetFile(path)
+        names = [c for c in pf.schema_arrow.names if c in cols]
+        for batch in pf.iter_batches(chunk_size, columns=names):
+            yield batch.to_pandas()
+    elif path.suffix == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=lambda c: c in cols, dtype=str,
+                               keep_default_na=False, encoding="utf-8-sig")
+    elif path.suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        df = pd.DataFrame(data["jobs"] if isinstance(data, dict) else data)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+    else:
+        df = load_current(path)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+class SearchIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.con = sqlite3.connect(self.path)
+        self.con.execute("PRAGMA journal_mode = WAL")
+        self.con.execute("PRAGMA synchronous = NORMAL")
+        self.con.executescript(SCHEMA)
+        self._gaz = None
+
+    def close(self):
+        self.con.close()
+
+    # ---------- ghi ----------
+    def update(self, chunks, fx: dict = None, prune: bool = False) -> dict:
+        """Thêm / cập nhật các tin trong chunks; prune=True xóa tin không có trong input."""
+        known = dict(self.con.execute("SELECT link_job, content_hash FROM jobs"))
+        seen = set()
+        stats = {"new": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        with self.con:
+            for df in chunks:
+                df = df.reset_index(drop=True)
+                # chuyển sang list một lần; truy cập từng ô của Series (nhất là kiểu Arrow) rất chậm
+                empty = [""] * len(df)
+                fts_rows = zip(*(list(map(fold_d, df[c].map(_text))) if c in df.columns else empty
+                                 for c in FTS_COLS))
+                meta_rows = zip(*(empty if c not in df.columns else
+                                  _iso_dates(df[c]) if c in DATE_COLS else df[c].map(_text).tolist()
+                                  for c in META_COLS))
+                sal = salary_range_vnd_month(df, fx).astype(object)
+                sal = sal.where(sal.notna(), None)
+                for link, fts, meta, lo, hi in zip(df["link_job"].map(_text), fts_rows, meta_rows,
+                                                   sal["lo"].tolist(), sal["hi"].tolist()):
+                    if not link or link in seen:
+                        continue
+                    seen.add(link)
+                    h = hashlib.blake2b("\x1f".join([*fts, *meta, repr(lo), repr(hi)]).encode("utf-8"),
+                                        digest_size=16).hexdigest()
+                    old = known.get(link)
+                    if old == h:
+                        stats["unchanged"] += 1
+                        continue
+                    if old is not None:
+                        self._delete(link)
+                    stats["changed" if old is not None else "new"] += 1
+                    cur = self.con.execute(
+                        "INSERT INTO jobs (link_job, content_hash, job_id, name, company, city_guess, salary, "
+                        "salary_lo, salary_hi, upload_date, expiration_date) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                        [link, h, *meta[:5], lo, hi, meta[5] or None, meta[6] or None])
+                    self.con.execute(f"INSERT INTO jobs_fts (rowid, {', '.join(FTS_COLS)}) VALUES (?,?,?,?,?,?)",
+                                     [cur.lastrowid, *fts])
+            if prune:
+                for link in set(known) - seen:
+                    self._delete(link)
+                    stats["removed"] += 1
+        self.con.execute("INSERT INTO jobs_fts (jobs_fts) VALUES ('optimize')")
+        return stats
+
+    def _delete(self, link: str):
+        row = self.con.execute("SELECT id FROM jobs WHERE link_job = ?", [link]).fetchone()
+        if row:
+            self.con.execute("DELETE FROM jobs_fts WHERE rowid = ?", row)
+            self.con.execute("DELETE FROM jobs WHERE id = ?", row)
+
+    # ---------- đọc ----------
+    def _city(self, city: str) -> str:
+        # "hcm", "Sai Gon", "tp hồ chí minh" -> tên chuẩn như city_guess của clean_data
+        if self._gaz is None:
+            self._gaz = get_gazetteer()
+        return self._gaz.guess_city(city) or city
+
+    def search(self, query: str = "", city: str = None, salary_min: float = None, salary_max: float = None,
+               since: str = None, until: str = None, limit: int = 20, raw: bool = False) -> list:
+        """Tin khớp query (xếp theo bm25) và các bộ lọc; query rỗng -> chỉ lọc, mới đăng trước.
+
+        salary_min/salary_max (VND/tháng) giữ tin có khoảng lương giao với khoảng lọc;
+        since/until lọc theo ngày đăng (YYYY-MM-DD, gồm hai đầu). raw=True dùng nguyên cú
+        pháp FTS5 (NEAR, OR, name:...).
+        """
+        where, params = [], []
+        if city:
+            where.append("j.city_guess = ?")
+            params.append(self._city(city))
+        if salary_min is not None:
+            where.append("coalesce(j.salary_hi, j.salary_lo) >= ?")
+            params.append(salary_min)
+        if salary_max is not None:
+            where.append("coalesce(j.salary_lo, j.salary_hi) <= ?")
+            params.append(salary_max)
+        if since:
+            where.append("j.upload_date >= ?")
+            params.append(since)
+        if until:
+            where.append("j.upload_date <= ?")
+            params.append(until)
+        cols = ("j.job_id, j.name, j.company, j.city_guess, j.salary, j.salary_lo, j.salary_hi, "
+                "j.upload_date, j.expiration_date, j.link_job")
+        match = (fold_d(query) if raw else fts_query(query)) if query else ""
+        if match:
+            sql = (f"SELECT {cols}, bm25(jobs_fts, {', '.join(map(str, BM25_WEIGHTS))}) AS score, "
+                   f"snippet(jobs_fts, 3, '[', ']', '…', 12) AS snippet "
+                   f"FROM jobs_fts JOIN jobs j ON j.id = jobs_fts.rowid WHERE jobs_fts MATCH ?")
+            params.insert(0, match)
+            order = "score"
+        else:
+            sql = f"SELECT {cols}, NULL AS score, NULL AS snippet FROM jobs j WHERE 1"
+            order = "j.upload_date DESC"
+        sql += "".join(f" AND {w}" for w in where) + f" ORDER BY {order} LIMIT ?"
+        cur = self.con.execute(sql, params + [limit])
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur]
+
+    def count(self) -> int:
+        return self.con.execute("SELECT count(*) FROM jobs").fetchone()[0]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Chỉ mục tìm kiếm FTS5 cho jobs_preprocessed")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("build", help="Tạo / cập nhật incremental chỉ mục từ output clean_data.py")
+    p.add_argument("--in", dest="input", default="jobs_preprocessed.parquet",
+                   help=".parquet / .csv / .json, hoặc root output của clean_data --incremental")
+    p.add_argument("--prune", action="store_true", help="Xóa tin không còn trong input")
+    p.add_argument("--fx", default="", help="Tỷ giá quy đổi sang VND, vd. USD=25400,EUR=27500")
+    p = sub.add_parser("query", help="Tìm tin")
+    p.add_argument("query", nargs="?", default="")
+    p.add_argument("--city", default=None)
+    p.add_argument("--salary-min", type=float, default=None, help="VND/tháng")
+    p.add_argument("--salary-max", type=float, default=None, help="VND/tháng")
+    p.add_argument("--since", default=None, help="Ngày đăng >= (YYYY-MM-DD)")
+    p.add_argument("--until", default=None, help="Ngày đăng <= (YYYY-MM-DD)")
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--raw", action="store_true", help="Query theo cú pháp FTS5")
+    p.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    for p in sub.choices.values():
+        p.add_argument("--db", default="jobs_search.db")
+    args = ap.parse_args()
+
+    index = SearchIndex(args.db)
+    if args.cmd == "build":
+        stats = index.update(read_chunks(args.input), parse_fx(args.fx), args.prune)
+        print(f"{index.count()} tin trong {args.db}: {stats}")
+    else:
+        rows = index.search(args.query, args.city, args.salary_min, args.salary_max,
+                            args.since, args.until, args.limit, args.raw)
+        if args.json:
+            print(json.dumps(rows, ensure_ascii=False, indent=2))
+        else:
+            for r in rows:
+                print(f"{r['name']} | {r['company']} | {r['city_guess']} | {r['salary']} | {r['upload_date']}")
+                print(f"  {r['link_job']}")
+                if r["snippet"]:
+                    print(f"  {r['snippet']}")
+    index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Tìm job qua sitemap thay cho render hàng trăm trang listing.
+
+sitemap index (<sitemapindex>) -> các sitemap job (<urlset>, thường .xml.gz) -> <url><loc>
++ <lastmod>. File được đọc bằng ElementTree.iterparse trên stream (giải nén gzip khi đọc,
+dọn phần tử đã xử lý) nên bộ nhớ không phụ thuộc kích thước sitemap. Nguồn là URL hoặc file
+cục bộ; <loc> tương đối được hiểu theo nguồn cha, nên chạy được trên sitemap fixture.
+
+SitemapState (sitemap_state.json) nhớ:
+  - lastmod của từng sitemap con và job của nó: sitemap con có lastmod không đổi không tải lại;
+  - lastmod của từng job lúc tải trang chi tiết: chỉ job mới hoặc có lastmod đổi cần parse_job.
+Hàng đợi job xếp theo lastmod mới nhất trước, để --max-fetch ưu tiên tin vừa cập nhật.
+
+    python sitemap.py --sitemap https://www.vietnamworks.com/sitemap.xml --state sitemap_state.json
+    python sitemap.py --sitemap ../tests/fixtures/sitemap/index.xml --changed-only --top 20
+"""
+import argparse
+import gzip
+import io
+import json
+import re
+import urllib.request
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+from job_keys import job_id_from_link
+
+SITEMAP_URL = "https://www.vietnamworks.com/sitemap.xml"
+# sitemap con chứa tin tuyển dụng (bỏ sitemap công ty, blog, ...) và URL trang chi tiết job
+JOB_SITEMAP_RE = re.compile(r"job|viec-lam", re.I)
+JOB_URL_RE = re.compile(r"-\d+-jv\b")
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
+MAX_DEPTH = 3
+
+
+def _is_url(src: str) -> bool:
+    return urlparse(src).scheme in ("http", "https")
+
+def resolve(base: str, loc: str) -> str:
+    if _is_url(loc) or not base:
+        return loc
+    return urljoin(base, loc) if _is_url(base) else str(Path(base).parent / loc)
+
+def open_source(src: str, timeout: float = 30):
+    """Stream nhị phân của URL / file; tự giải nén nếu là gzip (theo magic byte, không theo tên)."""
+    if _is_url(src):
+        raw = urllib.request.urlopen(urllib.request.Request(src, headers={"User-Agent": USER_AGENT}),
+                                     timeout=timeout)
+    else:
+        raw = open(src, "rb")
+    f = io.BufferedReader(raw)
+    return gzip.GzipFile(fileobj=f) if f.peek(2)[:2] == b"\x1f\x8b" else f
+
+def normalize_lastmod(text) -> str:
+    """W3C datetime ("2025-09-17", "2025-09-17T10:00+07:00", "...Z") -> ISO UTC để so sánh / sắp xếp."""
+    text = (text or "").strip()
+    if not text:
+        return ""
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        return text
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.isoformat(timespec="seconds")
+
+def iter_sitemap(src: str):
+    """(kind, loc, lastmod) cho từng <sitemap> (kind "sitemap") / <url> (kind "url") trong src."""
+    with open_source(src) as f:
+        root, loc, lastmod = None, None, ""
+        # tên tag (bỏ namespace) từ gốc tới phần tử hiện tại; <loc> / <lastmod> chỉ tính khi là con
+        # trực tiếp của <url> / <sitemap>, không lấy <image:loc>, <video:loc>, ... của extension
+        path = []
+        for event, el in ET.iterparse(f, events=("start", "end")):
+            name = el.tag.rpartition("}")[2]
+            if event == "start":
+                if root is None:
+                    root = el
+                path.append(name)
+                continue
+            path.pop()
+            parent = path[-1] if path else None
+            if name == "loc" and parent in ("url", "sitemap"):
+                loc = (el.text or "").strip()
+            elif name == "lastmod" and parent in ("url", "sitemap"):
+                lastmod = normalize_lastmod(el.text)
+            elif name in ("url", "sitemap"):
+                if loc:
+                    yield name, resolve(src, loc), lastmod
+                loc, lastmod = None, ""
+                root.clear()
+
+
+class SitemapState:
+    """Trạng thái giữa các lần chạy; cùng giao diện với listing_cards.CardState."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        saved = json.loads(self.path.read_text(encoding="utf-8")) if self.path and self.path.exists() else {}
+        # url sitemap con -> {"lastmod": ..., "jobs": [[loc, lastmod], ...]}
+        self.sitemaps = saved.get("sitemaps", {})
+        # job_id -> lastmod lúc tải trang chi tiết gần nhất
+        self.saved = saved.get("jobs", {})
+        self.current = {}
+        self.visited = set()
+        self.stats = {"sitemaps": 0, "sitemaps_skipped": 0}
+
+    def needs_fetch(self, item: dict) -> bool:
+        old = self.saved.get(item["job_id"])
+        # sitemap không có lastmod: chỉ tải job chưa từng tải
+        return old is None or old != item["lastmod"]
+
+    def keep(self, item: dict):
+        self.current[item["job_id"]] = self.saved[item["job_id"]]
+
+    def fetched(self, item: dict):
+        self.current[item["job_id"]] = item["lastmod"]
+
+    def save(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"sitemaps": self.sitemaps, "jobs": self.current}, ensure_ascii=False),
+                       encoding="utf-8")
+        tmp.replace(self.path)
+
+    def _job_entries(self, src: str, lastmod: str, depth: int) -> list:
+        self.visited.add(src)
+        cached = self.sitemaps.get(src)
+        if lastmod and cached and cached["lastmod"] == lastmod:
+            self.stats["sitemaps_skipped"] += 1
+            return cached["jobs"]
+        self.stats["sitemaps"] += 1
+        entries = []
+        for kind, loc, mod in iter_sitemap(src):
+            if kind == "url":
+                if JOB_URL_RE.search(loc):
+                    entries.append([loc, mod])
+            elif depth < MAX_DEPTH and JOB_SITEMAP_RE.search(loc):
+                entries.extend(self._job_entries(loc, mod, depth + 1))
+        if lastmod:
+            self.sitemaps[src] = {"lastmod": lastmod, "jobs": entries}
+        return entries
+
+    def discover(self, index: str = SITEMAP_URL) -> list:
+        """Mọi job đang có trên sitemap: {"job_id", "link", "lastmod"}, lastmod mới nhất trước."""
+        seen = {}
+        for loc, mod in self._job_entries(index, "", 0):
+            jid = job_id_from_link(loc)
+            if jid and (jid not in seen or mod > seen[jid]["lastmod"]):
+                seen[jid] = {"job_id": jid, "link": loc, "lastmod": mod}
+        # sitemap con không còn trong index thì bỏ khỏi cache
+        self.sitemaps = {k: v for k, v in self.sitemaps.items() if k in self.visited}
+        return sorted(seen.values(), key=lambda e: e["lastmod"], reverse=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Liệt kê job từ sitemap (URL hoặc file .xml/.xml.gz)")
+    ap.add_argument("--sitemap", default=SITEMAP_URL)
+    ap.add_argument("--state", default=None, help="sitemap_state.json của crawl.py để biết job nào đổi")
+    ap.add_argument("--changed-only", action="store_true", help="Chỉ in job mới / có lastmod đổi")
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    state = SitemapState(args.state)
+    jobs = state.discover(args.sitemap)
+    queue = [j for j in jobs if state.needs_fetch(j)] if args.changed_only else jobs
+    print(f"{len(jobs)} job, {sum(map(state.needs_fetch, jobs))} cần tải; "
+          f"sitemap đã đọc {state.stats['sitemaps']}, bỏ qua {state.stats['sitemaps_skipped']}")
+    for j in queue[:args.top]:
+        print(f"{j['lastmod'] or '-':20s} {j['job_id']:>10s} {j['link']}")
+
+if __name__ == "__main__":
+    main()
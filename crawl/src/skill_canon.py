@@ -0,0 +1,223 @@
+"""Chuẩn hóa tên skill ("MS Excel", "Microsoft Excel" -> "Excel"; "Kế toán" -> "Accounting").
+
+- SYNONYMS: tên chuẩn -> alias (Anh / Việt, có dấu hoặc không dấu đều được).
+- Skill chưa có trong từ điển được fuzzy match (fuzz.ratio trên dạng không dấu) với toàn bộ
+  alias + skill đã học bằng rapidfuzz.process.cdist, chỉ trên giá trị distinct. Skill vẫn
+  không khớp được gom cụm với nhau theo thứ tự tần suất: dạng hay gặp nhất làm tên chuẩn.
+- Mapping đã học và id số nguyên của từng tên chuẩn được cache ra đĩa (đổi đường dẫn bằng
+  biến môi trường VNW_SKILL_CACHE), nên lần chạy sau chỉ xử lý skill mới và id ổn định
+  giữa các lần chạy. Mapping học được phụ thuộc thứ tự dữ liệu, nên clean_data --workers chỉ
+  chuẩn hóa skill ở process cha, theo thứ tự chunk.
+"""
+import hashlib
+import os
+import pickle
+import re
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from gazetteer import fold
+
+SYNONYMS = {
+    "Excel": ["excel", "ms excel", "microsoft excel", "excel nâng cao", "advanced excel"],
+    "Word": ["ms word", "microsoft word"],
+    "PowerPoint": ["powerpoint", "ms powerpoint", "microsoft powerpoint", "power point"],
+    "Microsoft Office": ["ms office", "microsoft office", "tin học văn phòng", "office"],
+    "English": ["tiếng anh", "english", "anh văn", "tiếng anh giao tiếp", "english communication"],
+    "Japanese": ["tiếng nhật", "japanese", "nhật ngữ"],
+    "Chinese": ["tiếng trung", "chinese", "tiếng hoa", "mandarin"],
+    "Korean": ["tiếng hàn", "korean"],
+    "Communication": ["giao tiếp", "kỹ năng giao tiếp", "communication", "communication skills"],
+    "Teamwork": ["làm việc nhóm", "teamwork", "team work"],
+    "Negotiation": ["đàm phán", "negotiation", "thương lượng"],
+    "Problem Solving": ["giải quyết vấn đề", "problem solving", "problem-solving"],
+    "Leadership": ["lãnh đạo", "leadership", "quản lý đội nhóm", "team management"],
+    "Sales": ["bán hàng", "sales", "selling", "tư vấn bán hàng"],
+    "B2B Sales": ["b2b sales", "bán hàng b2b", "b2b"],
+    "Customer Service": ["chăm sóc khách hàng", "cskh", "customer service", "customer care"],
+    "Marketing": ["marketing", "tiếp thị"],
+    "Digital Marketing": ["digital marketing", "marketing online", "online marketing", "tiếp thị số"],
+    "SEO": ["seo", "search engine optimization"],
+    "Accounting": ["kế toán", "accounting", "accountant", "kế toán tổng hợp", "general accounting"],
+    "Auditing": ["kiểm toán", "audit", "auditing"],
+    "Finance": ["tài chính", "finance", "financial analysis", "phân tích tài chính"],
+    "Tax": ["thuế", "tax", "kê khai thuế"],
+    "Financial Reporting": ["lập báo cáo tài chính", "báo cáo tài chính", "financial reporting"],
+    "Human Resources": ["nhân sự", "human resources", "hr", "quản trị nhân sự"],
+    "Recruitment": ["tuyển dụng", "recruitment", "recruiting", "talent acquisition"],
+    "Project Management": ["quản lý dự án", "project management", "pm"],
+    "Import-Export": ["xuất nhập khẩu", "import export", "xnk"],
+    "Logistics": ["logistics", "chuỗi cung ứng", "supply chain"],
+    "Data Analysis": ["phân tích dữ liệu", "data analysis", "data analytics"],
+    "Power BI": ["power bi", "powerbi"],
+    "Python": ["python", "python3"],
+    "Java": ["java", "java core"],
+    "JavaScript": ["javascript", "js", "java script"],
+    "TypeScript": ["typescript", "ts"],
+    "React": ["react", "reactjs", "react.js", "react js"],
+    "Node.js": ["node.js", "nodejs", "node js", "node"],
+    "SQL": ["sql", "t-sql", "tsql"],
+    "MySQL": ["mysql"],
+    "PostgreSQL": ["postgresql", "postgres"],
+    "C#": ["c#", "c sharp", "csharp"],
+    "C++": ["c++", "cpp"],
+    ".NET": [".net", "dotnet", "asp.net", ".net core"],
+    "PHP": ["php"],
+    "AWS": ["aws", "amazon web services"],
+    "Docker": ["docker"],
+    "Kubernetes": ["kubernetes", "k8s"],
+    "Git": ["git", "github", "gitlab"],
+    "Linux": ["linux", "ubuntu"],
+    "AutoCAD": ["autocad", "auto cad"],
+    "Photoshop": ["photoshop", "adobe photoshop"],
+}
+_CACHE_VERSION = 1
+_PREFIX_RE = re.compile(r"^(?:ky nang|skills?)\s+|\s+(?:skills?)$")
+_SEP_RE = re.compile(r"[\s_/\-]+")
+# khóa ngắn hơn mức này chỉ khớp chính xác ("c" không được fuzzy thành "c#")
+MIN_FUZZY_LEN = 4
+
+
+def skill_key(s: str) -> str:
+    """Dạng so khớp: bỏ dấu, lowercase, gộp khoảng trắng / gạch nối, bỏ tiền tố "kỹ năng"."""
+    key = _SEP_RE.sub(" ", fold(s)).strip(" .,;:'\"")
+    return _PREFIX_RE.sub("", key).strip()
+
+
+class SkillCanon:
+    def __init__(self, threshold: int = 90):
+        self.threshold = threshold
+        # skill_key -> tên chuẩn; alias của SYNONYMS luôn thắng mapping học được
+        self.mapping = {}
+        for name, aliases in SYNONYMS.items():
+            for alias in [name] + aliases:
+                self.mapping[skill_key(alias)] = name
+        self.synonym_keys = set(self.mapping)
+        self.ids = {name: i for i, name in enumerate(SYNONYMS)}
+        self.names = list(SYNONYMS)
+        self.dirty = False
+
+    def canonicalize(self, values, counts: dict = None, batch: int = 2000) -> list:
+        """Tên chuẩn cho từng giá trị; counts {giá trị: tần suất} quyết định tên đại diện cụm mới."""
+        from rapidfuzz import fuzz, process
+
+        counts = counts or {}
+        keys = {v: skill_key(v) for v in set(values) if isinstance(v, str)}
+        freq, form = Counter(), {}
+        # dạng đại diện của mỗi khóa: tần suất cao nhất, hòa thì theo thứ tự chữ (không phụ thuộc thứ tự set)
+        for v in sorted(keys, key=lambda v: (-counts.get(v, 1), v.strip())):
+            k = keys[v]
+            if k and k not in self.mapping:
+                freq[k] += counts.get(v, 1)
+                form.setdefault(k, v.strip())
+        pending = sorted(freq, key=lambda k: (-freq[k], k))
+        vocab = list(self.mapping)
+        for start in range(0, len(pending), batch):
+            chunk = pending[start:start + batch]
+            # 1. khớp với alias / skill đã biết
+            scores = process.cdist(chunk, vocab, scorer=fuzz.ratio, score_cutoff=self.threshold,
+                                   dtype=np.uint8, workers=-1)
+            rest = []
+            for k, row in zip(chunk, scores):
+                best = int(row.argmax())
+                if len(k) >= MIN_FUZZY_LEN and row[best]:
+                    self.mapping[k] = self.mapping[vocab[best]]
+                else:
+                    rest.append(k)
+            # 2. gom cụm phần còn lại với nhau: theo tần suất giảm dần nên gốc cụm là dạng hay gặp nhất
+            scores = process.cdist(rest, rest, scorer=fuzz.ratio, score_cutoff=self.threshold,
+                                   dtype=np.uint8, workers=-1)
+            for i, k in enumerate(rest):
+                similar = np.flatnonzero(scores[i, :i]) if len(k) >= MIN_FUZZY_LEN else []
+                self.mapping[k] = self.mapping[rest[similar[0]]] if len(similar) else form[k]
+            vocab.extend(rest)
+            self.dirty = True
+        return [self.mapping.get(keys[v], v) if isinstance(v, str) and keys[v] else None for v in values]
+
+    def canonicalize_lists(self, lists) -> list:
+        """Mỗi list skill -> list tên chuẩn, bỏ trùng trong cùng list, giữ thứ tự."""
+        lists = [list(x) if x is not None else [] for x in lists]
+        counts = Counter(v for x in lists for v in x)
+        canon = dict(zip(counts, self.canonicalize(list(counts), counts)))
+        return [list(dict.fromkeys(canon[v] for v in x if canon.get(v))) for x in lists]
+
+    def skill_ids(self, names) -> np.ndarray:
+        """Id int32 ổn định của từng tên chuẩn (tên mới được cấp id tiếp theo)."""
+        out = np.empty(len(names), dtype=np.int32)
+        for i, name in enumerate(names):
+            sid = self.ids.get(name)
+            if sid is None:
+                sid = self.ids[name] = len(self.names)
+                self.names.append(name)
+                self.dirty = True
+            out[i] = sid
+        return out
+
+    def skill_names(self, ids) -> list:
+        return [self.names[i] for i in ids]
+
+
+def _cache_path() -> Path:
+    return Path(os.environ.get("VNW_SKILL_CACHE", Path(__file__).with_name(".skill_cache.pkl")))
+
+
+def _source_hash(threshold: int) -> str:
+    h = hashlib.sha1(Path(__file__).read_bytes())
+    h.update(f"{_CACHE_VERSION}:{threshold}".encode())
+    return h.hexdigest()
+
+
+_CANON = None
+
+
+def get_skill_canon(threshold: int = 90) -> SkillCanon:
+    """SkillCanon dùng chung, nạp mapping / id đã học từ cache (bỏ cache khi từ điển đổi)."""
+    global _CANON
+    if _CANON is not None:
+        return _CANON
+    _CANON = SkillCanon(threshold)
+    try:
+        with open(_cache_path(), "rb") as f:
+            saved = pickle.load(f)
+        if saved.get("source") == _source_hash(threshold):
+            _CANON.mapping.update(saved["mapping"])
+            _CANON.names = saved["names"]
+            _CANON.ids = {n: i for i, n in enumerate(_CANON.names)}
+    except Exception:
+        pass
+    return _CANON
+
+
+def save_skill_canon():
+    """Ghi mapping / id đã học; gộp với cache hiện có để các process song song không ghi đè nhau."""
+    canon = _CANON
+    if canon is None or not canon.dirty:
+        return
+    path = _cache_path()
+    src = _source_hash(canon.threshold)
+    try:
+        with open(path, "rb") as f:
+            saved = pickle.load(f)
+        if saved.get("source") == src:
+            for k, v in saved["mapping"].items():
+                canon.mapping.setdefault(k, v)
+            # id đã ghi trong cache giữ nguyên; tên mới của process này nối tiếp phía sau
+            names = list(saved["names"])
+            known = set(names)
+            names += [n for n in canon.names if n not in known]
+            canon.names = names
+            canon.ids = {n: i for i, n in enumerate(names)}
+    except Exception:
+        pass
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump({"source": src, "mapping": {k: v for k, v in canon.mapping.items()
+                                                    if k not in canon.synonym_keys},
+                         "names": canon.names}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+        canon.dirty = False
+    except OSError as e:
+        print(f"Không ghi được cache skill {path}: {e}")
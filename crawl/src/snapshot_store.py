@@ -0,0 +1,278 @@
+"""Lưu lịch sử các lần crawl theo kiểu delta.
+
+Thay vì giữ nguyên bản vietnamworks.json của mỗi lần crawl, store chỉ ghi những field
+thay đổi của từng job_id (lần đầu thấy job thì ghi đủ mọi field):
+
+    <store>/crawls.json                 danh sách crawl theo thứ tự thời gian
+    <store>/changes/<crawl>.parquet     (job_id, field, value) — value là JSON; value null
+                                        (không phải chuỗi "null") = field bị bỏ khỏi job
+    <store>/state.parquet               hash hiện tại của từng (job_id, field)
+    <store>/jobs.parquet                first_seen / last_seen / present của từng job
+
+Việc job biến mất / xuất hiện lại cũng là một thay đổi (field "__present__"), nên dung
+lượng tăng theo lượng thay đổi chứ không theo số lần crawl.
+
+    python snapshot_store.py ingest --store snapshots --in vietnamworks.json
+    python snapshot_store.py at --store snapshots --when 2025-10-01 --out jobs_2025-10-01.json
+    python snapshot_store.py active --store snapshots --date 2025-10-01 --out active.csv
+    python snapshot_store.py history --store snapshots --job-id 1959058
+"""
+import argparse
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from job_keys import job_id_from_link
+
+PRESENT = "__present__"
+CRAWL_ID_FORMAT = "%Y%m%dT%H%M%S"
+
+CHANGE_SCHEMA = pa.schema([
+    pa.field("job_id", pa.dictionary(pa.int32(), pa.string())),
+    pa.field("field", pa.dictionary(pa.int32(), pa.string())),
+    pa.field("value", pa.string()),
+])
+
+
+def _encode(value) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+
+def _value_hash(enc: str) -> int:
+    return int.from_bytes(hashlib.blake2b(enc.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+def crawl_id(when=None) -> str:
+    """Mã crawl sắp xếp được theo thời gian; nhận datetime, chuỗi ISO hoặc None (bây giờ)."""
+    if when is None:
+        when = datetime.now()
+    elif isinstance(when, str):
+        when = datetime.fromisoformat(when)
+    return when.strftime(CRAWL_ID_FORMAT)
+
+def _cutoff(when) -> str:
+    # "2025-10-01" nghĩa là hết ngày 01/10, tức gồm mọi crawl trong ngày đó
+    if isinstance(when, str) and len(when) == 10:
+        return datetime.fromisoformat(when).strftime("%Y%m%d") + "T235959"
+    return crawl_id(when)
+
+
+class SnapshotStore:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.changes_dir = self.root / "changes"
+        self.changes_dir.mkdir(parents=True, exist_ok=True)
+        self.crawls_path = self.root / "crawls.json"
+        self.state_path = self.root / "state.parquet"
+        self.jobs_path = self.root / "jobs.parquet"
+        self.crawls = json.loads(self.crawls_path.read_text(encoding="utf-8")) if self.crawls_path.exists() else []
+        self._state = None
+        self._jobs = None
+
+    # ---------- ghi ----------
+    def _load_state(self):
+        if self._state is not None:
+            return
+        self._state, self._jobs = {}, {}
+        if self.state_path.exists():
+            t = pq.read_table(self.state_path).to_pydict()
+            for jid, field, h in zip(t["job_id"], t["field"], t["hash"]):
+                self._state.setdefault(jid, {})[field] = h
+        if self.jobs_path.exists():
+            t = pq.read_table(self.jobs_path).to_pydict()
+            for jid, first, last, present in zip(t["job_id"], t["first_seen"], t["last_seen"], t["present"]):
+                self._jobs[jid] = [first, last, present]
+
+    def ingest(self, jobs, when=None) -> dict:
+        """Ghi một lần crawl; chỉ các field khác với lần thấy trước được lưu."""
+        cid = crawl_id(when)
+        if any(c["crawl"] >= cid for c in self.crawls):
+            raise ValueError(f"crawl {cid} không mới hơn crawl cuối {self.crawls[-1]['crawl']}")
+        self._load_state()
+        rows = {"job_id": [], "field": [], "value": []}
+
+        def record(jid, field, enc):
+            rows["job_id"].append(jid)
+            rows["field"].append(field)
+            rows["value"].append(enc)
+
+        seen = set()
+        stats = {"jobs": 0, "new": 0, "changed": 0, "unchanged": 0, "gone": 0}
+        for job in jobs:
+            jid = job.get("job_id") or job_id_from_link(job.get("link_job", ""))
+            if not jid or jid in seen:
+                continue
+            seen.add(jid)
+            stats["jobs"] += 1
+            old = self._state.setdefault(jid, {})
+            meta = self._jobs.get(jid)
+            n_before = len(rows["field"])
+            if meta is None:
+                stats["new"] += 1
+                self._jobs[jid] = meta = [cid, cid, True]
+                record(jid, PRESENT, "true")
+            elif not meta[2]:
+                meta[2] = True
+                record(jid, PRESENT, "true")
+            meta[1] = cid
+
+            for field, value in job.items():
+                if field == "job_id":
+                    continue
+                enc = _encode(value)
+                h = _value_hash(enc)
+                if old.get(field) != h:
+                    old[field] = h
+                    record(jid, field, enc)
+            for field in [f for f in old if f not in job]:
+                del old[field]
+                record(jid, field, None)
+            if meta[0] != cid:
+                stats["changed" if len(rows["field"]) > n_before else "unchanged"] += 1
+
+        for jid, meta in self._jobs.items():
+            if meta[2] and jid not in seen:
+                meta[2] = False
+                stats["gone"] += 1
+                record(jid, PRESENT, "false")
+
+        pq.write_table(pa.table(rows, schema=CHANGE_SCHEMA), self.changes_dir / f"{cid}.parquet",
+                       compression="zstd")
+        self._save_state()
+        self.crawls.append(dict(crawl=cid, changes=len(rows["field"]), **stats))
+        tmp = self.crawls_path.with_name(self.crawls_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.crawls, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.crawls_path)
+        return self.crawls[-1]
+
+    def _save_state(self):
+        jids, fields, hashes = [], [], []
+        for jid, fh in self._state.items():
+            for field, h in fh.items():
+                jids.append(jid)
+                fields.append(field)
+                hashes.append(h)
+        state = pa.table({"job_id": pa.array(jids).dictionary_encode(),
+                          "field": pa.array(fields).dictionary_encode(),
+                          "hash": pa.array(hashes, pa.int64())})
+        ids = list(self._jobs)
+        jobs = pa.table({"job_id": ids,
+                         "first_seen": [self._jobs[j][0] for j in ids],
+                         "last_seen": [self._jobs[j][1] for j in ids],
+                         "present": [self._jobs[j][2] for j in ids]})
+        for table, path in ((state, self.state_path), (jobs, self.jobs_path)):
+            tmp = path.with_name(path.name + ".tmp")
+            pq.write_table(table, tmp, compression="zstd")
+            tmp.replace(path)
+
+    # ---------- đọc ----------
+    def _changes(self, until: str = None, job_ids=None) -> pd.DataFrame:
+        parts = []
+        for c in self.crawls:
+            if until is not None and c["crawl"] > until:
+                break
+            filters = [("job_id", "in", list(job_ids))] if job_ids is not None else None
+            t = pq.read_table(self.changes_dir / f"{c['crawl']}.parquet", filters=filters)
+            parts.append(t.append_column("crawl", pa.array([c["crawl"]] * len(t), pa.string())))
+        if not parts:
+            return pd.DataFrame(columns=["job_id", "field", "value", "crawl"])
+        df = pa.concat_tables(parts).to_pandas()
+        for c in ("job_id", "field"):
+            df[c] = df[c].astype(str)
+        return df
+
+    def as_of(self, when=None) -> pd.DataFrame:
+        """Dựng lại trạng thái mọi job đã thấy tính đến thời điểm when (mặc định: mới nhất).
+
+        Mỗi job một dòng với các field gốc, cộng first_seen và present (job có mặt
+        trong lần crawl gần nhất trước when hay không). Field job không có (chưa từng có hoặc
+        đã bị bỏ) là NaN; field có giá trị null thật là None.
+        """
+        ch = self._changes(_cutoff(when) if when is not None else None)
+        if ch.empty:
+            return pd.DataFrame(columns=["job_id", "first_seen", "present"])
+        first_seen = ch.groupby("job_id", sort=False)["crawl"].min()
+        last = ch.drop_duplicates(["job_id", "field"], keep="last")
+        wide = last.pivot(index="job_id", columns="field", values="value")
+        wide = wide.reindex(first_seen.index)
+        for col in wide.columns:
+            # dtype object giữ None (null thật) khác NaN (không có field); map sẽ suy ra float
+            wide[col] = pd.Series([json.loads(v) if isinstance(v, str) else np.nan for v in wide[col]],
+                                  index=wide.index, dtype=object)
+        present = wide.pop(PRESENT).fillna(False).astype(bool) if PRESENT in wide.columns else True
+        wide.columns.name = None
+        wide.insert(0, "first_seen", first_seen)
+        wide.insert(1, "present", present)
+        return wide.reset_index()
+
+    def active_on(self, date: str) -> pd.DataFrame:
+        """Các tin còn hiệu lực ngày date: upload_date <= date <= expiration_date.
+
+        Tin không đọc được ngày hết hạn được coi là còn hiệu lực nếu có mặt trong crawl
+        gần nhất trước ngày đó.
+        """
+        from clean_data import parse_date_series
+
+        snap = self.as_of(date)
+        if snap.empty:
+            return snap
+        day = pd.Timestamp(date).date()
+        up = parse_date_series(snap.get("upload_date", pd.Series([None] * len(snap))).fillna("").astype(str))
+        exp = parse_date_series(snap.get("expiration_date", pd.Series([None] * len(snap))).fillna("").astype(str))
+        started = up.isna() | (up <= day)
+        alive = (exp >= day).where(exp.notna(), snap["present"])
+        return snap[started & alive.astype(bool)].reset_index(drop=True)
+
+    def history(self, job_id: str) -> pd.DataFrame:
+        """Mọi thay đổi của một job theo thứ tự crawl; value None là field bị bỏ."""
+        ch = self._changes(job_ids=[job_id])[["crawl", "field", "value"]].reset_index(drop=True)
+        ch["value"] = ch["value"].astype(object).where(ch["value"].notna(), None)
+        return ch
+
+
+def _write(df: pd.DataFrame, out: str):
+    if out.endswith(".csv"):
+        df.to_csv(out, index=False, encoding="utf-8-sig")
+    elif out.endswith(".parquet"):
+        df.to_parquet(out, index=False)
+    else:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump({"jobs": json.loads(df.to_json(orient="records", force_ascii=False))}, f,
+                      ensure_ascii=False, indent=2)
+    print(f"Saved {len(df)} rows -> {out}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Snapshot store delta cho dữ liệu crawl")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("ingest", help="Ghi một file crawl vào store")
+    p.add_argument("--in", dest="input", default="vietnamworks.json")
+    p.add_argument("--when", default=None, help="Thời điểm crawl (ISO), mặc định bây giờ")
+    p = sub.add_parser("at", help="Dựng lại toàn bộ job tại một thời điểm")
+    p.add_argument("--when", default=None)
+    p.add_argument("--out", default="snapshot.json")
+    p = sub.add_parser("active", help="Các tin còn hiệu lực vào một ngày")
+    p.add_argument("--date", required=True)
+    p.add_argument("--out", default="active.json")
+    p = sub.add_parser("history", help="Lịch sử thay đổi của một job")
+    p.add_argument("--job-id", required=True)
+    for p in sub.choices.values():
+        p.add_argument("--store", default="snapshots")
+    args = ap.parse_args()
+
+    store = SnapshotStore(args.store)
+    if args.cmd == "ingest":
+        from clean_data import iter_jobs
+        print(store.ingest(iter_jobs(args.input), args.when))
+    elif args.cmd == "at":
+        _write(store.as_of(args.when), args.out)
+    elif args.cmd == "active":
+        _write(store.active_on(args.date), args.out)
+    else:
+        print(store.history(args.job_id).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Dictionary-encoded normalization.
+
+Các cột như salary, upload_date, career, locations... có rất ít giá trị khác nhau
+so với số dòng. map_unique() factorize cột, chỉ chạy hàm chuẩn hóa trên các giá trị
+distinct rồi broadcast kết quả lại theo mã. BoundedMemo giữ kết quả giữa các lần chạy.
+"""
+import hashlib
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def file_fingerprint(*paths) -> str:
+    """Hash nội dung các file code; memo cũ bị bỏ khi logic chuẩn hóa thay đổi."""
+    h = hashlib.sha1()
+    for p in paths:
+        h.update(Path(p).read_bytes())
+    return h.hexdigest()
+
+
+class BoundedMemo:
+    """LRU memo (namespace, value) -> kết quả, lưu bằng pickle giữa các lần chạy."""
+
+    def __init__(self, path=None, max_entries: int = 200_000, fingerprint: str = ""):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.fingerprint = fingerprint
+        self.data = OrderedDict()
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, "rb") as f:
+                    saved = pickle.load(f)
+                if saved.get("fingerprint") == fingerprint:
+                    self.data = saved["data"]
+            except Exception as e:
+                print(f"Bỏ qua memo hỏng {self.path}: {e}")
+
+    def get(self, key):
+        try:
+            value = self.data[key]
+        except KeyError:
+            return None
+        self.data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.max_entries:
+            self.data.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path, "wb") as f:
+            pickle.dump({"fingerprint": self.fingerprint, "data": self.data}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _hashable(v):
+    if isinstance(v, (list, tuple, np.ndarray)):
+        return tuple(_hashable(x) for x in v)
+    if isinstance(v, dict):
+        return tuple(sorted((k, _hashable(x)) for k, x in v.items()))
+    return v
+
+
+def factorize(s: pd.Series):
+    try:
+        codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    except TypeError:
+        # cột chứa list (vd. locations): đổi sang tuple để hash được
+        codes, uniques = pd.factorize(s.map(_hashable), use_na_sentinel=False)
+    return codes, pd.Series(uniques.array if isinstance(uniques, pd.Index) else uniques)
+
+
+def _is_na(v) -> bool:
+    return pd.api.types.is_scalar(v) and pd.isna(v)
+
+
+def _apply_with_memo(uniq: pd.Series, fn, memo: BoundedMemo, name: str):
+    keys = [None if _is_na(v) else (name, v) for v in uniq]
+    rows = [memo.get(k) if k is not None else None for k in keys]
+    misses = [i for i, r in enumerate(rows) if r is None]
+    columns = memo.get(("__columns__", name))
+    if columns is None:
+        misses = list(range(len(uniq)))
+
+    if misses:
+        fresh = fn(uniq.iloc[misses].reset_index(drop=True))
+        if isinstance(fresh, pd.DataFrame):
+            columns = list(fresh.columns)
+            frame = fresh
+        else:
+            columns = []
+            frame = fresh.to_frame()
+        for i, row in zip(misses, frame.itertuples(index=False, name=None)):
+            rows[i] = row
+            if keys[i] is not None:
+                memo.put(keys[i], row)
+        memo.put(("__columns__", name), columns)
+
+    if columns:
+        return pd.DataFrame.from_records(rows, columns=columns)
+    return pd.Series([r[0] for r in rows]).infer_objects()
+
+
+def map_unique(s: pd.Series, fn, memo: BoundedMemo = None, name: str = None):
+    """Chạy fn (nhận/trả Series hoặc DataFrame theo dòng) trên giá trị distinct của s.
+
+    Kết quả có cùng index với s, giống hệt fn(s) nhưng chi phí theo số giá trị distinct.
+    """
+    codes, uniq = factorize(s)
+    if memo is not None and name:
+        res = _apply_with_memo(uniq, fn, memo, name)
+    else:
+        res = fn(uniq)
+    out = res.take(codes)
+    out.index = s.index
+    return out
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# script trong crawl/ và crawl/src/ import lẫn nhau theo tên module (giống khi chạy trực tiếp)
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "src")]
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
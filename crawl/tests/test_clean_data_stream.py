@@ -0,0 +1,39 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from clean_data import LinkHashSet, OutputWriter, _link_hash, run_stream
+
+
+def _jobs():
+    for i in range(10):
+        job = {"name": f"Kế toán {i}", "link_job": f"https://www.vietnamworks.com/ke-toan-{1900000 + i}-jv",
+               "salary": "10 triệu - 15 triệu", "upload_date": "17/09/2025", "locations": ["Hà Nội"]}
+        if i >= 6:
+            job["extra_field"] = f"x{i}"
+        yield job
+    yield {"name": "Kế toán 2 (đăng lại)", "link_job": "https://www.vietnamworks.com/ke-toan-1900002-jv"}
+
+
+def test_link_hash_set():
+    seen = LinkHashSet()
+    a = np.array([_link_hash(f"l{i}") for i in range(5)], dtype=np.uint64)
+    assert not seen.contains(a).any()
+    seen.add(a[:3])
+    assert seen.contains(a).tolist() == [True, True, True, False, False]
+    seen.add(a)
+    assert len(seen) == 5 and seen.hashes.dtype == np.uint64
+
+
+def test_stream_unions_late_columns_and_dedupes(tmp_path):
+    root = tmp_path / "out"
+    run_stream(_jobs(), OutputWriter(root, ("parquet", "csv", "json")), chunk_size=3)
+    frames = [pd.read_parquet(f"{root}.parquet"), pd.read_csv(f"{root}.csv"),
+              pd.DataFrame(json.loads(open(f"{root}.json", encoding="utf-8").read()))]
+    for df in frames:
+        assert len(df) == 10
+        assert df["extra_field"].tolist()[6:] == ["x6", "x7", "x8", "x9"]
+        assert df["extra_field"].iloc[:6].isna().all()
+        assert df["name"].iloc[2] == "Kế toán 2"
+    assert list(frames[0].columns) == list(frames[1].columns)
@@ -0,0 +1,44 @@
+import math
+
+import pandas as pd
+import pytest
+
+from clean_data import (normalize_text, normalize_text_series, parse_experience, parse_experience_frame,
+                        parse_salary, parse_salary_frame, split_career, split_career_frame)
+
+# khoảng trắng Unicode (thin space, ideographic space, em space) và ranh giới từ sau ký tự có dấu:
+# dtype str (Arrow) của pandas >= 3 dùng RE2, \s / \b chỉ hiểu ASCII
+TEXTS = ["a  b", "　x　　y　", "abc\xa0 def", "Kế toán", "", None]
+SALARIES = ["1000 đtriệu", "10 triệu", "10tr - 15tr", "Lương 10　triệu", "1.000 USD/month",
+            "15 Triệu/năm", " Thỏa thuận", "500k", "20.000.000 VND", "Up to 2,000$", "ngân sách 5tr", None]
+EXPERIENCE = ["No experience", "Không yêu cầu", "2 - 5 năm", "Tối thiểu 3 năm", "1 năm", "", None]
+
+
+def _same(a, b):
+    if a is None or (isinstance(a, float) and math.isnan(a)):
+        return b is None or (isinstance(b, float) and math.isnan(b))
+    return a == b
+
+
+@pytest.mark.parametrize("dtype", [object, "str"])
+def test_normalize_text_parity(dtype):
+    assert normalize_text_series(pd.Series(TEXTS, dtype=dtype)).tolist() == [normalize_text(v) for v in TEXTS]
+
+
+@pytest.mark.parametrize("dtype", [object, "str"])
+def test_parse_salary_parity(dtype):
+    frame = parse_salary_frame(pd.Series(SALARIES, dtype=dtype))
+    for v, row in zip(SALARIES, frame.to_dict("records")):
+        expected = parse_salary(v)
+        assert all(_same(row[k], expected[k]) for k in expected), (v, row, expected)
+
+
+@pytest.mark.parametrize("dtype", [object, "str"])
+def test_parse_experience_and_career_parity(dtype):
+    exp = parse_experience_frame(pd.Series(EXPERIENCE, dtype=dtype))
+    for v, (lo, hi) in zip(EXPERIENCE, exp.itertuples(index=False)):
+        elo, ehi = parse_experience(v)
+        assert _same(lo, elo) and _same(hi, ehi), v
+    careers = ["Kế toán >　Kiểm toán", "IT", None]
+    assert split_career_frame(pd.Series(careers, dtype=dtype)).values.tolist() == \
+        [list(split_career(v)) for v in careers]
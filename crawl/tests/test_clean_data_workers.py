@@ -0,0 +1,50 @@
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+CLEAN_DATA = Path(__file__).resolve().parent.parent / "src" / "clean_data.py"
+SKILLS = ["điều phối sản xuất", "quản lý kho vận", "vận hành máy cnc", "thiết kế khuôn mẫu",
+          "kiểm định chất lượng", "lập kế hoạch bảo trì", "đàm phán hợp đồng thầu", "pha chế đồ uống"]
+
+
+def _variant(rng, s):
+    r = rng.random()
+    return s.upper() if r < .3 else s.title() if r < .6 else s + (" nâng cao" if r < .8 else "")
+
+
+@pytest.fixture(scope="module")
+def jobs_file(tmp_path_factory):
+    # skill chưa có trong SYNONYMS, nhiều biến thể hoa / thường / hậu tố: SkillCanon phải học tên chuẩn
+    rng = random.Random(0)
+    path = tmp_path_factory.mktemp("in") / "jobs.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(1200):
+            job = {"name": f"Job {i}", "link_job": f"https://www.vietnamworks.com/job-{2000000 + i}-jv",
+                   "skill": ", ".join(_variant(rng, rng.choice(SKILLS)) for _ in range(3)), "salary": "10 triệu"}
+            f.write(json.dumps(job, ensure_ascii=False) + "\n")
+    return path
+
+
+def _run(tmp_path, src, workers, stream):
+    out = tmp_path / f"w{workers}{'s' if stream else ''}"
+    args = [sys.executable, str(CLEAN_DATA), "--in", str(src), "--out", str(out), "--workers", str(workers),
+            "--chunk-size", "100", "--format", "csv"] + (["--stream"] if stream else [])
+    subprocess.run(args, check=True, capture_output=True,
+                   env={**os.environ, "VNW_SKILL_CACHE": str(out) + ".skill_cache.pkl"})
+    return hashlib.md5(Path(f"{out}.csv").read_bytes()).hexdigest()
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_workers_output_identical(tmp_path, jobs_file, stream):
+    src = jobs_file
+    if not stream:
+        src = tmp_path / "jobs.json"
+        jobs = [json.loads(line) for line in open(jobs_file, encoding="utf-8")]
+        src.write_text(json.dumps({"jobs": jobs}, ensure_ascii=False), encoding="utf-8")
+    assert _run(tmp_path, src, 1, stream) == _run(tmp_path, src, 4, stream)
@@ -0,0 +1,34 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from industry_report import _duckdb_source, clean_data, duckdb_counts, pandas_counts, read_merged
+
+duckdb = pytest.importorskip("duckdb")
+
+
+def test_source_path_with_quote(tmp_path):
+    d = tmp_path / "o'reilly"
+    (d / "ds" / "city=HN").mkdir(parents=True)
+    pd.DataFrame({"x": [1, 2, 3]}).to_parquet(d / "m.parquet")
+    pd.DataFrame({"x": [4]}).to_csv(d / "m.csv", index=False)
+    shutil.copy(d / "m.parquet", d / "ds" / "city=HN" / "part.parquet")
+    con = duckdb.connect()
+    assert con.execute(f"SELECT sum(x) FROM {_duckdb_source(d / 'm.parquet')}").fetchone()[0] == 6
+    assert con.execute(f"SELECT sum(x) FROM {_duckdb_source(d / 'm.csv')}").fetchone()[0] == 4
+    assert con.execute(f"SELECT count(*), min(city) FROM {_duckdb_source(d / 'ds')}").fetchone() == (3, "HN")
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".csv"])
+def test_empty_fill_cols_are_unknown(tmp_path, suffix):
+    # merge ghi "" cho industry/seniority thiếu: Parquet giữ "", CSV đọc lại thành NULL
+    df = pd.DataFrame({"industry": ["IT", "", None], "seniority": ["", "Senior", "Junior"],
+                       "employment_type": ["Full-time"] * 3, "company": ["A", "", "B"]})
+    path = tmp_path / f"merged{suffix}"
+    df.to_parquet(path) if suffix == ".parquet" else df.to_csv(path, index=False)
+    engines = {"pandas": pandas_counts(clean_data(read_merged(path)))["jobs"],
+               "duckdb": duckdb_counts(path)["jobs"]}
+    for name, jobs in engines.items():
+        got = sorted(zip(jobs["industry"], jobs["seniority"], jobs["posts"]))
+        assert got == [("IT", "Unknown", 1), ("Unknown", "Junior", 1), ("Unknown", "Senior", 1)], name
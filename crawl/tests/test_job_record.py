@@ -0,0 +1,32 @@
+import json
+
+from job_record import JOB_FIELDS, NOTICE, Job, dump_jobs, load_jobs
+
+RAW = {"job_id": "1900001", "name": "Kế toán", "salary": "Thương lượng", "upload_date": "17/09/2025",
+       "expiration_date": NOTICE, "locations": ["Hà Nội", "Hồ Chí Minh"], "company": "ABC",
+       "benefits": [], "link_job": "https://www.vietnamworks.com/ke-toan-1900001-jv", "scraped_by": "v2"}
+
+
+def test_mapping_interface():
+    job = Job(RAW)
+    assert job["locations"] == ("Hà Nội", "Hồ Chí Minh")
+    assert job.get("skill", "-") == "-" and "skill" not in job
+    assert job["scraped_by"] == "v2"
+    assert list(job) == list(RAW) and len(job) == len(RAW)
+    assert job.to_dict() == RAW
+
+
+def test_categorical_strings_interned():
+    a, b = Job(json.loads(json.dumps(RAW))), Job(json.loads(json.dumps(RAW)))
+    assert a["company"] is b["company"] and a["expiration_date"] is NOTICE
+    assert a["locations"][0] is b["locations"][0]
+
+
+def test_file_round_trip_byte_identical(tmp_path):
+    src, out = tmp_path / "in.json", tmp_path / "out.json"
+    # file do crawl.py ghi: khóa theo thứ tự parse_job (JOB_FIELDS), field lạ ở cuối
+    full = {k: RAW.get(k, "Mô tả\nnhiều dòng") for k in JOB_FIELDS}
+    raw = [RAW, {"name": "Chỉ có tên"}, dict(full, scraped_by="v1")]
+    src.write_text(json.dumps({"jobs": raw}, ensure_ascii=False, indent=2), encoding="utf-8")
+    dump_jobs(load_jobs(src), out)
+    assert out.read_bytes() == src.read_bytes()
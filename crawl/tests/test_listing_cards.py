@@ -0,0 +1,47 @@
+from datetime import date
+
+from bs4 import BeautifulSoup
+
+import listing_cards
+from listing_cards import CardState, parse_listing_card
+
+CARD = ('<div class="search_list"><a href="/ke-toan-tong-hop-1900001-jv?source=search"><h2>Kế toán tổng hợp</h2>'
+        '</a><a href="/nha-tuyen-dung/cong-ty-abc">Công ty ABC</a><span>Mới</span><span>15 triệu - 20 triệu</span>'
+        '<span>Hà Nội</span><span>Đăng {posted}</span></div>')
+
+
+def _card(posted="2 ngày trước", **replace):
+    html = CARD.format(posted=posted)
+    for old, new in replace.items():
+        html = html.replace(old.replace("_", " "), new)
+    return parse_listing_card(BeautifulSoup(html, "html.parser").div)
+
+
+def test_parse_card_fields():
+    card = _card()
+    assert card["job_id"] == "1900001"
+    assert card["link"] == "https://www.vietnamworks.com/ke-toan-tong-hop-1900001-jv?source=search"
+    assert (card["title"], card["company"], card["salary"], card["location"]) == \
+        ("Kế toán tổng hợp", "Công ty ABC", "15 triệu - 20 triệu", "Hà Nội")
+
+
+def test_fingerprint_ignores_volatile_text_only():
+    assert _card()["fp"] == _card(posted="hôm qua")["fp"]
+    assert _card()["fp"] != _card(**{"15 triệu": "18 triệu"})["fp"]
+
+
+def test_absolute_url_uses_current_base(monkeypatch):
+    monkeypatch.setattr(listing_cards, "BASE_URL", "http://127.0.0.1:8765")
+    assert _card()["link"].startswith("http://127.0.0.1:8765/ke-toan-tong-hop-1900001-jv")
+
+
+def test_card_state_refetch(tmp_path):
+    path = tmp_path / "listing_cards.json"
+    state = CardState(path, refetch_days=7, today=date(2025, 9, 1))
+    card = _card()
+    assert state.needs_fetch(card)
+    state.fetched(card)
+    state.save()
+    assert not CardState(path, 7, date(2025, 9, 7)).needs_fetch(card)
+    assert CardState(path, 7, date(2025, 9, 8)).needs_fetch(card)
+    assert CardState(path, 7, date(2025, 9, 2)).needs_fetch(_card(**{"Hà Nội": "Đà Nẵng"}))
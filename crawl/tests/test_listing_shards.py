@@ -0,0 +1,44 @@
+import json
+
+import listing_cards
+from listing_shards import Shard, ShardResult, format_coverage, listing_url, load_shards, merge_shards, parse_total
+
+
+def _card(jid):
+    return {"job_id": jid, "link": f"/x-{jid}-jv"}
+
+
+def test_merge_shards_dedupes_in_shard_order():
+    hcm, hn = Shard("hcm", {"l": "29"}), Shard("hn", {"l": "24"})
+    results = [ShardResult(hcm, [_card("1"), _card("2"), _card("3")], 2, 4, False),
+               ShardResult(hn, [_card("3"), _card("4")], 3, 2, True),
+               ShardResult(Shard("dn", {"l": "17"}), [], 0, None, False, "timeout")]
+    merged, report = merge_shards(results, reference_total=8)
+    assert [c["job_id"] for c in merged] == ["1", "2", "3", "4"]
+    assert report["summary"] == {"jobs": 4, "in_several_shards": 1, "sum_site_totals": 6, "reference_total": 8,
+                                 "coverage": 0.5, "capped_shards": ["hn"]}
+    hcm_row, hn_row, dn_row = report["shards"]
+    assert (hcm_row["cards"], hcm_row["only_here"], hcm_row["coverage"]) == (3, 2, 0.75)
+    assert (hn_row["only_here"], hn_row["coverage"]) == (1, 1.0)
+    assert dn_row["coverage"] is None and dn_row["error"] == "timeout"
+    text = format_coverage(report)
+    assert "CAPPED" in text and "ERROR timeout" in text
+
+
+def test_listing_url_follows_base_url(monkeypatch):
+    monkeypatch.setattr(listing_cards, "BASE_URL", "http://127.0.0.1:8765")
+    assert listing_url(2, {"l": "29"}) == "http://127.0.0.1:8765/viec-lam?l=29&page=2"
+    assert listing_url(1, base_url="https://x") == "https://x/viec-lam?page=1"
+
+
+def test_parse_total():
+    assert parse_total("Tìm thấy 12.345 việc làm phù hợp") == 12345
+    assert parse_total("1,234 jobs") == 1234
+    assert parse_total("không có") is None
+
+
+def test_load_shards(tmp_path):
+    assert load_shards()[0].name == "ho-chi-minh"
+    path = tmp_path / "shards.json"
+    path.write_text(json.dumps([{"name": "it", "params": {"g": 35}}]), encoding="utf-8")
+    assert load_shards(path) == [Shard("it", {"g": "35"})]
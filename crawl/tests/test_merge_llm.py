@@ -0,0 +1,18 @@
+import pandas as pd
+
+from merge_llm_and_summaries import merge_on_job_id
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=["job_id", "name_key", "industry"][:len(rows[0])])
+
+
+def test_duplicate_ids_keep_last_and_all_legacy_rows_matched():
+    df_sum = _frame([["1", "ke toan"], ["", "lap trinh vien python"], ["", "nhan vien kinh doanh"],
+                     ["", "thiet ke do hoa"]])
+    df_cls = _frame([["1", "ke toan", "old"], ["1", "ke toan", "Tài chính"],
+                     ["", "lap trinh vien python", "CNTT"], ["", "nhan vien kinh doanh", "Bán hàng"],
+                     ["", "thiet ke do hoa", "Thiết kế"]])
+    out = merge_on_job_id(df_sum, df_cls).set_index("name_key")["industry"]
+    assert out.to_dict() == {"ke toan": "Tài chính", "lap trinh vien python": "CNTT",
+                             "nhan vien kinh doanh": "Bán hàng", "thiet ke do hoa": "Thiết kế"}
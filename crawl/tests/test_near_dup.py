@@ -0,0 +1,43 @@
+import numpy as np
+
+from near_dup import MinHashLSH, representatives, shingles
+
+BASE = ("Phụ trách kế toán tổng hợp, lập báo cáo tài chính hàng tháng, quý, năm. Kê khai thuế GTGT, "
+        "TNCN, TNDN. Theo dõi công nợ phải thu phải trả, đối chiếu ngân hàng. Yêu cầu tốt nghiệp đại học "
+        "chuyên ngành kế toán, kiểm toán, tối thiểu 3 năm kinh nghiệm, sử dụng thành thạo Excel và MISA.")
+OTHER = ("Phát triển ứng dụng web bằng Python và Django, thiết kế REST API, viết unit test, tối ưu truy vấn "
+         "PostgreSQL, triển khai với Docker trên AWS. Yêu cầu 2 năm kinh nghiệm backend, đọc hiểu tài "
+         "liệu tiếng Anh, có kinh nghiệm làm việc với Git và quy trình Agile Scrum là lợi thế.")
+
+
+def _job(text):
+    return {"description": text, "requirements": "Information is missed"}
+
+
+def test_shingles_ignore_case_and_diacritics():
+    assert set(shingles("Kế Toán Tổng Hợp Lập Báo Cáo")) == set(shingles("ke toan tong hop lap bao cao"))
+    assert len(shingles("quá ngắn", k=5)) == 0
+
+
+def test_near_duplicates_point_to_first_posting():
+    reposted = BASE.replace("tối thiểu 3 năm", "tối thiểu 3 năm trở lên")
+    jobs = [_job(BASE), _job(OTHER), _job(reposted), _job("ngắn"), _job("ngắn")]
+    assert representatives(jobs) == [0, 1, 0, 3, 4]
+
+
+def test_signature_similarity_tracks_jaccard():
+    lsh = MinHashLSH(num_perm=256, bands=32)
+    sig, valid = lsh.signatures([BASE, BASE, OTHER])
+    assert valid.all()
+    assert (sig[0] == sig[1]).all()
+    assert (sig[0] == sig[2]).mean() < 0.1
+
+
+def test_bucket_compares_all_pairs():
+    # 3 tin chỉ chung bucket ở band 0; tin 1 và 2 giống 13/16 nhưng đều dưới ngưỡng với tin 0
+    lsh = MinHashLSH(num_perm=16, bands=4, threshold=0.8)
+    sig = np.arange(3 * 16, dtype=np.uint32).reshape(3, 16)
+    sig[:, :4] = 7
+    sig[2, 4:] = sig[1, 4:]
+    sig[2, [4, 8, 12]] += 1000
+    assert lsh.clusters(sig, np.ones(3, dtype=bool)).tolist() == [0, 1, 1]
@@ -0,0 +1,26 @@
+import numpy as np
+
+from quantile_sketch import KLLSketch, merge_json
+
+
+def test_quantiles_within_rank_error():
+    values = np.random.default_rng(0).lognormal(17, 0.5, 50_000)
+    sk = KLLSketch(k=200)
+    sk.update_many(values)
+    assert sk.n == len(values) and sk.min == values.min() and sk.max == values.max()
+    for q, est in zip((0.1, 0.5, 0.9), sk.quantiles([0.1, 0.5, 0.9])):
+        assert abs((values <= est).mean() - q) < 0.02
+
+
+def test_merge_json_equals_sketch_of_union():
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(20e6, 5e6, 10_000) for _ in range(4)]
+    jsons = []
+    for p in parts:
+        sk = KLLSketch()
+        sk.update_many(p)
+        jsons.append(sk.to_json())
+    merged = KLLSketch.from_json(merge_json(jsons + [None]))
+    allv = np.concatenate(parts)
+    assert merged.n == len(allv)
+    assert abs((allv <= merged.quantiles([0.5])[0]).mean() - 0.5) < 0.02
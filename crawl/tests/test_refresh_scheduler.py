@@ -0,0 +1,84 @@
+from datetime import datetime
+
+from refresh_scheduler import MAX_FAILURES, TOMBSTONE_DAYS, RefreshScheduler, refresh_interval_h
+
+NOW = datetime(2025, 9, 17, 8).timestamp()
+HOUR = 3600
+
+
+def _job(expires):
+    return {"job_id": "1", "link_job": "https://x/a-1-jv", "expiration_date": expires}
+
+
+def test_interval_shrinks_towards_expiry():
+    today = datetime.fromtimestamp(NOW).date()
+    assert refresh_interval_h(None, today) == 24
+    assert refresh_interval_h(today.replace(day=18), today) == 6
+    assert refresh_interval_h(today.replace(day=30), today) == 72
+    assert refresh_interval_h(today.replace(day=16), today) is None
+
+
+def test_expired_job_not_refetched_until_signature_changes(tmp_path):
+    state = tmp_path / "refresh_state.json"
+    sched = RefreshScheduler(state)
+    item = {"job_id": "1", "link": "https://x/a-1-jv", "lastmod": "2025-09-01T00:00:00"}
+    assert sched.offer(item, NOW)
+    assert sched.next_due(NOW) == ("1", item["link"])
+    assert not sched.fetched("1", _job("10/09/2025"), NOW)
+    sched.save()
+
+    sched = RefreshScheduler(state)
+    for cycle in range(3):
+        assert not sched.offer(item, NOW + cycle * HOUR)
+    assert sched.next_due(NOW + 3 * HOUR)[0] is None
+    assert sched.offer(dict(item, lastmod="2025-09-20T00:00:00"), NOW + 4 * HOUR)
+    assert sched.stats["revived"] == 1
+
+
+def test_failures_back_off_then_drop():
+    sched = RefreshScheduler()
+    sched.offer({"job_id": "1", "link": "l", "fp": "a"}, NOW)
+    for i in range(MAX_FAILURES):
+        jid, _ = sched.next_due(NOW + 10 * i * HOUR)
+        assert jid == "1"
+        sched.failed(jid, NOW + 10 * i * HOUR)
+    assert "1" not in sched.entries and sched.dropped["1"]["reason"] == "failed"
+    assert not sched.offer({"job_id": "1", "link": "l", "fp": "a"}, NOW + 40 * HOUR)
+
+
+def test_old_tombstones_pruned():
+    sched = RefreshScheduler()
+    sched.offer({"job_id": "1", "link": "l", "fp": "a"}, NOW)
+    sched.drop("1", "expired", NOW)
+    sched.expire(NOW + (TOMBSTONE_DAYS + 1) * 86400)
+    assert sched.offer({"job_id": "1", "link": "l", "fp": "a"}, NOW + (TOMBSTONE_DAYS + 1) * 86400)
+
+
+def test_budget_window():
+    sched = RefreshScheduler(budget_per_hour=2)
+    for i in range(3):
+        sched.offer({"job_id": str(i), "link": str(i), "fp": "a"}, NOW)
+    assert sched.next_due(NOW)[0] == "0"
+    assert sched.next_due(NOW + 1)[0] == "1"
+    jid, wait = sched.next_due(NOW + 2)
+    assert jid is None and wait == HOUR - 2
+    assert sched.next_due(NOW + HOUR)[0] == "2"
+
+
+def test_adopted_job_not_refetched_on_first_discovery():
+    sched = RefreshScheduler()
+    sched.adopt("1", _job("30/09/2025"), NOW)
+    assert not sched.offer({"job_id": "1", "link": "l", "fp": "a"}, NOW)
+    assert sched.next_due(NOW)[0] is None
+    # sig đã nhận: lần sau đổi thẻ mới là "changed"
+    assert sched.offer({"job_id": "1", "link": "l", "fp": "b"}, NOW + HOUR)
+    assert sched.next_due(NOW + HOUR)[0] == "1"
+
+
+def test_adopted_job_with_known_sig_detects_change():
+    sched = RefreshScheduler()
+    sched.adopt("1", _job("30/09/2025"), NOW, sig="a")
+    sched.adopt("2", _job("30/09/2025"), NOW, sig="a")
+    assert not sched.offer({"job_id": "1", "link": "l", "fp": "a"}, NOW)
+    assert sched.offer({"job_id": "2", "link": "l", "fp": "b"}, NOW)
+    assert sched.next_due(NOW)[0] == "2" and sched.next_due(NOW)[0] is None
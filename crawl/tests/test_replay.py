@@ -0,0 +1,59 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from page_archive import PageArchive
+from replay_server import ReplayServer
+
+LISTING = "https://www.vietnamworks.com/viec-lam?page=1"
+JOB = "https://www.vietnamworks.com/ke-toan-1900001-jv?source=searchResults&page=1"
+
+
+@pytest.fixture
+def replay(tmp_path):
+    archive = PageArchive(tmp_path / "archive")
+    archive.save(LISTING, '<html><script>x()</script><a href="https://www.vietnamworks.com/ke-toan-1900001-jv">'
+                          'Kế toán</a></html>')
+    archive.save(JOB, "<h1 name='title'>Kế toán</h1>")
+    srv = ReplayServer(("127.0.0.1", 0), PageArchive(tmp_path / "archive"))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv, f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url) as r:
+            return r.status, r.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode()
+
+
+def test_listing_needs_exact_query(replay):
+    srv, base = replay
+    status, html = _get(base + "/viec-lam?page=1")
+    assert status == 200 and f'href="{base}/ke-toan-1900001-jv"' in html and "<script" not in html
+    assert _get(base + "/viec-lam?page=2")[0] == 404
+    assert _get(base + "/viec-lam")[0] == 404
+
+
+def test_job_detail_ignores_tracking_query(replay):
+    srv, base = replay
+    assert _get(base + "/ke-toan-1900001-jv")[0] == 200
+    assert _get(base + "/ke-toan-1900001-jv?source=other")[0] == 200
+    stats = json.loads(_get(base + "/__stats")[1])
+    assert stats["hits"] == 2 and stats.get("misses", 0) == 0
+
+
+def test_injected_errors(tmp_path):
+    srv = ReplayServer(("127.0.0.1", 0), PageArchive(tmp_path), error_rate=1.0, error_status=502)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        assert _get(f"http://127.0.0.1:{srv.server_address[1]}/viec-lam?page=1")[0] == 502
+    finally:
+        srv.shutdown()
+        srv.server_close()
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from report_cubes import CubeStore
+
+
+def _cubes(n):
+    return {"jobs": pd.DataFrame({"industry": ["IT", "Sales"], "posts": [n, 1]}),
+            "company": pd.DataFrame({"company": ["A"], "posts": [n]})}
+
+
+def test_crash_mid_batch_is_not_double_counted(tmp_path, monkeypatch):
+    store = CubeStore(tmp_path)
+    assert store.add(_cubes(2), "2025-09-01", "b1")
+
+    real = pd.DataFrame.to_parquet
+    def crash_on_company(self, path, *a, **kw):
+        if str(path).endswith("company.parquet"):
+            raise OSError("disk full")
+        return real(self, path, *a, **kw)
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", crash_on_company)
+    with pytest.raises(OSError):
+        CubeStore(tmp_path).add(_cubes(5), "2025-09-02", "b2")
+    monkeypatch.undo()
+
+    # jobs.parquet của b2 đã ghi nhưng chưa commit: store vẫn ở trạng thái sau b1
+    store = CubeStore(tmp_path)
+    assert store.batches == {"b1": "2025-09-01"}
+    assert store.load()["jobs"]["posts"].sum() == 3
+
+    assert store.add(_cubes(5), "2025-09-02", "b2")
+    assert not CubeStore(tmp_path).add(_cubes(5), "2025-09-02", "b2")
+    cubes = CubeStore(tmp_path).load()
+    assert cubes["jobs"]["posts"].sum() == 9
+    assert cubes["company"]["posts"].sum() == 7
+    assert cubes["jobs"].groupby("crawl_date")["posts"].sum().to_dict() == {"2025-09-01": 3, "2025-09-02": 6}
+    assert [p.name for p in tmp_path.glob("gen-*")] == ["gen-000002"]
+
+
+def test_load_filters_crawl_date(tmp_path):
+    store = CubeStore(tmp_path)
+    store.add(_cubes(2), "2025-09-01", "b1")
+    store.add(_cubes(3), "2025-09-05", "b2")
+    jobs = CubeStore(tmp_path).load(since="2025-09-02")["jobs"]
+    assert set(jobs["crawl_date"]) == {"2025-09-05"}
+    assert jobs["posts"].sum() == 4
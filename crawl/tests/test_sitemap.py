@@ -0,0 +1,67 @@
+import shutil
+
+from conftest import FIXTURES
+from sitemap import SitemapState, iter_sitemap, normalize_lastmod
+
+INDEX = FIXTURES / "sitemap" / "index.xml"
+
+
+def _ids(items):
+    return [i["job_id"] for i in items]
+
+
+def test_nested_index_gzip_and_filters():
+    state = SitemapState()
+    items = state.discover(str(INDEX))
+    # companies.xml không phải sitemap job; /viec-lam-ke-toan không phải trang job; sắp lastmod mới nhất trước
+    assert _ids(items) == ["1900001", "1900003", "1900002", "1900004"]
+    assert state.stats == {"sitemaps": 4, "sitemaps_skipped": 0}
+
+
+def test_image_extension_loc_ignored():
+    entries = list(iter_sitemap(str(FIXTURES / "sitemap" / "jobs-2.xml")))
+    assert entries == [
+        ("url", "https://www.vietnamworks.com/nhan-vien-kinh-doanh-1900003-jv", "2025-09-16T08:00:00"),
+        ("url", "https://www.vietnamworks.com/thiet-ke-do-hoa-1900004-jv", ""),
+    ]
+
+
+def test_normalize_lastmod():
+    assert normalize_lastmod("2025-09-17T10:00:00+07:00") == "2025-09-17T03:00:00"
+    assert normalize_lastmod(" 2025-09-17 ") == "2025-09-17T00:00:00"
+    assert normalize_lastmod("") == ""
+
+
+def test_second_run_skips_unchanged(tmp_path):
+    path = tmp_path / "sitemap_state.json"
+    state = SitemapState(path)
+    for item in state.discover(str(INDEX)):
+        state.fetched(item)
+    state.save()
+
+    state = SitemapState(path)
+    items = state.discover(str(INDEX))
+    assert len(items) == 4
+    assert state.stats == {"sitemaps": 1, "sitemaps_skipped": 1}
+    assert not any(state.needs_fetch(i) for i in items)
+
+
+def test_changed_child_lastmod_rereads_only_that_sitemap(tmp_path):
+    root = tmp_path / "sitemap"
+    shutil.copytree(FIXTURES / "sitemap", root)
+    path = tmp_path / "sitemap_state.json"
+    state = SitemapState(path)
+    for item in state.discover(str(root / "index.xml")):
+        state.fetched(item)
+    state.save()
+
+    for name, old, new in [("index.xml", "2025-09-17T09:00:00+07:00", "2025-09-18"),
+                           ("jobs_index.xml", "<lastmod>2025-09-16</lastmod>", "<lastmod>2025-09-18</lastmod>"),
+                           ("jobs-2.xml", "2025-09-16T08:00:00Z", "2025-09-18T08:00:00Z")]:
+        f = root / name
+        f.write_text(f.read_text(encoding="utf-8").replace(old, new), encoding="utf-8")
+    state = SitemapState(path)
+    items = state.discover(str(root / "index.xml"))
+    # index + jobs_index + jobs-2 đọc lại, jobs-1.xml.gz không đổi
+    assert state.stats == {"sitemaps": 3, "sitemaps_skipped": 1}
+    assert _ids([i for i in items if state.needs_fetch(i)]) == ["1900003"]
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from skill_canon import SkillCanon, skill_key
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+def test_synonyms_and_key():
+    assert skill_key("Kỹ năng Giao-tiếp") == "giao tiep"
+    assert SkillCanon().canonicalize(["MS Excel", "Tiếng Anh", None]) == ["Excel", "English", None]
+
+
+def test_representative_most_frequent_then_lexicographic():
+    values = ["thuyết trình", "Thuyết Trình", "Thuyết trình"]
+    assert SkillCanon().canonicalize(values, {"thuyết trình": 1, "Thuyết Trình": 2, "Thuyết trình": 2}) \
+        == ["Thuyết Trình"] * 3
+    assert SkillCanon().canonicalize(values) == ["Thuyết Trình"] * 3
+
+
+def test_representative_independent_of_hash_seed():
+    code = ("from skill_canon import SkillCanon;"
+            "print(SkillCanon().canonicalize(['thuyết trình', 'Thuyết Trình', 'Thuyết trình'])[0])")
+    outs = {subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True, text=True, check=True,
+                           env=dict(os.environ, PYTHONHASHSEED=str(seed))).stdout for seed in range(1, 5)}
+    assert len(outs) == 1
+
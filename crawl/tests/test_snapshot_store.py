@@ -0,0 +1,23 @@
+import math
+
+from snapshot_store import SnapshotStore
+
+
+def test_removed_field_differs_from_null(tmp_path):
+    store = SnapshotStore(tmp_path)
+    store.ingest([{"job_id": "1", "salary": "1000", "benefits": None},
+                  {"job_id": "2", "salary": None, "benefits": "x"}], "2025-09-01T00:00:00")
+    # job 1 bỏ field salary; job 2 có salary null thật như trước, benefits thành null
+    store.ingest([{"job_id": "1", "benefits": None},
+                  {"job_id": "2", "salary": None, "benefits": None}], "2025-09-02T00:00:00")
+
+    h1 = store.history("1")
+    assert h1[h1["field"] == "salary"]["value"].tolist() == ['"1000"', None]
+    h2 = store.history("2")
+    assert h2[h2["field"] == "benefits"]["value"].tolist() == ['"x"', "null"]
+
+    rows = {r["job_id"]: r for r in SnapshotStore(tmp_path).as_of().to_dict("records")}
+    assert isinstance(rows["1"]["salary"], float) and math.isnan(rows["1"]["salary"])
+    assert rows["1"]["benefits"] is None
+    assert rows["2"]["salary"] is None and rows["2"]["benefits"] is None
+    assert SnapshotStore(tmp_path).as_of("2025-09-01").set_index("job_id").at["1", "salary"] == "1000"